@@ -0,0 +1,82 @@
+# backtest_client.py
+
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+from multiprocessing.connection import Client
+from cli_options import pop_option, pop_flag
+
+DAEMON_DIR = os.path.join(tempfile.gettempdir(), f"prosperity-backtester-{os.getuid()}")  # only accessible to us
+DAEMON_SOCKET = os.path.join(DAEMON_DIR, "daemon.sock")
+
+'''
+Thin client of the backtest daemon (see backtest_daemon.py). It only imports the standard library
+(and cli_options.py), so a run costs the interpreter startup plus the backtest itself on the
+daemon's preloaded data:
+
+    python backtest_client.py [algorithm path] [--round R] [--day D] [--source KIND] [--until N]
+    python backtest_client.py --status
+    python backtest_client.py --shutdown
+
+The round defaults to data_sources.ROUND_NUMBER, the day to 0 and the source to historical data (see
+data_sources.SOURCES). From Python:
+
+    from backtest_client import submit
+    result = submit({"type": "backtest", "algo_path": "/abs/path/algo.py", "day": 1})
+'''
+
+
+def submit(request: dict, address: str = DAEMON_SOCKET) -> dict:
+    """Sends a request to the daemon and returns its response (with an "error" key on failure)."""
+    with Client(address, family="AF_UNIX") as conn:
+        conn.send(request)
+        return conn.recv()
+
+
+if __name__ == "__main__":
+    argv = sys.argv[1:]
+    address = pop_option(argv, "--socket", DAEMON_SOCKET)
+    if pop_flag(argv, "--status"):
+        request = {"type": "status"}
+    elif pop_flag(argv, "--shutdown"):
+        request = {"type": "shutdown"}
+    else:
+        round_number = pop_option(argv, "--round")
+        day = int(pop_option(argv, "--day", 0))
+        source = pop_option(argv, "--source", "historical")
+        until = pop_option(argv, "--until")
+        request = {
+            "type": "backtest",
+            "algo_path": str(Path(argv[0] if argv else "algorithms/algo.py").expanduser().resolve()),
+            "round": int(round_number) if round_number is not None else None,
+            "day": day,
+            "source": source,
+            "until": int(until) if until is not None else None
+        }
+
+    start = time.perf_counter()
+    try:
+        response = submit(request, address)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"No backtest daemon listening on {address}. Start one with `python backtest_daemon.py`.")
+        sys.exit(1)
+    if "error" in response:
+        print(response["error"])
+        sys.exit(1)
+
+    if request["type"] == "status":
+        print(f"Daemon {response['pid']} up for {response['uptime']:.0f}s, {response['jobs']} jobs served.")
+        for name, ticks in response["datasets"].items():
+            print(f"  {name}: {ticks} trading states")
+    elif request["type"] == "shutdown":
+        print("Daemon stopped.")
+    else:
+        print("-----------------------------------------------------------------------------------")
+        print("TOTAL PNL:", response["pnl"])
+        for product, pnl in response["per_product_pnl"].items():
+            print(f"  {product}: {pnl}")
+        print(f"{response['dataset']}: {response['ticks']} ticks in {response['seconds']:.2f}s on the daemon, "
+              f"{time.perf_counter() - start:.2f}s in total.")
+        print("-----------------------------------------------------------------------------------")
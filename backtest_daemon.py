@@ -0,0 +1,157 @@
+# backtest_daemon.py
+
+import os
+import re
+import sys
+import glob
+import time
+import signal
+import traceback
+from multiprocessing.connection import Listener
+from engine import load_fresh_algorithm, run_backtest, reads_parameters_file, load_algorithm_with_parameters
+from data_sources import open_source, HISTORICAL_PATH, POST_DATA_PATH, ROUND_NUMBER
+from backtest_client import DAEMON_SOCKET, DAEMON_DIR
+
+'''
+Long-lived backtest server. It imports the engine and loads every historical and post-round
+dataset once, then runs backtest jobs sent over a Unix socket by backtest_client.py, so repeated
+runs skip the interpreter startup, the pandas/matplotlib imports and the dataset parsing. From the
+repo root:
+
+    python backtest_daemon.py [--socket PATH]
+
+and in another terminal, after each edit of the algorithm:
+
+    python backtest_client.py algorithms/algo.py --day 1
+
+Each job runs in a process forked from the daemon: it shares the loaded datasets copy-on-write and
+executes the algorithm file afresh (see engine.load_fresh_algorithm), so edits are always picked up
+and a crashing or state-mutating algorithm never affects the daemon or later jobs. Messages are
+pickled, so the socket is created accessible to our user only, by default in a private directory
+under the system temp directory. Datasets whose files change on disk are reloaded before the next
+job that uses them; other sources (csv, bottle, tape) are loaded on first use.
+'''
+
+
+def _private_directory(path: str):
+    """Creates a directory only our user can access, refusing an existing one that others could use."""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not os.path.isdir(path) or os.path.islink(path) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{path} must be a directory owned by and only accessible to the current user.")
+
+
+class BacktestDaemon:
+
+    def __init__(self, address: str = DAEMON_SOCKET):
+        self.address = address
+        self.datasets = {}  # (source, round, day) -> (modification time, trading states)
+        self.start = time.time()
+        self.jobs = 0
+
+    def preload(self):
+        """Loads every historical and post-round trading_states.json found."""
+        patterns = [("historical", HISTORICAL_PATH.format(round="*", day="*")),
+                    ("post-data", POST_DATA_PATH.format(round="*"))]
+        for source, pattern in patterns:
+            for path in sorted(glob.glob(pattern)):
+                match = re.search(r"round-(-?\d+)(?:/day-(-?\d+))?", path.replace(os.sep, "/"))
+                round_number, day = int(match.group(1)), int(match.group(2) or 0)
+                states = self.dataset(source, round_number, day)
+                print(f"Loaded {path} ({len(states)} trading states)")
+
+    def dataset(self, source: str, round_number: int, day: int) -> list:
+        """The trading states of a dataset, (re)loaded if they are not loaded or their files changed."""
+        data_source = open_source(source, round_number, day)
+        modified = max(os.path.getmtime(path) for path in data_source.paths())
+        key = (source, round_number, day)
+        if key not in self.datasets or self.datasets[key][0] != modified:
+            self.datasets[key] = (modified, data_source.load())
+        return self.datasets[key][1]
+
+    def serve(self):
+        if os.path.dirname(self.address) == DAEMON_DIR:
+            _private_directory(DAEMON_DIR)
+        if os.path.exists(self.address):
+            os.remove(self.address)  # left over by a daemon that did not shut down cleanly
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)  # finished jobs are reaped automatically
+        # messages are pickled, so only our own user may connect, from the moment the socket exists
+        umask = os.umask(0o177)
+        try:
+            listener = Listener(self.address, family="AF_UNIX")
+        finally:
+            os.umask(umask)
+        with listener:  # removes the socket file when closed
+            print(f"Backtest daemon listening on {self.address}")
+            while True:
+                conn = listener.accept()
+                try:
+                    if not self._handle(conn):
+                        return
+                except (OSError, EOFError):
+                    pass  # the client went away
+                finally:
+                    conn.close()
+
+    def _handle(self, conn) -> bool:
+        """Answers one request. Returns False on shutdown."""
+        request = conn.recv()
+        if request["type"] == "shutdown":
+            conn.send({})
+            return False
+        if request["type"] == "status":
+            conn.send({
+                "pid": os.getpid(),
+                "uptime": time.time() - self.start,
+                "jobs": self.jobs,
+                "datasets": {f"{source} round {r} day {d}": len(states)
+                             for (source, r, d), (_, states) in sorted(self.datasets.items())}
+            })
+            return True
+
+        round_number = request["round"] if request.get("round") is not None else ROUND_NUMBER
+        try:
+            trading_states = self.dataset(request["source"], round_number, request["day"])
+        except (OSError, ValueError) as e:
+            conn.send({"error": f"Could not load the {request['source']} data of round {round_number} "
+                                f"day {request['day']}: {e}"})
+            return True
+        self.jobs += 1
+        if os.fork() == 0:
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)  # the job's own subprocesses must be waitable
+            try:
+                conn.send(_run_job(request, trading_states, f"{request['source']} round {round_number} "
+                                                            f"day {request['day']}"))
+            finally:
+                os._exit(0)
+        return True
+
+
+def _run_job(request: dict, trading_states: list, dataset: str) -> dict:
+    """Runs a backtest job in the forked child and returns its results, or the error it raised."""
+    try:
+        start = time.perf_counter()
+        algo_path = request["algo_path"]
+        parameters = request.get("parameters")
+        if parameters and reads_parameters_file(algo_path):
+            trader_module = load_algorithm_with_parameters(algo_path, parameters)
+        else:
+            # compiled from source: a bytecode cache written less than a second before an edit would be stale
+            trader_module = load_fresh_algorithm(algo_path)
+        results = run_backtest(trader_module, trading_states, parameters, until=request.get("until"))
+        results["seconds"] = time.perf_counter() - start
+        results["dataset"] = dataset
+        return results
+    except BaseException:
+        return {"error": traceback.format_exc()}
+
+
+if __name__ == "__main__":
+    # Usage: python backtest_daemon.py [--socket PATH]
+    address = sys.argv[sys.argv.index("--socket") + 1] if "--socket" in sys.argv else DAEMON_SOCKET
+    daemon = BacktestDaemon(address)
+    daemon.preload()
+    try:
+        daemon.serve()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,157 @@
+# backtester.py
+
+import os
+import re
+import sys
+import runpy
+import subprocess
+from cli_options import pop_option
+
+USAGE = """
+Single entry point for the backtester's scripts. It only imports the standard library (and
+cli_options.py) and each subcommand imports what it needs, so `python backtester.py --help` starts
+as fast as Python does:
+
+    python backtester.py run [DAY] [ALGORITHM PATH] [LOG LENGTH] [VERBOSE] [flags]   (see main.py --help)
+    python backtester.py extract KIND ROUND [DAY] [--tape PATH]                      (see data_sources.py)
+    python backtester.py search ALGORITHM --param NAME BEGIN END STEP [--param ...]
+                                [--strategy STRATEGY] [--candidates N] [--days 0,1,2] [--processes N]
+                                [--isolate] [--tick-timeout SECONDS] [--memory-limit MB]
+                                [--every K] [--references N] [--top N]   (with --strategy coarse)
+    python backtester.py analyze [DAY] [ALGORITHM PATH] [LOG LENGTH] [VERBOSE]       (see algo-analyzer.py)
+    python backtester.py analyze --logs                                              (see distiller.py)
+    python backtester.py imports [MODULE ...]
+
+`imports` benchmarks the import time of the entry points (or of the given modules) in fresh
+interpreters with `python -X importtime`, and lists the slowest imports of each. `search --isolate`
+runs each trader in a supervised process (see isolation.py), so hanging or crashing candidates are
+reported as failed instead of stopping the search.
+"""
+STRATEGIES = ["grid", "separable", "random", "quasi-random", "halving", "hyperband", "cross-validate", "coarse"]
+BENCHMARK_MODULES = ["backtester", "main", "engine", "data_sources", "grid_search", "backtest_client"]
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SLOWEST_IMPORTS = 5  # slowest imports listed per benchmarked module
+
+
+def run_script(script: str, args: list):
+    """Runs one of the repo's scripts as if invoked as `python script args...`."""
+    sys.argv = [script] + args
+    runpy.run_path(os.path.join(REPO_DIR, script), run_name="__main__")
+
+
+def parse_number(value: str):
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def search(args: list):
+    strategy = pop_option(args, "--strategy", "grid")
+    candidates = int(pop_option(args, "--candidates", 81))
+    every = int(pop_option(args, "--every", 10))
+    references = int(pop_option(args, "--references", 5))
+    top = int(pop_option(args, "--top", 3))
+    days = tuple(int(day) for day in pop_option(args, "--days", "0,1,2").split(","))
+    processes = pop_option(args, "--processes")
+    processes = int(processes) if processes is not None else None
+    isolation = None
+    tick_timeout = pop_option(args, "--tick-timeout")
+    memory_limit = pop_option(args, "--memory-limit")
+    if "--isolate" in args or tick_timeout or memory_limit:
+        if "--isolate" in args:
+            args.remove("--isolate")
+        isolation = {}
+        if tick_timeout:
+            isolation["tick_timeout"] = float(tick_timeout)
+        if memory_limit:
+            isolation["memory_limit"] = int(float(memory_limit) * 1024 ** 2)
+    parameters = []
+    while "--param" in args:
+        index = args.index("--param")
+        if len(args) < index + 5:
+            print("Expected --param NAME BEGIN END STEP.")
+            sys.exit(1)
+        name, begin, end, step = args[index + 1:index + 5]
+        parameters.append((name, parse_number(begin), parse_number(end), parse_number(step)))
+        del args[index:index + 5]
+    if len(args) != 1 or not parameters or strategy not in STRATEGIES:
+        print(f"Usage: python backtester.py search ALGORITHM --param NAME BEGIN END STEP [--param ...] "
+              f"[--strategy {{{','.join(STRATEGIES)}}}] [--candidates N] [--days 0,1,2] [--processes N] "
+              f"[--isolate] [--tick-timeout SECONDS] [--memory-limit MB]")
+        sys.exit(1)
+
+    from grid_search import GridSearcher
+    searcher = GridSearcher(isolation=isolation)
+    for parameter in parameters:
+        searcher.add_parameter(*parameter)
+    algo_path = args[0]
+    if strategy == "grid":
+        searcher.grid_search(algo_path, days, processes)
+    elif strategy == "separable":
+        searcher.separable_search(algo_path, days, processes)
+    elif strategy == "random":
+        searcher.random_search(algo_path, candidates, days, processes)
+    elif strategy == "quasi-random":
+        searcher.quasi_random_search(algo_path, candidates, days, processes)
+    elif strategy == "halving":
+        searcher.successive_halving(algo_path, candidates, days, processes)
+    elif strategy == "hyperband":
+        searcher.hyperband(algo_path, days, processes)
+    elif strategy == "cross-validate":
+        searcher.cross_validate(algo_path, days, processes)
+    else:
+        searcher.coarse_search(algo_path, every, references, days, processes, top)
+
+
+def import_times(module: str) -> list:
+    """(cumulative microseconds, self microseconds, name) of every import made by `import module`."""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               capture_output=True, text=True, cwd=REPO_DIR)
+    if completed.returncode != 0:
+        raise ImportError(completed.stderr.strip().splitlines()[-1])
+    times = []
+    for line in completed.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| (.*)", line)
+        if match:
+            times.append((int(match.group(2)), int(match.group(1)), match.group(3).strip()))
+    return times
+
+
+def benchmark_imports(modules: list):
+    print(f"{'MODULE':<20}{'IMPORT TIME':>12}   SLOWEST IMPORTS (self time)")
+    for module in modules:
+        try:
+            times = import_times(module)
+        except ImportError as e:
+            print(f"{module:<20}{'failed':>12}   {e}")
+            continue
+        # the module's own import comes last, and its cumulative time covers everything it imported
+        total = times[-1][0]
+        slowest = sorted(times[:-1], key=lambda t: t[1], reverse=True)[:SLOWEST_IMPORTS]
+        print(f"{module:<20}{total / 1000:>10.1f}ms   "
+              + ", ".join(f"{name} {own / 1000:.1f}ms" for _, own, name in slowest))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] in ("-h", "--help"):
+        print(USAGE.strip())
+        sys.exit(0)
+    command, args = sys.argv[1], sys.argv[2:]
+    if command == "run":
+        run_script("main.py", args)
+    elif command == "extract":
+        run_script("data_sources.py", args)
+    elif command == "search":
+        search(args)
+    elif command == "analyze":
+        if "--logs" in args:
+            args.remove("--logs")
+            run_script("distiller.py", args)
+        else:
+            run_script("algo-analyzer.py", args)
+    elif command == "imports":
+        benchmark_imports(args or BENCHMARK_MODULES)
+    else:
+        print(f"Unknown command {command}, expected one of run, extract, search, analyze, imports.")
+        sys.exit(1)
@@ -0,0 +1,29 @@
+# cli_options.py
+
+import sys
+
+'''
+Command-line option helpers shared by the repo's scripts. Only the standard library is imported,
+so entry points that must start fast (backtester.py, backtest_client.py) can use them too.
+'''
+
+
+def pop_flag(argv: list, flag: str) -> bool:
+    """Removes an optional --flag from the argument list, returning whether it was present."""
+    if flag in argv:
+        argv.remove(flag)
+        return True
+    return False
+
+
+def pop_option(argv: list, flag: str, default=None):
+    """Removes an optional `--flag value` pair from the argument list, returning the value."""
+    if flag in argv:
+        index = argv.index(flag)
+        if index + 1 >= len(argv):
+            print(f"Missing value for {flag}.")
+            sys.exit(1)
+        value = argv[index + 1]
+        del argv[index:index + 2]
+        return value
+    return default
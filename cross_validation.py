@@ -0,0 +1,107 @@
+# cross_validation.py
+
+import statistics
+from collections import Counter
+
+'''
+Cross-validation of a parameter search across days. Summing pnl over every day picks the
+parameters that fit those days best, which says nothing about how they do on an unseen day. Here
+each fold selects the best candidate on its training days and scores it on its held-out test day:
+
+- leave-one-out: one fold per day, trained on all the other days
+- walk-forward: fold k trains on days 0..k-1 and tests on day k, as if trading day by day
+
+Every fold needs the same (candidate, day) pnl matrix, so it is evaluated once in parallel by an
+EvaluationPool (each worker loads each day once) and the folds are computed from it. See
+GridSearcher.cross_validate for usage.
+'''
+
+MODES = ["leave-one-out", "walk-forward"]
+
+
+def make_folds(days: list, mode: str = "leave-one-out") -> list:
+    """Returns (training days, test day) pairs."""
+    days = list(days)
+    if mode == "leave-one-out":
+        return [([day for day in days if day != test], test) for test in days]
+    if mode == "walk-forward":
+        return [(days[:k], days[k]) for k in range(1, len(days))]
+    raise ValueError(f"Unknown cross-validation mode {mode}, expected one of {MODES}.")
+
+
+def _complete(result: dict, days: list) -> bool:
+    """Whether a result has an unpruned, successful run on every one of the days."""
+    return all(day in result["per_day"] and not result["per_day"][day].get("pruned")
+               and not result["per_day"][day].get("failed") for day in days)
+
+
+def cross_validate(results: list, folds: list) -> dict:
+    """
+    Selects the best candidate of each fold on its training days and scores it on its test day.
+    A fold without any candidate that completed all of its days is reported without a selection
+    (params None) and left out of the summary statistics.
+    """
+    results = [result for result in results if not result.get("failed")]  # missing the days after the failure
+    fold_reports = []
+    for train, test in folds:
+        valid = [result for result in results if _complete(result, train + [test])]
+        if not valid:
+            fold_reports.append({"train": train, "test": test, "params": None, "train_pnl": None, "test_pnl": None})
+            continue
+        best = max(valid, key=lambda r: sum(r["per_day"][day]["pnl"] for day in train))
+        fold_reports.append({
+            "train": train,
+            "test": test,
+            "params": best["params"],
+            "train_pnl": sum(best["per_day"][day]["pnl"] for day in train),
+            "test_pnl": best["per_day"][test]["pnl"]
+        })
+
+    scored = [fold for fold in fold_reports if fold["params"] is not None]
+    if not scored:
+        return {"folds": fold_reports, "mean": None, "std": None,
+                "stability": {"agreement": 0.0, "most_common": None, "parameters": {}}}
+    test_pnls = [fold["test_pnl"] for fold in scored]
+    selections = Counter(tuple(sorted(fold["params"].items())) for fold in scored)
+    most_common, count = selections.most_common(1)[0]
+    names = list(scored[0]["params"])
+    return {
+        "folds": fold_reports,
+        "mean": statistics.mean(test_pnls),
+        "std": statistics.stdev(test_pnls) if len(test_pnls) > 1 else 0.0,
+        "stability": {
+            # share of scored folds that selected the most common parameters
+            "agreement": count / len(scored),
+            "most_common": dict(most_common),
+            # spread of each selected parameter across folds
+            "parameters": {
+                name: {
+                    "values": [fold["params"][name] for fold in scored],
+                    "std": statistics.pstdev([fold["params"][name] for fold in scored])
+                    if all(isinstance(fold["params"][name], (int, float)) for fold in scored) else None
+                }
+                for name in names
+            }
+        }
+    }
+
+
+def print_report(report: dict, mode: str):
+    print(f"CROSS-VALIDATION ({mode}):")
+    for fold in report["folds"]:
+        train = ", ".join(str(day) for day in fold["train"])
+        if fold["params"] is None:
+            print(f"  Train day(s) {train} -> test day {fold['test']}: no candidate completed these days")
+            continue
+        print(f"  Train day(s) {train} -> test day {fold['test']}: test PNL {fold['test_pnl']} "
+              f"(train PNL {fold['train_pnl']}) with {fold['params']}")
+    if report["mean"] is None:
+        print("  No fold had a valid candidate.")
+        return
+    print(f"  Mean test PNL: {report['mean']:.1f}, std: {report['std']:.1f}")
+    stability = report["stability"]
+    print(f"  Parameter agreement across folds: {stability['agreement']:.0%} "
+          f"(most common: {stability['most_common']})")
+    for name, spread in stability["parameters"].items():
+        std = f", std {spread['std']:.4g}" if spread["std"] is not None else ""
+        print(f"    {name}: {spread['values']}{std}")
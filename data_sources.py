@@ -0,0 +1,389 @@
+# data_sources.py
+
+import io
+import os
+import sys
+import csv
+import json
+import time
+import pickle
+import zipfile
+import itertools
+from datamodel import TradingState, Listing, OrderDepth, Trade, Observation, ConversionObservation
+
+HISTORICAL_PATH = "data/round-{round}/day-{day}/trading_states.json"
+POST_DATA_PATH = "post-data/round-{round}/trading_states.json"
+TAPE_PATH = "data/round-{round}/day-{day}/trading_states.tape"
+RAW_DIR = "raw/round-{round}/day-{day}"  # prices.csv and trades.csv of one day
+BOTTLE_PATH = "raw/round-{round}/round-{round}-island-data-bottle.zip"
+TAPE_HEADER = b"PROSPERITY-TAPE 1\n"
+
+SOURCES = ["historical", "post-data", "csv", "bottle", "tape"]
+ROUND_NUMBER = 3  # round backtested by main.py, searches, scenarios and the daemon
+
+'''
+Data-source adapters. Every dataset format is read by a DataSource that streams TradingStates
+through the same interface, so the engine (see engine.py) never deals with file formats:
+
+- JsonSource: trading_states.json files, i.e. historical data (data/round-N/day-D) and post-round
+  simulation data (post-data/round-N)
+- CsvSource: the prices.csv and trades.csv of a day (raw/round-N/day-D)
+- BottleSource: a day of the zipped data bottle released each round, read without unzipping
+- TapeSource: a binary tape written by write_tape, the fastest format to reload
+
+    from data_sources import open_source, write_tape
+
+    source = open_source("csv", round_number=1, day=0)
+    for state in source:  # streamed one state at a time
+        ...
+    trading_states = source.load()  # or materialized, as the Backtest indexes them
+    write_tape(trading_states, "data/round-1/day-0/trading_states.tape")
+
+From the command line, to check a source and optionally convert it to a tape:
+
+    python data_sources.py KIND ROUND [DAY] [--tape PATH]
+'''
+
+
+class DataSource:
+    """A dataset of trading states. Subclasses implement `stream`."""
+
+    def stream(self):
+        """Yields the trading states in timestamp order."""
+        raise NotImplementedError
+
+    def __iter__(self):
+        return self.stream()
+
+    def load(self) -> list:
+        return list(self.stream())
+
+    def paths(self) -> list:
+        """The files the source reads, e.g. to notice when they change."""
+        return []
+
+
+def _convert_trades(trades):
+    return [
+        Trade(
+            symbol=t["symbol"],
+            price=int(t["price"]),
+            quantity=int(t["quantity"]),
+            buyer=t.get("buyer"),
+            seller=t.get("seller"),
+            timestamp=int(t["timestamp"])
+        ) for t in trades
+    ]
+
+
+def state_from_dict(d) -> TradingState:
+    """Converts a trading state dictionary (as in trading_states.json) into a TradingState."""
+    # Convert listings
+    listings = {}
+    for sym, data in d.get("listings", {}).items():
+        listings[sym] = Listing(
+            symbol=data["symbol"],
+            product=data["product"],
+            denomination=data["denomination"]
+        )
+
+    # Convert order depths
+    order_depths = {}
+    for sym, data in d.get("order_depths", {}).items():
+        od = OrderDepth()
+        od.buy_orders = {int(k): int(v) for k, v in data.get("buy_orders", {}).items()}
+        od.sell_orders = {int(k): int(v) for k, v in data.get("sell_orders", {}).items()}
+        order_depths[sym] = od
+
+    # Convert trades
+    market_trades = {}
+    for sym, trades in d.get("market_trades", {}).items():
+        market_trades[sym] = _convert_trades(trades)
+    own_trades = {}
+    for sym, trades in d.get("own_trades", {}).items():
+        own_trades[sym] = _convert_trades(trades)
+
+    # Convert position
+    position = {prod: int(val) for prod, val in d.get("position", {}).items()}
+
+    # Convert observations
+    obs = d.get("observations", {})
+    plain_obs = {prod: int(val) for prod, val in obs.get("plainValueObservations", {}).items()}
+    conv_obs_data = obs.get("conversionObservations", {})
+    conv_obs = {}
+    for prod, details in conv_obs_data.items():
+        conv_obs[prod] = ConversionObservation(
+            bidPrice=float(details.get("bidPrice", 0.0)),
+            askPrice=float(details.get("askPrice", 0.0)),
+            transportFees=float(details.get("transportFees", 0.0)),
+            exportTariff=float(details.get("exportTariff", 0.0)),
+            importTariff=float(details.get("importTariff", 0.0)),
+            sugarPrice=float(details.get("sugarPrice", 0.0)),
+            sunlightIndex=float(details.get("sunlightIndex", 0.0))
+        )
+    observations = Observation(
+        plainValueObservations=plain_obs,
+        conversionObservations=conv_obs
+    )
+    # Create and return the TradingState object
+    return TradingState(
+        traderData=d.get("traderData", ""),
+        timestamp=int(d.get("timestamp", 0)),
+        listings=listings,
+        order_depths=order_depths,
+        own_trades=own_trades,
+        market_trades=market_trades,
+        position=position,
+        observations=observations
+    )
+
+
+class JsonSource(DataSource):
+    """Trading states from a trading_states.json file (historical or post-round simulation data)."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def paths(self) -> list:
+        return [self.path]
+
+    def stream(self):
+        with open(self.path, "r") as f:
+            trading_states_data = json.load(f)
+        for d in trading_states_data:
+            yield state_from_dict(d)
+
+
+def load_trading_states(log_path: str):
+    """Load trading states from a JSON log file and convert each dictionary into a TradingState object."""
+    return JsonSource(log_path).load()
+
+
+def trading_states_path(day: int, round_number: int = ROUND_NUMBER) -> str:
+    return HISTORICAL_PATH.format(round=round_number, day=day)
+
+
+def _read_trades(trades_file) -> dict:
+    """Market trades of a trades CSV, by timestamp and symbol."""
+    trades = {}
+    for row in csv.DictReader(trades_file, delimiter=";"):
+        trade = Trade(
+            symbol=row["symbol"],
+            price=int(float(row["price"])),
+            quantity=int(float(row["quantity"])),
+            buyer=row["buyer"] or None,
+            seller=row["seller"] or None,
+            timestamp=int(row["timestamp"])
+        )
+        trades.setdefault(trade.timestamp, {}).setdefault(trade.symbol, []).append(trade)
+    return trades
+
+
+def _book_levels(row, side: str, sign: int) -> dict:
+    """The up to three price levels of one side of the book in a prices CSV row."""
+    levels = {}
+    for i in (1, 2, 3):
+        price = row[f"{side}_price_{i}"]
+        if price:
+            volume = row[f"{side}_volume_{i}"]
+            levels[int(float(price))] = sign * int(float(volume)) if volume else 0
+    return levels
+
+
+def read_csv_states(prices_file, trades_file):
+    """
+    Yields one TradingState per timestamp of a prices CSV (one row per product and timestamp), with
+    the market trades of the previous timestamp from the trades CSV. Fills in what the CSVs lack the
+    way bottle-extractor.py always has: flat positions, no own trades and the mid prices as plain
+    observations.
+    """
+    trades = _read_trades(trades_file)
+    rows = csv.DictReader(prices_file, delimiter=";")
+    for timestamp, group in itertools.groupby(rows, key=lambda row: int(row["timestamp"])):
+        group = sorted(group, key=lambda row: row["product"])
+        previous_trades = trades.get(timestamp - 100, {})
+        listings = {}
+        order_depths = {}
+        market_trades = {}
+        plain_obs = {}
+        for row in group:
+            product = row["product"]
+            listings[product] = Listing(symbol=product, product=product, denomination="")
+            od = OrderDepth()
+            od.buy_orders = _book_levels(row, "bid", 1)
+            od.sell_orders = _book_levels(row, "ask", -1)
+            order_depths[product] = od
+            market_trades[product] = previous_trades.get(product, [])
+            plain_obs[product] = float(row["mid_price"]) if row["mid_price"] else 0.0
+        yield TradingState(
+            traderData="",
+            timestamp=timestamp,
+            listings=listings,
+            order_depths=order_depths,
+            own_trades={},
+            market_trades=market_trades,
+            position={product: 0 for product in listings},
+            observations=Observation(plainValueObservations=plain_obs, conversionObservations={})
+        )
+
+
+class CsvSource(DataSource):
+    """Trading states from the prices and trades CSV files of one day."""
+
+    def __init__(self, prices_path: str, trades_path: str):
+        self.prices_path = prices_path
+        self.trades_path = trades_path
+
+    def paths(self) -> list:
+        return [self.prices_path, self.trades_path]
+
+    def stream(self):
+        with open(self.prices_path, "r", newline="") as prices_file, \
+                open(self.trades_path, "r", newline="") as trades_file:
+            yield from read_csv_states(prices_file, trades_file)
+
+
+class BottleSource(DataSource):
+    """Trading states of one day of a zipped data bottle (prices_round_N_day_D.csv and trades_...)."""
+
+    def __init__(self, zip_path: str, day: int):
+        self.zip_path = zip_path
+        self.day = day
+
+    def paths(self) -> list:
+        return [self.zip_path]
+
+    def _member(self, archive, kind: str) -> str:
+        for name in archive.namelist():
+            base = name.rsplit("/", 1)[-1]
+            if not name.startswith("__MACOSX") and base.startswith(f"{kind}_round_") \
+                    and base.endswith(f"_day_{self.day}.csv"):
+                return name
+        raise FileNotFoundError(f"No {kind} CSV for day {self.day} in {self.zip_path}.")
+
+    def stream(self):
+        with zipfile.ZipFile(self.zip_path) as archive:
+            with io.TextIOWrapper(archive.open(self._member(archive, "prices")), newline="") as prices_file, \
+                    io.TextIOWrapper(archive.open(self._member(archive, "trades")), newline="") as trades_file:
+                yield from read_csv_states(prices_file, trades_file)
+
+
+def _trade_tuples(trades: dict) -> list:
+    return [(symbol, [(t.price, t.quantity, t.buyer, t.seller, t.timestamp) for t in ts]) for symbol, ts in trades.items()]
+
+
+def _tape_record(state) -> tuple:
+    """A TradingState as plain tuples and dicts, which pickle to a fraction of the objects' size."""
+    observations = state.observations
+    return (
+        state.timestamp,
+        state.traderData,
+        [(l.symbol, l.product, l.denomination) for l in state.listings.values()],
+        [(symbol, od.buy_orders, od.sell_orders) for symbol, od in state.order_depths.items()],
+        _trade_tuples(state.own_trades),
+        _trade_tuples(state.market_trades),
+        state.position,
+        observations.plainValueObservations,
+        {product: vars(c) for product, c in observations.conversionObservations.items()}
+    )
+
+
+def _state_from_tape(record) -> TradingState:
+    timestamp, trader_data, listings, books, own_trades, market_trades, position, plain_obs, conv_obs = record
+    order_depths = {}
+    for symbol, buy_orders, sell_orders in books:
+        od = OrderDepth()
+        od.buy_orders = buy_orders
+        od.sell_orders = sell_orders
+        order_depths[symbol] = od
+    return TradingState(
+        traderData=trader_data,
+        timestamp=timestamp,
+        listings={symbol: Listing(symbol, product, denomination) for symbol, product, denomination in listings},
+        order_depths=order_depths,
+        own_trades={symbol: [Trade(symbol, *t) for t in ts] for symbol, ts in own_trades},
+        market_trades={symbol: [Trade(symbol, *t) for t in ts] for symbol, ts in market_trades},
+        position=position,
+        observations=Observation(
+            plainValueObservations=plain_obs,
+            conversionObservations={product: ConversionObservation(**c) for product, c in conv_obs.items()}
+        )
+    )
+
+
+def write_tape(trading_states, path: str):
+    """Writes trading states (any iterable, e.g. a DataSource) to a binary tape, one pickled record per state."""
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(TAPE_HEADER)
+        for state in trading_states:
+            pickle.dump(_tape_record(state), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+
+
+class TapeSource(DataSource):
+    """Trading states from a binary tape written by write_tape."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def paths(self) -> list:
+        return [self.path]
+
+    def stream(self):
+        with open(self.path, "rb") as f:
+            if f.readline() != TAPE_HEADER:
+                raise ValueError(f"{self.path} is not a trading state tape.")
+            while True:
+                try:
+                    record = pickle.load(f)
+                except EOFError:
+                    return
+                yield _state_from_tape(record)
+
+
+def open_source(kind: str, round_number: int, day: int = 0) -> DataSource:
+    """The data source of the given kind (one of SOURCES) for a round and day, at its usual path."""
+    if kind == "historical":
+        return JsonSource(HISTORICAL_PATH.format(round=round_number, day=day))
+    if kind == "post-data":
+        return JsonSource(POST_DATA_PATH.format(round=round_number))
+    if kind == "csv":
+        raw_dir = RAW_DIR.format(round=round_number, day=day)
+        return CsvSource(f"{raw_dir}/prices.csv", f"{raw_dir}/trades.csv")
+    if kind == "bottle":
+        return BottleSource(BOTTLE_PATH.format(round=round_number), day)
+    if kind == "tape":
+        return TapeSource(TAPE_PATH.format(round=round_number, day=day))
+    raise ValueError(f"Unknown data source {kind}, expected one of {SOURCES}.")
+
+
+if __name__ == "__main__":
+    # Usage: python data_sources.py KIND ROUND [DAY] [--tape PATH]
+    args = sys.argv[1:]
+    tape_path = None
+    if "--tape" in args:
+        index = args.index("--tape")
+        if index + 1 >= len(args):
+            print("Missing value for --tape.")
+            sys.exit(1)
+        tape_path = args[index + 1]
+        del args[index:index + 2]
+    if len(args) < 2 or args[0] not in SOURCES:
+        print(f"Usage: python data_sources.py {{{','.join(SOURCES)}}} ROUND [DAY] [--tape PATH]")
+        sys.exit(1)
+    source = open_source(args[0], int(args[1]), int(args[2]) if len(args) > 2 else 0)
+
+    start = time.perf_counter()
+    trading_states = source.load()
+    seconds = time.perf_counter() - start
+    if not trading_states:
+        print("No trading states found.")
+        sys.exit(1)
+    products = sorted({product for state in trading_states for product in state.listings})
+    print(f"Loaded {len(trading_states)} trading states in {seconds:.2f}s "
+          f"(timestamps {trading_states[0].timestamp} to {trading_states[-1].timestamp})")
+    print(f"Products: {', '.join(products)}")
+    if tape_path:
+        write_tape(trading_states, tape_path)
+        print(f"Wrote {tape_path}")
@@ -0,0 +1,308 @@
+# distributed.py
+
+import os
+import sys
+import time
+import socket
+import ipaddress
+import threading
+import multiprocessing
+from queue import Queue
+from collections import deque
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client, deliver_challenge, answer_challenge
+import evaluation_pool
+from evaluation_pool import EvaluationPool, _evaluate, _evaluate_batch
+from evaluation_cache import EvaluationCache, file_hash, CACHE_PATH
+from search_progress import STATUS_PATH
+
+COORDINATOR_PORT = 6001
+# Shared secret of coordinator and workers. Without BACKTEST_AUTHKEY, a random key only shared with the
+# coordinator's own local workers is used, and the coordinator refuses to listen beyond localhost
+AUTHKEY = os.environ.get("BACKTEST_AUTHKEY", "").encode() or None
+LOCAL_AUTHKEY = os.urandom(32)
+JOB_TIMEOUT = 600     # seconds after which an unanswered job is also handed to another worker
+RETRY_DELAY = 5       # seconds between a persistent worker's attempts to reach the coordinator
+
+'''
+Coordinator/worker mode for parameter searches across several machines. The coordinator is a
+drop-in EvaluationPool that serves jobs over TCP instead of to local processes; workers started on
+any machine with the repo (and the same data/ and algorithm) pull jobs, run them in-process on
+their preloaded datasets and send the results back.
+
+Messages are pickled, so whoever can connect with the key can run code on the coordinator and the
+workers. Pick a secret, set it as BACKTEST_AUTHKEY on every machine, and only expose the port on a
+trusted network. On each worker machine, from the repo root:
+
+    BACKTEST_AUTHKEY=... python distributed.py coordinator-host:6001 [processes]
+
+On the coordinator, with the same BACKTEST_AUTHKEY set (without it, only 127.0.0.1 is allowed):
+
+    searcher = GridSearcher(address=("0.0.0.0", 6001))
+    searcher.grid_search("algorithms/algo.py")
+
+A worker that disconnects has its unfinished job handed to the next worker, and a job unanswered
+for JOB_TIMEOUT seconds is handed out again (the first result wins), so dead or hung workers never
+stall a search. Workers keep reconnecting between searches. A candidate whose trader raises is
+reported as failed with the error, like an isolated trader's failure (see isolation.py).
+
+To test on one machine, `DistributedPool(..., local_workers=4)` starts localhost workers itself.
+'''
+
+
+class DistributedPool(EvaluationPool):
+    """EvaluationPool whose tasks are run by remote workers connected over TCP."""
+
+    def __init__(self, algo_path: str, days=(0, 1, 2), address=("127.0.0.1", COORDINATOR_PORT), local_workers: int = 0,
+                 cache_path: str = CACHE_PATH, lockstep: int = None, prune: bool = True, max_drawdown: float = None,
+                 job_timeout: float = JOB_TIMEOUT, status_path: str = STATUS_PATH, isolation: dict = None,
+                 sampling: int = None):
+        super().__init__(algo_path, days, local_workers or None, cache_path, lockstep, prune, max_drawdown,
+                         status_path, isolation, sampling)
+        self.address = address
+        self.local_workers = local_workers
+        self.job_timeout = job_timeout
+        self._listener = None
+        self._local = []
+        self._lock = threading.Condition()
+        self._queue = deque()   # job ids waiting for a worker
+        self._jobs = {}         # job id -> (batched, task, results queue), until its first result arrives
+        self._inflight = {}     # job id -> time it was last handed out
+        self._next_id = 0
+        self._closing = False
+
+    def __enter__(self):
+        if AUTHKEY is None and not _is_loopback(self.address[0]):
+            raise ValueError(f"Refusing to serve on {self.address[0]} without a shared secret: "
+                             f"set the BACKTEST_AUTHKEY environment variable on the coordinator and the workers.")
+        authkey = self._authkey = AUTHKEY or LOCAL_AUTHKEY
+        self._references = {} if self.prune else None
+        # authenticated in each connection's thread (see _serve), so a silent client cannot block accept()
+        self._listener = Listener(self.address)
+        host, port = self._listener.address
+        print(f"Coordinator listening on {host}:{port}")
+        if self.local_workers:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+            for _ in range(self.local_workers):
+                process = context.Process(target=run_worker, args=(("127.0.0.1", port), False, authkey),
+                                          daemon=True)
+                process.start()
+                self._local.append(process)
+        threading.Thread(target=self._accept, daemon=True).start()
+        if self.cache_path:
+            self._cache = EvaluationCache(self.cache_path)
+        self._start_progress(self.local_workers)
+        return self
+
+    def __exit__(self, *exc):
+        self._stop_progress(exc)
+        with self._lock:
+            self._closing = True
+            self._lock.notify_all()
+        self._listener.close()
+        for process in self._local:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._local = []
+        if self._cache:
+            self._cache.close()
+            self._cache = None
+        return False
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError):
+                if self._closing:
+                    return
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        """Talks to one worker: sends the setup, then answers each request with the next job."""
+        job_id = None
+        try:
+            # the handshake Listener(authkey=...) would do in accept(), mirroring Client's
+            deliver_challenge(conn, self._authkey)
+            answer_challenge(conn, self._authkey)
+        except (OSError, EOFError, AuthenticationError):
+            conn.close()  # a wrong authkey or not a worker at all
+            return
+        try:
+            hello = conn.recv()
+            name = f"{hello['host']}:{hello['pid']}"
+            conn.send({"algo_path": self.algo_path, "algo_hash": self.algo_hash, "days": self.days,
+                       "prune": self.prune, "max_drawdown": self.max_drawdown, "isolation": self.isolation,
+                       "sampling": self.sampling})
+            while True:
+                request = conn.recv()
+                if request["type"] == "error":
+                    print(f"Worker {name} failed: {request['message']}")
+                    return
+                if request["type"] == "result":
+                    self._complete(request["job"], request["results"])
+                job_id, job = self._next_job()
+                if job_id is None:
+                    conn.send({"type": "stop"})
+                    return
+                batched, task, _ = job
+                conn.send({"type": "job", "id": job_id, "batched": batched, "task": task,
+                           "references": self._job_references(task)})
+        except (OSError, EOFError):
+            pass  # the worker died or disconnected
+        finally:
+            conn.close()
+            with self._lock:
+                if job_id in self._jobs and job_id not in self._queue:
+                    self._queue.appendleft(job_id)  # give its unfinished job to the next worker
+                    self._inflight.pop(job_id, None)
+                    self._lock.notify_all()
+
+    def _next_job(self):
+        """
+        Blocks until a job is available (or overdue elsewhere) and returns (job id, job), or
+        (None, None) when closing.
+        """
+        with self._lock:
+            while not self._closing:
+                if self._queue:
+                    job_id = self._queue.popleft()
+                    self._inflight[job_id] = time.monotonic()
+                    return job_id, self._jobs[job_id]
+                overdue = [job_id for job_id, started in self._inflight.items()
+                           if time.monotonic() - started > self.job_timeout]
+                if overdue:
+                    self._inflight[overdue[0]] = time.monotonic()
+                    return overdue[0], self._jobs[overdue[0]]
+                self._lock.wait(timeout=1.0)
+            return None, None
+
+    def _complete(self, job_id, results):
+        with self._lock:
+            if job_id not in self._jobs:
+                return  # a duplicate of a job that was handed out again, or of a cancelled one
+            _, _, results_queue = self._jobs.pop(job_id)
+            self._inflight.pop(job_id, None)
+            if job_id in self._queue:
+                self._queue.remove(job_id)
+        results_queue.put(results)
+
+    def _job_references(self, task):
+        """Snapshot of the pruning references for the task's days, current at the time it is handed out."""
+        if self._references is None:
+            return None
+        days, products = task[2], task[4]
+        return {(day, products): self._references[(day, products)]
+                for day in days if (day, products) in self._references}
+
+    def _dispatch(self, tasks):
+        evaluate, tasks = self._batch(tasks)
+        results_queue = Queue()
+        job_ids = []
+        with self._lock:
+            for task in tasks:
+                self._jobs[self._next_id] = (evaluate is _evaluate_batch, task, results_queue)
+                self._queue.append(self._next_id)
+                job_ids.append(self._next_id)
+                self._next_id += 1
+            self._lock.notify_all()
+        try:
+            for _ in range(len(tasks)):
+                yield from results_queue.get()
+        finally:
+            with self._lock:  # cancel what is left if the caller stopped early
+                for job_id in job_ids:
+                    self._jobs.pop(job_id, None)
+                    self._inflight.pop(job_id, None)
+                    if job_id in self._queue:
+                        self._queue.remove(job_id)
+
+
+def _is_loopback(host: str) -> bool:
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+def run_worker(address, persist: bool = True, authkey: bytes = None):
+    """Pulls and runs jobs from the coordinator at `address`, reconnecting between searches if `persist`."""
+    while True:
+        try:
+            conn = Client(address, authkey=authkey or AUTHKEY)
+        except (OSError, EOFError):
+            if not persist:
+                return
+            time.sleep(RETRY_DELAY)
+            continue
+        try:
+            _work(conn)
+        except (OSError, EOFError):
+            pass  # the coordinator went away
+        finally:
+            conn.close()
+        if not persist:
+            return
+        time.sleep(RETRY_DELAY)
+
+
+def _work(conn):
+    conn.send({"host": socket.gethostname(), "pid": os.getpid()})
+    setup = conn.recv()
+    if not os.path.isfile(setup["algo_path"]) or file_hash(setup["algo_path"]) != setup["algo_hash"]:
+        conn.send({"type": "error", "message": f"local {setup['algo_path']} differs from the coordinator's"})
+        return
+    references = {} if setup["prune"] else None  # updated in place with each job's snapshot
+    evaluation_pool._init_worker(setup["algo_path"], setup["days"], references, setup["max_drawdown"],
+                                 setup["isolation"], setup["sampling"])
+    request = {"type": "ready"}
+    while True:
+        conn.send(request)
+        job = conn.recv()
+        if job["type"] == "stop":
+            return
+        if references is not None:
+            references.clear()
+            references.update(job["references"])
+        try:
+            results = (_evaluate_batch if job["batched"] else _evaluate)(job["task"])
+        except Exception as e:
+            # a trader that raises would otherwise kill every worker the job is handed to in turn
+            results = _failed_results(job["task"], job["batched"], e)
+        request = {"type": "result", "job": job["id"], "results": results}
+
+
+def _failed_results(task, batched: bool, error: Exception) -> list:
+    """(index, result) of every candidate of a task, marked as failed with the error on its first day."""
+    indices, candidates, days, _, _ = task
+    if not batched:
+        indices, candidates = [indices], [candidates]
+    failed_day = evaluation_pool._failed_day(error)
+    return [(index, {"params": params, "pnl": 0, "per_day": {days[0]: failed_day}, "ticks": 0, "seconds": 0.0,
+                     "worker": evaluation_pool._worker_name(), "pruned": False, "failed": failed_day["failed"]})
+            for index, params in zip(indices, candidates)]
+
+
+if __name__ == "__main__":
+    # Usage: python distributed.py HOST:PORT [number of worker processes, defaults to the CPU count]
+    if len(sys.argv) < 2 or ":" not in sys.argv[1]:
+        print("Usage: python distributed.py HOST:PORT [processes]")
+        sys.exit(1)
+    if AUTHKEY is None:
+        print("Set the BACKTEST_AUTHKEY environment variable to the coordinator's shared secret.")
+        sys.exit(1)
+    host, port = sys.argv[1].rsplit(":", 1)
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    workers = [multiprocessing.Process(target=run_worker, args=((host, int(port)),)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    print(f"Started {processes} workers for {host}:{port}")
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
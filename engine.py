@@ -0,0 +1,769 @@
+# engine.py
+
+import io
+import os
+import sys
+import json
+import pickle
+import random
+import inspect
+import builtins
+import contextlib
+import importlib.util
+from pathlib import Path
+from importlib import import_module
+from matcher import match_buy_order, match_sell_order
+from tracer import null_span
+from stop_conditions import STOP_CHECK_EVERY
+from isolation import IsolatedTrader, TraderFailure
+from datamodel import TradingState, OrderDepth, Trade
+
+'''
+The backtesting engine shared by every entry point: the Backtest itself, algorithm loading and the
+result exports. The entry points only differ in where their trading states come from (see
+data_sources.py) and in their products and position limits:
+
+    from engine import Backtest, export_results
+    from data_sources import open_source
+
+    trading_states = open_source("bottle", round_number=2, day=0).load()
+    backtest = Backtest(trader_module.Trader(), trading_states)
+    backtest.run()
+    export_results(backtest, "results/round-2/day-0")
+
+main.py (historical data) and post-tester.py (post-round simulation data) are thin wrappers around
+this module, so a change to the engine applies to both.
+'''
+
+CHECKPOINT_VERSION = 4
+ENGINE_VERSION = "1"  # bump when a change to the engine alters backtest results (invalidates cached evaluations)
+PARAMETERS_FILE = "grid_search_data/parameters.txt"  # legacy parameter file read by older algorithms
+
+PRODUCTS = ["RAINFOREST_RESIN", "KELP", "SQUID_INK", "CROISSANTS", "DJEMBES", "JAMS", "PICNIC_BASKET1", "PICNIC_BASKET2",
+            "VOLCANIC_ROCK_VOUCHER_10000", "VOLCANIC_ROCK_VOUCHER_10250", "VOLCANIC_ROCK_VOUCHER_10500",
+            "VOLCANIC_ROCK_VOUCHER_9500", "VOLCANIC_ROCK_VOUCHER_9500", "VOLCANIC_ROCK"]
+
+RESIN = "RAINFOREST_RESIN"
+KELP = "KELP"
+SQUID_INK = "SQUID_INK"
+CROISSANTS = "CROISSANTS"
+DJEMBES = "DJEMBES"
+JAMS = "JAMS"
+PCB1 = "PICNIC_BASKET1"
+PCB2 = "PICNIC_BASKET2"
+VOLCANIC_ROCK = "VOLCANIC_ROCK"
+VOLCANIC_VOUCHER_10000 = "VOLCANIC_ROCK_VOUCHER_10000"
+VOLCANIC_VOUCHER_10250 = "VOLCANIC_ROCK_VOUCHER_10250"
+VOLCANIC_VOUCHER_10500 = "VOLCANIC_ROCK_VOUCHER_10500"
+VOLCANIC_VOUCHER_9500 = "VOLCANIC_ROCK_VOUCHER_9500"
+VOLCANIC_VOUCHER_9750 = "VOLCANIC_ROCK_VOUCHER_9500"
+
+CONSOLE_PRINT = False
+POSITION_LIMITS = {
+    RESIN: 50,
+    KELP: 50,
+    SQUID_INK: 50,
+    CROISSANTS: 250,
+    JAMS: 350,
+    DJEMBES: 60,
+    PCB1: 60,
+    PCB2: 100,
+    VOLCANIC_ROCK: 400,
+    VOLCANIC_VOUCHER_9500: 200,
+    VOLCANIC_VOUCHER_9750: 200,
+    VOLCANIC_VOUCHER_10000: 200,
+    VOLCANIC_VOUCHER_10250: 200,
+    VOLCANIC_VOUCHER_10500: 200
+}
+
+
+def restrict_trading_states(trading_states, products) -> list:
+    """
+    Returns the trading states with only the given products' listings, order depths, trades and
+    positions, e.g. to evaluate a per-product strategy on its own data streams. The order depths and
+    trades themselves are shared with the original states.
+    """
+    products = set(products)
+
+    def keep(d):
+        return {symbol: value for symbol, value in d.items() if symbol in products}
+
+    return [
+        TradingState(
+            traderData=s.traderData,
+            timestamp=s.timestamp,
+            listings=keep(s.listings),
+            order_depths=keep(s.order_depths),
+            own_trades=keep(s.own_trades),
+            market_trades=keep(s.market_trades),
+            position=keep(s.position),
+            observations=s.observations
+        ) for s in trading_states
+    ]
+
+
+def sample_trading_states(trading_states, every: int) -> list:
+    """
+    Returns every `every`-th trading state (and the last one, so the run ends on the same tick) for
+    coarse approximate runs. Each sampled state carries the market trades of every state since the
+    previous sampled one, so that orders still fill against all the trades printed in the gap.
+    """
+    if every <= 1:
+        return trading_states
+    indices = list(range(0, len(trading_states), every))
+    if indices and indices[-1] != len(trading_states) - 1:
+        indices.append(len(trading_states) - 1)
+    sampled = []
+    previous = -1
+    for i in indices:
+        market_trades = {}
+        for skipped in trading_states[previous + 1:i + 1]:
+            for symbol, trades in skipped.market_trades.items():
+                market_trades.setdefault(symbol, []).extend(trades)
+        s = trading_states[i]
+        sampled.append(TradingState(
+            traderData=s.traderData,
+            timestamp=s.timestamp,
+            listings=s.listings,
+            order_depths=s.order_depths,
+            own_trades=s.own_trades,
+            market_trades=market_trades,
+            position=s.position,
+            observations=s.observations
+        ))
+        previous = i
+    return sampled
+
+
+def parse_algorithm(algo_path: str):
+    algorithm_path = Path(algo_path).expanduser().resolve()
+    if not algorithm_path.is_file():
+        raise ModuleNotFoundError(f"{algorithm_path} is not a file.")
+    
+    sys.path.append(str(algorithm_path.parent))
+    return import_module(algorithm_path.stem)
+
+
+def load_fresh_algorithm(algo_path: str):
+    """
+    Executes the current contents of an algorithm file as a new module. Unlike `parse_algorithm`,
+    whose import_module keeps returning the module cached by the first import, this picks up edits
+    made to the file since.
+    """
+    algorithm_path = Path(algo_path).expanduser().resolve()
+    if not algorithm_path.is_file():
+        raise ModuleNotFoundError(f"{algorithm_path} is not a file.")
+    if str(algorithm_path.parent) not in sys.path:
+        sys.path.append(str(algorithm_path.parent))  # for the algorithm's own imports
+    spec = importlib.util.spec_from_file_location(algorithm_path.stem, algorithm_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[algorithm_path.stem] = module  # so that pickling the trader finds its class
+    # Compiled from source, as the bytecode cache only notices edits a second or more apart
+    exec(compile(algorithm_path.read_bytes(), str(algorithm_path), "exec"), module.__dict__)
+    return module
+
+
+def make_trader(trader_module, parameters: dict = None):
+    """
+    Creates a Trader with the given parameters. If the Trader constructor accepts a `parameters`
+    argument the dict is passed to it; otherwise each parameter overrides the module-level global
+    of the same name (e.g. THRESHOLD_HIGH), and a name that is not one raises KeyError.
+    """
+    if not parameters:
+        return trader_module.Trader()
+    if "parameters" in inspect.signature(trader_module.Trader).parameters:
+        return trader_module.Trader(parameters=parameters)
+    missing = [name for name in parameters if not hasattr(trader_module, name)]
+    if missing:
+        # setting them would silently evaluate the same trader for every candidate
+        raise KeyError(f"{', '.join(missing)} not a global of {trader_module.__name__}")
+    for name, value in parameters.items():
+        setattr(trader_module, name, value)
+    return trader_module.Trader()
+
+
+def reads_parameters_file(algo_path: str) -> bool:
+    """Whether an algorithm reads its parameters from the legacy grid_search_data/parameters.txt."""
+    return Path(PARAMETERS_FILE).name in Path(algo_path).expanduser().read_text()
+
+
+def load_algorithm_with_parameters(algo_path: str, parameters: dict):
+    """
+    Compatibility shim for algorithms that read grid_search_data/parameters.txt at import time.
+    Executes a fresh copy of the module while serving that file from memory with the given
+    parameters (comma-separated, in order), so parallel evaluations never share the file. Since each
+    call returns a separate module, it also isolates the globals of traders run side by side.
+    """
+    algorithm_path = Path(algo_path).expanduser().resolve()
+    parameters_path = Path(PARAMETERS_FILE).resolve()
+    line = ",".join(str(value) for value in parameters.values()) + "\n"
+    real_open = builtins.open
+
+    def open_with_parameters(file, *args, **kwargs):
+        if isinstance(file, (str, Path)) and Path(file).resolve() == parameters_path:
+            return io.StringIO(line)
+        return real_open(file, *args, **kwargs)
+
+    spec = importlib.util.spec_from_file_location(algorithm_path.stem, algorithm_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[algorithm_path.stem] = module
+    builtins.open = open_with_parameters
+    try:
+        # from source, like load_fresh_algorithm, so that edits are never hidden by the bytecode cache
+        exec(compile(algorithm_path.read_bytes(), str(algorithm_path), "exec"), module.__dict__)
+    finally:
+        builtins.open = real_open
+    return module
+
+
+def run_backtest(trader_module, trading_states, parameters: dict = None, until: int = None,
+                 isolation: dict = None, **kwargs) -> dict:
+    """
+    Runs a headless backtest of a loaded algorithm module (up to tick index `until` if given) and
+    returns its results. With `isolation` (IsolatedTrader keyword arguments, possibly empty), the
+    trader runs in a supervised process and a timeout or crash marks the run as failed.
+    """
+    trader = make_trader(trader_module, parameters)
+    if isolation is not None:
+        trader = IsolatedTrader(trader, **isolation)
+    try:
+        backtest = Backtest(trader, trading_states, record=False, **kwargs)
+        backtest.run(until=until)
+        return backtest.results()
+    finally:
+        if isolation is not None:
+            trader.close()
+
+
+def print_self_trade(trade):
+    if trade.seller == "SUBMISSION":
+        print(f"Sold {trade.quantity} {trade.symbol} at {trade.price}.")
+    elif trade.buyer == "SUBMISSION":
+        print(f"Bought {trade.quantity} {trade.symbol} at {trade.price}.")
+
+
+def copy_order_depths(order_depths):
+    """Copies order depths so that matching does not consume the loaded dataset."""
+    copies = {}
+    for symbol, order_depth in order_depths.items():
+        od = OrderDepth()
+        od.buy_orders = dict(order_depth.buy_orders)
+        od.sell_orders = dict(order_depth.sell_orders)
+        copies[symbol] = od
+    return copies
+
+
+def copy_market_trades(market_trades):
+    """Copies market trades so that matching does not consume the loaded dataset."""
+    return {
+        symbol: [Trade(t.symbol, t.price, t.quantity, t.buyer, t.seller, t.timestamp) for t in trades]
+        for symbol, trades in market_trades.items()
+    }
+
+
+def compute_mid_prices(raw_state) -> dict:
+    """Mid price of each listed product used for marking positions, -1 when a side of the book is empty."""
+    mid_prices = {}
+    for product in raw_state.listings:
+        if not raw_state.order_depths[product].buy_orders.keys() or \
+            not raw_state.order_depths[product].sell_orders.keys():
+                mid_prices[product] = -1
+        else:
+            mid_prices[product] = (min(raw_state.order_depths[product].sell_orders.keys()) + \
+                max(raw_state.order_depths[product].buy_orders.keys())) // 2
+    return mid_prices
+
+
+def capture_module_state(module) -> dict:
+    """
+    Returns the picklable data globals of an algorithm module (e.g. parameter dicts that the
+    strategies update at runtime), which are part of the trader's state but not of the instance.
+    """
+    captured = {}
+    for name, value in vars(module).items():
+        if name.startswith("__") or not isinstance(value, (dict, list, set, tuple, int, float, str)):
+            continue
+        try:
+            captured[name] = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            continue  # not picklable, hence not restorable
+    return captured
+
+
+def restore_module_state(module, captured: dict):
+    for name, value in captured.items():
+        setattr(module, name, pickle.loads(value))
+
+
+class Backtest:
+    """
+    A backtest of one trader over a list of trading states. Holds the tick cursor, positions,
+    traderData, the trader itself and every output buffer, so that a run can be checkpointed to
+    disk and resumed later with output identical to an uninterrupted run.
+
+    The loaded trading states are never modified: each tick matches against copies of the order
+    depths and of the next state's market trades. `products` and `position_limits` default to the
+    current round's PRODUCTS and POSITION_LIMITS.
+    """
+
+    def __init__(self, trader, trading_states, log_length=None, verbose=False, record=True,
+                 stop_conditions=None, check_every=STOP_CHECK_EVERY, products=None, position_limits=None,
+                 console_print=CONSOLE_PRINT):
+        self.products = products or PRODUCTS
+        self.position_limits = position_limits or POSITION_LIMITS
+        self.console_print = console_print  # let the trader print to the console instead of capturing its logs
+        self.trader = trader
+        self.trader.cash = {prod: 0 for prod in self.products}  # initial cash
+        self.trader.pnl = {prod: 0 for prod in self.products}  # initial pnl
+        self.trader.aggregate_cash = 0
+        self.trader.aggregate_pnl = 0
+        self.trading_states = trading_states
+        self.log_length = log_length
+        self.verbose = verbose
+        self.record = record  # headless runs (e.g. grid searches) skip the output buffers
+        
+        self.tick = 0  # index of the next trading state to process
+        self.finished = False
+        
+        # Containers for exporting CSVs and tracking PnL
+        self.market_conditions = []     # list of dicts for market conditions snapshot
+        self.trade_history = []         # list of dicts for each trade
+        self.sandbox_logs = []          # list to store sandbox logs
+        # Instead of a single list for aggregated pnl, record pnl per product.
+        self.per_product_pnl = {prod: [] for prod in self.products}
+        
+        # Variables to keep track of trader logs
+        self.position = {prod: 0 for prod in self.products}
+        self.trader_data = ""
+        self.next_market_trades = None  # market trades of the upcoming state, net of our fills
+        
+        # Optional instrumentation, not part of checkpoints
+        self.tracker = None
+        self.profiler = None
+        self.tracer = None
+        self.memory = None
+        
+        # Optional early stopping (see stop_conditions.py), checked every `check_every` ticks
+        self.stop_conditions = stop_conditions
+        self.check_every = check_every
+        self.pnl_path = []  # aggregate pnl at each check
+        self.pruned = None  # reason the run was stopped early, if it was
+        self.failed = None  # reason an isolated trader failed (see isolation.py), if it did
+    
+    def step(self) -> bool:
+        """Processes the next trading state. Returns False once the backtest is finished."""
+        if self.finished or self.tick >= len(self.trading_states):
+            self.finished = True
+            return False
+        
+        trader = self.trader
+        span = self.tracer.span if self.tracer else null_span
+        
+        i = self.tick
+        raw_state = self.trading_states[i]
+        raw_next_state = self.trading_states[i + 1] if i < len(self.trading_states) - 1 else None
+        timestamp = raw_state.timestamp
+        
+        if self.memory:
+            self.memory.sample(i, timestamp)
+        
+        mid_prices = compute_mid_prices(raw_state)
+        
+        if self.log_length and timestamp > self.log_length * 100:
+            self.finished = True
+            return False
+        
+        if self.tracer:
+            self.tracer.begin("tick", timestamp=timestamp)
+        
+        # Update the state with newest trader data
+        state = TradingState(
+            traderData=self.trader_data,  # traderData from previous run
+            timestamp=timestamp,
+            listings=raw_state.listings,
+            order_depths=copy_order_depths(raw_state.order_depths),
+            own_trades=raw_state.own_trades,
+            market_trades=self.next_market_trades if self.next_market_trades is not None \
+                else copy_market_trades(raw_state.market_trades),
+            position=self.position,
+            observations=raw_state.observations
+        )
+        next_state = None
+        if raw_next_state is not None:
+            next_state = TradingState(
+                traderData="",
+                timestamp=raw_next_state.timestamp,
+                listings=raw_next_state.listings,
+                order_depths=raw_next_state.order_depths,
+                own_trades=raw_next_state.own_trades,
+                market_trades=copy_market_trades(raw_next_state.market_trades),
+                position={},
+                observations=raw_next_state.observations
+            )
+        
+        with span("run"):
+            result, conversions, traderData, lambda_log = self.call_trader(state)
+        self.trader_data = traderData
+        
+        if self.tracker and self.tracker.record(timestamp, traderData) and self.verbose:
+            print(f"[{timestamp}] traderData is {len(traderData)} chars, close to the {self.tracker.limit} char limit.")
+        
+        if self.record:
+            self.sandbox_logs.append({
+                "sandboxLog": "",
+                "lambdaLog": lambda_log,
+                "timestamp": timestamp
+            })
+        
+        with span("match"):
+            traded, all_trades_executed = self.execute_orders(state, next_state, result)
+        
+        with span("account"):
+            self.mark_to_market(mid_prices, timestamp)
+            
+            if traded and self.log_length and timestamp < self.log_length * 100:
+                print(f"[{timestamp}]")
+                for trade in all_trades_executed:
+                    print_self_trade(trade)
+                print(f"Positions: {state.position}")
+                print(f"Cash: {trader.aggregate_cash}")
+                print(f"PNL: {trader.aggregate_pnl}\n")
+        
+        if self.record:
+            with span("snapshot"):
+                self.record_market_conditions(state)
+        
+        if self.tracer:
+            self.tracer.end()
+        
+        self.next_market_trades = next_state.market_trades if next_state else None
+        self.tick += 1
+        return True
+    
+    def call_trader(self, state):
+        """Runs the trader on a state, capturing its stdout. Returns (orders, conversions, traderData, log)."""
+        with self.tracker.measure(state.traderData) if self.tracker else contextlib.nullcontext(), \
+                self.profiler.active() if self.profiler else contextlib.nullcontext():
+            if self.console_print:
+                result, conversions, traderData = self.trader.run(state)
+                lambda_log = ""
+            else:
+                lambda_buffer = io.StringIO()
+                with contextlib.redirect_stdout(lambda_buffer):  # redirect stdout to buffer
+                    result, conversions, traderData = self.trader.run(state)
+                lambda_log = lambda_buffer.getvalue()
+        return result, conversions, traderData, lambda_log
+    
+    def execute_orders(self, state, next_state, result) -> tuple:
+        """
+        Matches the trader's orders against the book of `state` and the market trades of
+        `next_state`, both of which are consumed. Returns (traded, executed trades).
+        """
+        trader = self.trader
+        position = self.position
+        timestamp = state.timestamp
+        traded = False
+        all_trades_executed = []
+        
+        for product, orders_list in result.items():
+            current_position = position.get(product, 0)
+            total_buy = sum(order.quantity for order in orders_list if order.quantity > 0)
+            total_sell = sum(-order.quantity for order in orders_list if order.quantity < 0)
+            pos_limit = self.position_limits.get(product, 0)
+
+            if current_position + total_buy > pos_limit or current_position - total_sell < -pos_limit:
+                if self.verbose:
+                    print(f"[{timestamp}] Position limit exceeded for {product}. Cancelling all orders.")
+                continue
+
+            # Process each order by matching against order depths
+            for order in orders_list:
+                trades_executed = []
+                if order.quantity > 0:  # buy order
+                    trades_executed = match_buy_order(state, next_state, order)
+                    total_filled = sum(trade.quantity for trade in trades_executed)
+                    position[product] = position.get(product, 0) + total_filled  # update trader position
+                    cash_change = -sum(trade.price * trade.quantity for trade in trades_executed)
+                    trader.cash[product] += cash_change  # update cash
+                    trader.aggregate_cash += cash_change  # update cash
+                elif order.quantity < 0:  # sell order
+                    trades_executed = match_sell_order(state, next_state, order)
+                    total_filled = sum(trade.quantity for trade in trades_executed)
+                    position[product] = position.get(product, 0) - total_filled  # update trader position
+                    cash_change = sum(trade.price * trade.quantity for trade in trades_executed)
+                    trader.cash[product] += cash_change
+                    trader.aggregate_cash += cash_change  # update cash
+
+                # Record each executed trade in the trade history
+                if self.record:
+                    for trade in trades_executed:
+                        self.trade_history.append({
+                            "timestamp": trade.timestamp,
+                            "buyer": trade.buyer,
+                            "seller": trade.seller,
+                            "symbol": trade.symbol,
+                            "currency": "SEASHELLS",
+                            "price": trade.price,
+                            "quantity": trade.quantity
+                        })
+
+                if trades_executed:
+                    all_trades_executed.extend(trades_executed)
+
+                if self.log_length and trades_executed and timestamp < self.log_length * 100:
+                    traded = True
+                    if self.verbose:
+                        print(f"Executed trades for order {order}: {trades_executed}")
+        return traded, all_trades_executed
+    
+    def mark_to_market(self, mid_prices: dict, timestamp: int):
+        """Values cash and positions at the mid prices and records per-product pnl."""
+        trader = self.trader
+        trader.pnl = trader.cash.copy()
+        trader.aggregate_pnl = trader.aggregate_cash
+        
+        for product, pos in self.position.items():
+            if not pos:
+                continue  # flat products need no mid price (they may be absent from restricted states)
+            trader.pnl[product] += pos * mid_prices[product]
+            trader.aggregate_pnl += pos * mid_prices[product]
+        
+        # Record pnl for each product over time
+        if self.record:
+            for product in self.products:
+                self.per_product_pnl[product].append((timestamp, trader.pnl.get(product, 0)))
+    
+    def record_market_conditions(self, state):
+        """Appends a market condition snapshot (top 3 levels and mid price) for each product."""
+        trader = self.trader
+        for product in self.products:
+            day = -1
+            ts = state.timestamp
+            od = state.order_depths.get(product, None)
+            if od is not None:
+                bids = sorted(od.buy_orders.items(), key=lambda x: x[0], reverse=True)  # top 3 bids
+                asks = sorted(od.sell_orders.items(), key=lambda x: x[0])  # top 3 asks
+            else:
+                bids = []
+                asks = []
+            
+            bid_price_1, bid_vol_1 = bids[0] if len(bids) > 0 else ("", "")
+            bid_price_2, bid_vol_2 = bids[1] if len(bids) > 1 else ("", "")
+            bid_price_3, bid_vol_3 = bids[2] if len(bids) > 2 else ("", "")
+
+            ask_price_1, ask_vol_1 = asks[0] if len(asks) > 0 else ("", "")
+            ask_price_2, ask_vol_2 = asks[1] if len(asks) > 1 else ("", "")
+            ask_price_3, ask_vol_3 = asks[2] if len(asks) > 2 else ("", "")
+            
+            if bids and asks:
+                mid_price = (bids[0][0] + asks[0][0]) / 2.0
+            else:
+                mid_price = ""
+            
+            self.market_conditions.append({
+                "day": day,
+                "timestamp": ts,
+                "product": product,
+                "bid_price_1": bid_price_1,
+                "bid_volume_1": bid_vol_1,
+                "bid_price_2": bid_price_2,
+                "bid_volume_2": bid_vol_2,
+                "bid_price_3": bid_price_3,
+                "bid_volume_3": bid_vol_3,
+                "ask_price_1": ask_price_1,
+                "ask_volume_1": ask_vol_1,
+                "ask_price_2": ask_price_2,
+                "ask_volume_2": ask_vol_2,
+                "ask_price_3": ask_price_3,
+                "ask_volume_3": ask_vol_3,
+                "mid_price": mid_price,
+                "profit_and_loss": trader.aggregate_pnl
+            })
+    
+    def run(self, checkpoint_every: int = None, checkpoint_path: str = None, until: int = None):
+        """
+        Runs the backtest to completion (or until tick index `until`, or until a stop condition
+        prunes it or an isolated trader fails), optionally checkpointing every `checkpoint_every` ticks.
+        """
+        while until is None or self.tick < until:
+            try:
+                if not self.step():
+                    break
+            except TraderFailure as e:
+                self.failed = str(e)
+                break
+            if self.check_stop_conditions():
+                break
+            if checkpoint_every and self.tick % checkpoint_every == 0:
+                self.save_checkpoint(checkpoint_path)
+    
+    def check_stop_conditions(self) -> bool:
+        """Evaluates the stop conditions on check ticks. Returns True if the run was pruned."""
+        if not self.stop_conditions or self.tick % self.check_every:
+            return False
+        self.pnl_path.append(self.trader.aggregate_pnl)
+        for condition in self.stop_conditions:
+            reason = condition(self)
+            if reason:
+                self.pruned = reason
+                return True
+        return False
+    
+    def results(self) -> dict:
+        """Summary of the backtest so far."""
+        return {
+            "pnl": self.trader.aggregate_pnl,
+            "per_product_pnl": dict(self.trader.pnl),
+            "position": dict(self.position),
+            "ticks": self.tick,
+            "finished": self.finished,
+            "pruned": self.pruned,
+            "failed": self.failed,
+            "pnl_path": list(self.pnl_path)
+        }
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # The dataset is reloaded on resume; instrumentation and stop conditions are per process
+        for key in ["trading_states", "tracker", "profiler", "tracer", "memory", "stop_conditions"]:
+            state[key] = None
+        state["random_state"] = random.getstate()
+        state["module_state"] = capture_module_state(sys.modules[type(self.trader).__module__])
+        return state
+    
+    def __setstate__(self, state):
+        random.setstate(state.pop("random_state"))
+        restore_module_state(sys.modules[type(state["trader"]).__module__], state.pop("module_state"))
+        self.__dict__.update(state)
+    
+    def save_checkpoint(self, path: str):
+        """Atomically writes the full state of the backtest (except the dataset) to `path`."""
+        if self.tracer:
+            self.tracer.unwrap_trader(self.trader)
+        try:
+            temp_path = path + ".tmp"
+            with open(temp_path, "wb") as f:
+                pickle.dump({
+                    "version": CHECKPOINT_VERSION,
+                    "num_states": len(self.trading_states),
+                    "backtest": self
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        finally:
+            if self.tracer:
+                self.tracer.wrap_trader(self.trader)
+    
+    @staticmethod
+    def load_checkpoint(path: str, trading_states):
+        """
+        Restores a backtest saved by `save_checkpoint`. The algorithm module must already be
+        importable (see `parse_algorithm`) so that the pickled trader can be restored.
+        """
+        with open(path, "rb") as f:
+            checkpoint = pickle.load(f)
+        if checkpoint["version"] != CHECKPOINT_VERSION:
+            raise ValueError(f"Checkpoint version {checkpoint['version']} is not supported.")
+        if checkpoint["num_states"] != len(trading_states):
+            raise ValueError("Checkpoint was created from a different dataset.")
+        backtest = checkpoint["backtest"]
+        backtest.trading_states = trading_states
+        return backtest
+
+
+def plot_pnl(per_product_pnl_over_time, results_dir, show: bool = True):
+    """
+    Plots the PnL over time for each product on the same axes.
+    """
+    import matplotlib.pyplot as plt  # deferred, as importing it takes longer than the rest of the startup
+    if not per_product_pnl_over_time:
+        print("No PnL data available to plot.")
+        return
+
+    plt.figure(figsize=(10, 6))
+    for product, pnl_data in per_product_pnl_over_time.items():
+        if pnl_data:
+            timestamps, pnl_values = zip(*pnl_data)
+            plt.plot(timestamps, pnl_values, marker="o", markersize=2, label=product)
+    plt.xlabel("Timestamp")
+    plt.ylabel("Profit and Loss")
+    plt.title("PnL Over Time per Product")
+    plt.xticks(rotation=45)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(f"{results_dir}/pnl_over_time.png")
+    if show:
+        plt.show()
+
+
+def export_results(backtest, results_dir):
+    """Writes the orderbook, trade history and combined logs of a finished backtest."""
+    import pandas as pd  # deferred, as headless runs never export
+    trader = backtest.trader
+    market_conditions = backtest.market_conditions
+    trade_history_list = backtest.trade_history
+    sandbox_logs = backtest.sandbox_logs
+    
+    # Export market conditions and trade history to CSV files with semicolon delimiter
+    if not os.path.exists(results_dir):
+        os.makedirs(results_dir)
+    market_conditions_df = pd.DataFrame(market_conditions)
+    market_conditions_df = market_conditions_df[[
+        "day", "timestamp", "product",
+        "bid_price_1", "bid_volume_1", "bid_price_2", "bid_volume_2", "bid_price_3", "bid_volume_3",
+        "ask_price_1", "ask_volume_1", "ask_price_2", "ask_volume_2", "ask_price_3", "ask_volume_3",
+        "mid_price", "profit_and_loss"
+    ]]
+    market_conditions_df.to_csv(f"{results_dir}/orderbook.csv", sep=";", index=False)
+    
+    trade_history_df = pd.DataFrame(trade_history_list)
+    if not trade_history_df.empty:
+        trade_history_df = trade_history_df[["timestamp", "buyer", "seller", "symbol", "currency", "price", "quantity"]]
+    trade_history_df.to_csv(f"{results_dir}/trade_history.csv", sep=";", index=False)
+    
+    print("-----------------------------------------------------------------------------------")
+    print("TOTAL PNL:", trader.aggregate_pnl)
+    for product, pnl in trader.pnl.items():
+        print(f"  {product}: {pnl}")
+    print("Exported orderbook.csv and trade_history.csv.")
+    if backtest.tracker:
+        backtest.tracker.print_summary()
+    if backtest.profiler:
+        backtest.profiler.print_summary()
+    print("-----------------------------------------------------------------------------------")
+    
+    combined_logs_path = f"{results_dir}/combined_results.log"
+    with open(combined_logs_path, "w") as f:
+        # Sandbox logs section
+        f.write("Sandbox logs:\n")
+        for log in sandbox_logs:
+            f.write(json.dumps(log, indent=2) + "\n")
+        f.write("\n")
+        
+        # Activities logs section
+        f.write("Activities log:\n")
+        header = ("day;timestamp;product;bid_price_1;bid_volume_1;bid_price_2;bid_volume_2;"
+                  "bid_price_3;bid_volume_3;ask_price_1;ask_volume_1;ask_price_2;ask_volume_2;"
+                  "ask_price_3;ask_volume_3;mid_price;profit_and_loss\n")
+        f.write(header)
+        for cond in market_conditions:
+            line = (f"{cond['day']};{cond['timestamp']};{cond['product']};"
+                    f"{cond['bid_price_1']};{cond['bid_volume_1']};"
+                    f"{cond['bid_price_2']};{cond['bid_volume_2']};"
+                    f"{cond['bid_price_3']};{cond['bid_volume_3']};"
+                    f"{cond['ask_price_1']};{cond['ask_volume_1']};"
+                    f"{cond['ask_price_2']};{cond['ask_volume_2']};"
+                    f"{cond['ask_price_3']};{cond['ask_volume_3']};"
+                    f"{cond['mid_price']};{cond['profit_and_loss']}\n")
+            f.write(line)
+        f.write("\n")
+        
+        # Trade history section
+        f.write("Trade History:\n")
+        f.write(json.dumps(trade_history_list, indent=2))
+    
+    if backtest.tracker:
+        backtest.tracker.export_csv(f"{results_dir}/trader_data.csv")
+    if backtest.profiler:
+        backtest.profiler.export_collapsed(f"{results_dir}/profile.collapsed")
+    if backtest.tracer:
+        backtest.tracer.export(f"{results_dir}/trace.json")
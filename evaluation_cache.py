@@ -0,0 +1,78 @@
+# evaluation_cache.py
+
+import json
+import time
+import sqlite3
+import hashlib
+from pathlib import Path
+
+CACHE_PATH = "grid_search_data/evaluations.sqlite"
+SCHEMA_VERSION = 2  # caches written with another schema are discarded
+
+
+def file_hash(path: str) -> str:
+    return hashlib.sha256(Path(path).expanduser().read_bytes()).hexdigest()
+
+
+def params_key(params: dict) -> str:
+    return json.dumps(params, sort_keys=True)
+
+
+def products_key(products) -> str:
+    """'' for a run on every product, otherwise the sorted product names."""
+    return ",".join(sorted(products)) if products else ""
+
+
+class EvaluationCache:
+    """
+    Persistent cache of per-day backtest results, keyed on (algorithm file hash, parameters, round,
+    day, fraction of the day, products the day was restricted to, engine version). Every result is
+    committed as soon as it arrives, so an interrupted search resumes where it stopped and
+    re-running a search skips the points it has seen.
+    """
+
+    def __init__(self, path: str = CACHE_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.connection.execute("DROP TABLE IF EXISTS evaluations")
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS evaluations (
+                algo_hash TEXT NOT NULL,
+                params TEXT NOT NULL,
+                round INTEGER NOT NULL,
+                day INTEGER NOT NULL,
+                fraction REAL NOT NULL,
+                products TEXT NOT NULL,
+                engine_version TEXT NOT NULL,
+                pnl REAL NOT NULL,
+                results TEXT NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (algo_hash, params, round, day, fraction, products, engine_version)
+            )
+        """)
+        self.connection.commit()
+
+    def get(self, algo_hash: str, params: dict, round_number: int, day: int, fraction: float,
+            products, engine_version: str) -> dict:
+        """Returns the cached results of one day, or None."""
+        row = self.connection.execute(
+            "SELECT results FROM evaluations WHERE algo_hash = ? AND params = ? AND round = ? AND day = ? "
+            "AND fraction = ? AND products = ? AND engine_version = ?",
+            (algo_hash, params_key(params), round_number, day, fraction or 1.0, products_key(products),
+             engine_version)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, algo_hash: str, params: dict, round_number: int, day: int, fraction: float,
+            products, engine_version: str, results: dict):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (algo_hash, params_key(params), round_number, day, fraction or 1.0, products_key(products),
+             engine_version, results["pnl"], json.dumps(results), time.time())
+        )
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,403 @@
+# evaluation_pool.py
+
+import os
+import time
+import socket
+import traceback
+import multiprocessing
+from engine import (parse_algorithm, run_backtest, capture_module_state, restore_module_state, reads_parameters_file,
+                    load_algorithm_with_parameters, restrict_trading_states, sample_trading_states, ENGINE_VERSION)
+from data_sources import load_trading_states, trading_states_path, ROUND_NUMBER
+from evaluation_cache import EvaluationCache, file_hash, CACHE_PATH
+from lockstep import LockstepBacktest, make_isolated_traders
+from stop_conditions import TrailingBest, MaxDrawdown
+from search_progress import SearchProgress, STATUS_PATH
+
+'''
+Process pool for parameter searches. Each worker imports the algorithm and loads the trading
+states of every requested day once at startup, then evaluates candidates in-process.
+
+A candidate is a dict of parameters, passed to the trader by `engine.make_trader`: through the
+`parameters` argument of the Trader constructor if it has one, otherwise as module-level globals of
+the algorithm (e.g. {"THRESHOLD_HIGH": 2.5}). Either way each evaluation starts from a pristine copy
+of the module's globals, regardless of what previous ones changed. Algorithms that still read
+grid_search_data/parameters.txt are re-executed per evaluation with that file served from memory.
+
+Per-day results are stored in a persistent cache (see evaluation_cache.py) as they arrive, and only
+the (candidate, day) pairs missing from it are sent to the workers. Interrupting a search with
+Ctrl-C loses at most the evaluations in flight; running it again picks up from there.
+
+With `products`, each day is restricted to those products' data streams (see
+engine.restrict_trading_states), for strategies whose parameters only affect some products.
+
+With `lockstep=N`, each task backtests up to N candidates in a single pass over each day (see
+lockstep.py) instead of one pass per candidate.
+
+With `prune=True` (the default), the pool shares the pnl path of the best run so far on each day
+with the workers, and candidates trailing it by a wide margin are stopped early (see
+stop_conditions.py). `max_drawdown` additionally stops candidates with a large drawdown. Pruned
+results are marked with `"pruned"`, ranked below complete ones and not cached; once a candidate
+is pruned on one day, its remaining days are skipped.
+
+With `isolation` (IsolatedTrader keyword arguments, e.g. {"tick_timeout": 0.5}, or {} for the
+defaults), each backtest runs the trader in a supervised process (see isolation.py). A candidate
+whose trader times out, raises or exceeds its memory cap is marked with `"failed"` and the reason,
+ranked below every other result and not cached, and the search carries on. Without isolation, a
+trader that raises is marked failed the same way; one that hangs or crashes its process is not.
+
+With `sampling=k`, workers only feed the trader every k-th tick of each day (see
+engine.sample_trading_states), for fast approximate scans. Sampled results are not cached; see
+sampling.py for how far they are from full runs.
+
+Progress (evaluations per second, ETA, best so far, per-worker throughput and utilization) is
+written to grid_search_data/status.json every few seconds (see search_progress.py).
+'''
+
+# Per-worker state, set by _init_worker
+_algo_path = None
+_algo_module = None
+_module_state = None
+_legacy_parameters_file = False
+_datasets = {}
+_restricted = {}  # (day, products) -> trading states restricted to those products
+_references = None  # shared (day, products) -> pnl path of the best run so far, when pruning
+_max_drawdown = None
+_isolation = None  # IsolatedTrader keyword arguments, when traders run in supervised processes
+
+
+def _init_worker(algo_path, days, references=None, max_drawdown=None, isolation=None, sampling=None):
+    global _algo_path, _algo_module, _module_state, _legacy_parameters_file, _references, _max_drawdown, _isolation
+    _algo_path = algo_path
+    _references = references
+    _max_drawdown = max_drawdown
+    _isolation = isolation
+    _algo_module = parse_algorithm(algo_path)
+    _module_state = capture_module_state(_algo_module)
+    _legacy_parameters_file = reads_parameters_file(algo_path)
+    for day in days:
+        _datasets[day] = load_trading_states(trading_states_path(day))
+        if sampling:
+            _datasets[day] = sample_trading_states(_datasets[day], sampling)
+
+
+def _dataset(day, products=None):
+    if not products:
+        return _datasets[day]
+    key = (day, tuple(sorted(products)))
+    if key not in _restricted:
+        _restricted[key] = restrict_trading_states(_datasets[day], products)
+    return _restricted[key]
+
+
+def _worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _stop_conditions(day, products=None) -> list:
+    conditions = []
+    if _references is not None:
+        conditions.append(TrailingBest(lambda: _references.get((day, products))))
+    if _max_drawdown is not None:
+        conditions.append(MaxDrawdown(_max_drawdown))
+    return conditions or None
+
+
+def _is_pruned(per_day: dict) -> bool:
+    return any(result.get("pruned") for result in per_day.values())
+
+
+def _failure(per_day: dict):
+    """The reason the first failed day failed, or None."""
+    return next((result["failed"] for result in per_day.values() if result.get("failed")), None)
+
+
+def _failed_day(error: Exception) -> dict:
+    """Per-day result of a backtest whose trader raised, like an isolated trader's failure."""
+    return {"pnl": 0, "per_product_pnl": {}, "position": {}, "ticks": 0, "finished": False, "pruned": None,
+            "failed": f"trader raised {traceback.format_exception_only(error)[-1].strip()}", "pnl_path": []}
+
+
+def _backtest_day(params: dict, day, fraction: float = None, products=None) -> dict:
+    """Backtests one candidate on one day, from a pristine module state."""
+    dataset = _dataset(day, products)
+    until = int(len(dataset) * fraction) if fraction else None
+    stop_conditions = _stop_conditions(day, products)
+    try:
+        if _legacy_parameters_file:
+            module = load_algorithm_with_parameters(_algo_path, params)
+            return run_backtest(module, dataset, until=until, isolation=_isolation, stop_conditions=stop_conditions)
+        restore_module_state(_algo_module, _module_state)
+        return run_backtest(_algo_module, dataset, params, until=until, isolation=_isolation,
+                            stop_conditions=stop_conditions)
+    except Exception as e:
+        return _failed_day(e)
+
+
+def evaluate_candidate(params: dict, days, fraction: float = None, products=None) -> dict:
+    """
+    Backtests one candidate on each day (headless) and returns the total and per-day results.
+    With `fraction`, only the first `fraction` of each day's ticks is backtested; with `products`,
+    only those products' data streams are.
+    """
+    start = time.perf_counter()
+    per_day = {}
+    for day in days:
+        per_day[day] = _backtest_day(params, day, fraction, products)
+        if per_day[day]["pruned"] or per_day[day]["failed"]:
+            break
+    return {
+        "params": params,
+        "pnl": sum(result["pnl"] for result in per_day.values()),
+        "per_day": per_day,
+        "ticks": sum(result["ticks"] for result in per_day.values()),
+        "seconds": time.perf_counter() - start,
+        "worker": _worker_name(),
+        "pruned": _is_pruned(per_day),
+        "failed": _failure(per_day)
+    }
+
+
+def evaluate_batch(candidates: list, days, fraction: float = None, products=None) -> list:
+    """
+    Like `evaluate_candidate` for several candidates, backtested in lockstep on each day. If a
+    trader raises, the candidates of that day are backtested one by one instead, so that only the
+    one that raised is marked failed.
+    """
+    start = time.perf_counter()
+    per_day = [{} for _ in candidates]
+    for day in days:
+        remaining = [k for k, candidate_per_day in enumerate(per_day)
+                     if not _is_pruned(candidate_per_day) and not _failure(candidate_per_day)]
+        if not remaining:
+            break
+        dataset = _dataset(day, products)
+        until = int(len(dataset) * fraction) if fraction else None
+        try:
+            traders = make_isolated_traders(_algo_path, [candidates[k] for k in remaining])
+            lockstep = LockstepBacktest(traders, dataset, stop_conditions=_stop_conditions(day, products))
+            lockstep.run(until=until)
+            day_results = lockstep.results()
+        except Exception:
+            day_results = [_backtest_day(candidates[k], day, fraction, products) for k in remaining]
+        for k, result in zip(remaining, day_results):
+            per_day[k][day] = result
+    seconds = (time.perf_counter() - start) / len(candidates)
+    return [
+        {
+            "params": params,
+            "pnl": sum(result["pnl"] for result in candidate_per_day.values()),
+            "per_day": candidate_per_day,
+            "ticks": sum(result["ticks"] for result in candidate_per_day.values()),
+            "seconds": seconds,
+            "worker": _worker_name(),
+            "pruned": _is_pruned(candidate_per_day),
+            "failed": _failure(candidate_per_day)
+        }
+        for params, candidate_per_day in zip(candidates, per_day)
+    ]
+
+
+def _evaluate(task):
+    index, params, days, fraction, products = task
+    return [(index, evaluate_candidate(params, days, fraction, products))]
+
+
+def _evaluate_batch(task):
+    indices, candidates, days, fraction, products = task
+    return list(zip(indices, evaluate_batch(candidates, days, fraction, products)))
+
+
+def _combine(params: dict, days: list, per_day: dict, cached: int, seconds: float = 0.0, worker: int = None) -> dict:
+    per_day = {day: per_day[day] for day in days if day in per_day}  # days after a pruned or failed one are skipped
+    return {
+        "params": params,
+        "pnl": sum(result["pnl"] for result in per_day.values()),
+        "per_day": per_day,
+        "ticks": sum(result["ticks"] for result in per_day.values()),
+        "seconds": seconds,
+        "worker": worker,
+        "cached_days": cached,
+        "pruned": _is_pruned(per_day),
+        "failed": _failure(per_day)
+    }
+
+
+def rank_key(result: dict):
+    """Sort key ranking complete results by pnl, above every pruned result, above every failed result."""
+    return not result.get("failed"), not result.get("pruned"), result["pnl"]
+
+
+class EvaluationPool:
+    """
+    Evaluates candidates across a pool of worker processes:
+
+        with EvaluationPool("algorithms/algo.py", days=[0, 1, 2]) as pool:
+            for result in pool.imap(candidates):
+                print(result["pnl"], result["params"])
+    """
+
+    def __init__(self, algo_path: str, days=(0, 1, 2), processes: int = None, cache_path: str = CACHE_PATH,
+                 lockstep: int = None, prune: bool = True, max_drawdown: float = None,
+                 status_path: str = STATUS_PATH, isolation: dict = None, sampling: int = None):
+        """
+        `cache_path=None` disables the evaluation cache; `lockstep=N` batches N candidates per pass;
+        `prune=False` disables stopping candidates that trail the best one; `status_path=None`
+        disables the progress file; `isolation` runs traders in supervised processes; `sampling=k`
+        only backtests every k-th tick.
+        """
+        if isolation is not None and lockstep and lockstep > 1:
+            raise ValueError("Isolated traders cannot be backtested in lockstep.")
+        self.algo_path = algo_path
+        self.days = list(days)
+        self.processes = processes or os.cpu_count() or 1
+        self.cache_path = None if sampling and sampling > 1 else cache_path  # the cache key has no sampling
+        self.lockstep = lockstep
+        self.prune = prune
+        self.max_drawdown = max_drawdown
+        self.status_path = status_path
+        self.isolation = isolation
+        self.sampling = sampling
+        self.algo_hash = file_hash(algo_path)
+        self._progress = None
+        self._pool = None
+        self._cache = None
+        self._manager = None
+        self._references = None
+
+    def __enter__(self):
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        if self.prune:
+            self._manager = context.Manager()
+            self._references = self._manager.dict()
+        self._pool = context.Pool(self.processes, _init_worker,
+                                  (self.algo_path, self.days, self._references, self.max_drawdown, self.isolation,
+                                   self.sampling))
+        if self.cache_path:
+            self._cache = EvaluationCache(self.cache_path)
+        self._start_progress(self.processes)
+        return self
+
+    def __exit__(self, *exc):
+        self._stop_progress(exc)
+        self._pool.terminate()
+        self._pool.join()
+        self._pool = None
+        if self._manager:
+            self._manager.shutdown()
+            self._manager = None
+            self._references = None
+        if self._cache:
+            self._cache.close()
+            self._cache = None
+        return False
+
+    def _start_progress(self, workers):
+        if self.status_path:
+            self._progress = SearchProgress(self.status_path, workers)
+            self._progress.begin()
+
+    def _stop_progress(self, exc):
+        if self._progress:
+            self._progress.close("finished" if exc[0] is None else "interrupted")
+            self._progress = None
+
+    def _days(self, days):
+        days = self.days if days is None else list(days)
+        if not set(days) <= set(self.days):
+            raise ValueError(f"Days {days} are not all loaded by this pool ({self.days}).")
+        return days
+
+    def _lookup(self, params, days, fraction, products) -> dict:
+        if not self._cache:
+            return {}
+        cached = {}
+        for day in days:
+            result = self._cache.get(self.algo_hash, params, ROUND_NUMBER, day, fraction, products,
+                                     ENGINE_VERSION)
+            if result is not None:
+                cached[day] = result
+        return cached
+
+    def _update_references(self, per_day: dict, products):
+        """Makes a complete run the pruning reference of its day if it got further or did better."""
+        if self._references is None:
+            return
+        for day, result in per_day.items():
+            path = result.get("pnl_path")
+            if not path or result.get("pruned") or result.get("failed"):
+                continue
+            reference = self._references.get((day, products))
+            if not reference or len(path) > len(reference) or \
+                    (len(path) == len(reference) and path[-1] > reference[-1]):
+                self._references[(day, products)] = path
+
+    def _results(self, candidates, days, fraction, products):
+        """Yields (candidate index, result) in completion order, cached candidates first."""
+        days = self._days(days)
+        products = tuple(sorted(products)) if products else None
+        candidates = list(candidates)
+        if self._progress:
+            self._progress.submit(len(candidates))
+        tasks = []
+        cached = {}
+        for index, params in enumerate(candidates):
+            cached[index] = self._lookup(params, days, fraction, products)
+            missing = [day for day in days if day not in cached[index]]
+            self._update_references(cached[index], products)
+            if missing:
+                tasks.append((index, params, missing, fraction, products))
+            else:
+                result = _combine(params, days, cached[index], len(days))
+                if self._progress:
+                    self._progress.record(result)
+                yield index, result
+        for index, result in self._dispatch(tasks):
+            self._update_references(result["per_day"], products)
+            if self._cache:
+                for day, day_result in result["per_day"].items():
+                    if day_result["pruned"] or day_result.get("failed"):
+                        continue  # depends on the best run or the machine's load at the time, not only on the key
+                    self._cache.put(self.algo_hash, result["params"], ROUND_NUMBER, day, fraction, products,
+                                    ENGINE_VERSION, day_result)
+            per_day = {**cached[index], **result["per_day"]}
+            combined = _combine(result["params"], days, per_day, len(cached[index]), result["seconds"],
+                                result["worker"])
+            if self._progress:
+                self._progress.record(combined, evaluated=result)
+            yield index, combined
+
+    def _dispatch(self, tasks):
+        """Runs (index, params, days, fraction, products) tasks, yielding (index, result) in completion order."""
+        evaluate, tasks = self._batch(tasks)
+        for results in self._pool.imap_unordered(evaluate, tasks):
+            yield from results
+
+    def _batch(self, tasks):
+        """Returns the task function and the tasks, grouped into lockstep batches if enabled."""
+        if self.lockstep and self.lockstep > 1:
+            batches = {}  # candidates missing the same days can share a pass
+            for index, params, days, fraction, products in tasks:
+                batches.setdefault((tuple(days), fraction, products), []).append((index, params))
+            tasks = [
+                ([index for index, _ in batch[k:k + self.lockstep]],
+                 [params for _, params in batch[k:k + self.lockstep]], list(days), fraction, products)
+                for (days, fraction, products), batch in batches.items()
+                for k in range(0, len(batch), self.lockstep)
+            ]
+            return _evaluate_batch, tasks
+        return _evaluate, tasks
+
+    def imap(self, candidates, days=None, fraction: float = None, products=None):
+        """
+        Yields results in completion order. `days` (a subset of the pool's days) and `fraction`
+        (of each day's ticks) restrict the evaluation to a smaller budget, `products` to the data
+        streams of those products.
+        """
+        for _, result in self._results(candidates, days, fraction, products):
+            yield result
+
+    def map(self, candidates, days=None, fraction: float = None, products=None) -> list:
+        """Returns results in the order of the candidates. See `imap` for the other arguments."""
+        results = dict(self._results(candidates, days, fraction, products))
+        return [results[index] for index in range(len(results))]
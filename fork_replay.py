@@ -0,0 +1,89 @@
+# fork_replay.py
+
+import os
+import sys
+import pickle
+import multiprocessing
+from engine import Backtest, parse_algorithm
+
+'''
+Runs a trader once up to a fork point and then replays many variants from that snapshot, so that
+parameters which only matter late in the day do not pay for the shared prefix again.
+
+    from data_sources import load_trading_states
+    from fork_replay import ForkedReplay
+
+    trading_states = load_trading_states("data/round-3/day-0/trading_states.json")
+    replay = ForkedReplay("algorithms/algo.py", trading_states, fork_tick=20000)
+    replay.run_prefix()
+    results = replay.run_variants([{"SYNTH_WEIGHT": w} for w in (0.0, 0.05, 0.1)])
+
+A variant is either a dict of overrides or a picklable callable `variant(trader, module)`. Each key
+of a dict is set on the trader instance if it has such an attribute, otherwise as a global of the
+algorithm module (e.g. SYNTH_WEIGHT); a name that is neither raises KeyError. The prefix and the
+variants run headless, like search evaluations.
+'''
+
+_snapshot = None  # pickled prefix Backtest, inherited copy-on-write by forked workers
+_trading_states = None
+
+
+def _init_worker(algo_path, snapshot, trading_states):
+    global _snapshot, _trading_states
+    parse_algorithm(algo_path)  # the pickled trader needs its module to be importable
+    _snapshot = snapshot
+    _trading_states = trading_states
+
+
+def apply_variant(backtest, variant):
+    trader = backtest.trader
+    module = sys.modules[type(trader).__module__]
+    if callable(variant):
+        variant(trader, module)
+        return
+    for name, value in variant.items():
+        if hasattr(trader, name):
+            setattr(trader, name, value)
+        elif hasattr(module, name):
+            setattr(module, name, value)
+        else:
+            raise KeyError(f"{name} is neither an attribute of the trader nor a global of {module.__name__}")
+
+
+def _run_variant(variant):
+    backtest = pickle.loads(_snapshot)  # fresh copy of the trader, module globals and buffers
+    backtest.trading_states = _trading_states
+    apply_variant(backtest, variant)
+    backtest.run()
+    return backtest.results()
+
+
+class ForkedReplay:
+
+    def __init__(self, algo_path: str, trading_states, fork_tick: int):
+        self.algo_path = algo_path
+        self.trading_states = trading_states
+        self.fork_tick = fork_tick
+        self.snapshot = None
+
+    def run_prefix(self) -> dict:
+        """Runs the shared prefix up to the fork tick and snapshots the engine and trader."""
+        trader_module = parse_algorithm(self.algo_path)
+        backtest = Backtest(trader_module.Trader(), self.trading_states, record=False)
+        backtest.run(until=self.fork_tick)
+        self.snapshot = pickle.dumps(backtest, protocol=pickle.HIGHEST_PROTOCOL)
+        return backtest.results()
+
+    def run_variants(self, variants: list, processes: int = None) -> list:
+        """Replays every variant from the fork snapshot in parallel, returning their results in order."""
+        if self.snapshot is None:
+            self.run_prefix()
+        # Forked workers share the snapshot and the dataset copy-on-write instead of unpickling them
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+        processes = min(processes or os.cpu_count() or 1, len(variants)) or 1
+        with context.Pool(processes, _init_worker, (self.algo_path, self.snapshot, self.trading_states)) as pool:
+            results = pool.map(_run_variant, variants)
+        for variant, result in zip(variants, results):
+            result["variant"] = variant
+        return results
@@ -1,88 +1,263 @@
-
 from itertools import product
-import subprocess
+from evaluation_pool import EvaluationPool, rank_key
+from distributed import DistributedPool
+from evaluation_cache import CACHE_PATH
+import search_strategies
+import cross_validation
+import sampling
 
 
 '''
-add a parameter reader to the top of your algo.py file
-
-parameters_path = PARAMETER_PATH
-with open(parameters_path, 'r') as f:
-    line = f.readline().strip()
-    if line:
-        P1, P2, P3, P4 = line.split(',')
-
-        P1 = float(alpha_str)
-        P2 = int(fast_span_str)
-        P3 = int(slow_span_str)
-        P4 = float(diff_val_str)
+Combinations are evaluated in-process across a pool of worker processes (see evaluation_pool.py)
+and returned directly, without going through any file. There are two ways for an algorithm to
+receive its parameters (a dict of name -> value):
+
+1. Accept them in the Trader constructor:
+
+class Trader:
+
+    def __init__(self, parameters=None):
+        parameters = parameters or {}
+        self.threshold_low = parameters.get("THRESHOLD_LOW", -2.0)
+        self.threshold_high = parameters.get("THRESHOLD_HIGH", 2.0)
+
+2. Read them from module-level globals of the same name, which are overridden for each evaluation:
+
+THRESHOLD_LOW = -2.0
+THRESHOLD_HIGH = 2.0
+
+searcher = GridSearcher()
+searcher.add_parameter("THRESHOLD_LOW", -3.0, -1.0, 0.5)
+searcher.add_parameter("THRESHOLD_HIGH", 1.0, 3.0, 0.5)
+searcher.grid_search("algorithms/algo.py")
+
+Algorithms that still read grid_search_data/parameters.txt at the top of the file keep working:
+each evaluation re-executes the algorithm with that file served from memory.
+
+Instead of the exhaustive grid, the same parameters can be searched with random_search,
+quasi_random_search (Halton sequence), successive_halving or hyperband (see search_strategies.py):
+
+searcher.successive_halving("algorithms/algo.py", num_candidates=81)
+searcher.hyperband("algorithms/algo.py")
+
+Every per-day result is cached in grid_search_data/evaluations.sqlite, keyed on the algorithm file's
+hash, so re-running or resuming an interrupted search only evaluates what is missing. Editing the
+algorithm invalidates its entries; pass GridSearcher(cache_path=None) to disable the cache.
+
+When parameters only affect some products, declare them and use separable_search: each group is
+grid searched on its own products' data streams only and the per-group optima are combined, so
+the cost is the sum of the group grid sizes instead of their product:
+
+searcher.add_parameter("RESIN_EDGE", 1, 4, 1, products="RAINFOREST_RESIN")
+searcher.add_parameter("KELP_EDGE", 1, 4, 1, products="KELP")
+searcher.add_parameter("BASKET1_THRESHOLD", 50, 150, 25,
+                       products=["PICNIC_BASKET1", "CROISSANTS", "JAMS", "DJEMBES"])
+searcher.separable_search("algorithms/algo.py")
+
+Candidates whose pnl trails the best one so far by a wide margin are stopped early and reported
+as pruned (see stop_conditions.py); pass GridSearcher(prune=False) to run every candidate to the
+end, or GridSearcher(max_drawdown=5000) to also stop candidates with a large drawdown.
+
+To see how the selected parameters hold up on unseen days, cross-validate them instead (see
+cross_validation.py); this reports the held-out pnl of each fold, its mean and standard deviation,
+and how consistently the folds select the same parameters:
+
+searcher.cross_validate("algorithms/algo.py", mode="leave-one-out")  # or mode="walk-forward"
+
+For a quick first look at a large grid, coarse_search backtests every candidate on every 10th tick
+only and reports pnl estimates calibrated on full runs of a few reference candidates, then re-runs
+the best `top` in full and selects among those (see sampling.py):
+
+searcher.coarse_search("algorithms/algo.py", every=10, references=5, top=3)
+
+GridSearcher(address=("0.0.0.0", 6001)) serves the evaluations to workers on other machines
+instead (see distributed.py, which requires BACKTEST_AUTHKEY to be set for that).
+
+GridSearcher(lockstep=8) backtests up to 8 candidates at a time in a single pass over each day
+(see lockstep.py), sharing the per-tick state construction between them.
+
+GridSearcher(isolation={"tick_timeout": 0.9}) runs each trader in a supervised process (see
+isolation.py): candidates that hang, raise or run out of memory are reported as failed and the
+search carries on.
 '''
 
 class GridSearcher:
 
-    def __init__(self):
+    def __init__(self, cache_path=CACHE_PATH, lockstep=None, prune=True, max_drawdown=None, address=None,
+                 local_workers=0, isolation=None):
         self.parameters = []
+        self.cache_path = cache_path
+        self.lockstep = lockstep  # number of candidates backtested together in one pass over the data
+        self.prune = prune  # stop candidates trailing the best one so far early
+        self.max_drawdown = max_drawdown  # stop candidates whose drawdown exceeds this
+        self.address = address  # (host, port) to serve jobs to distributed.py workers instead of local processes
+        self.local_workers = local_workers  # localhost workers started by the coordinator, for testing
+        self.isolation = isolation  # IsolatedTrader keyword arguments to run traders in supervised processes
 
-    def add_parameter(self, name, begin, end, increment):
+    def add_parameter(self, name, begin, end, increment, products=None):
+        # products: the product(s) whose trading this parameter affects, used by separable_search
         self.parameters.append({
             'name': name,
             'begin': begin,
             'end': end,
-            'increment': increment
+            'increment': increment,
+            'products': [products] if isinstance(products, str) else products
         })
 
-    def grid_search(self,algo_path):
+    def combinations(self, parameters=None):
         # go through all combinations of parameters
         param_values = []
-        for param in self.parameters:
+        for param in parameters or self.parameters:
             values = []
             current = param['begin']
             while current <= param['end']:
                 values.append(current)
                 current += param['increment']
             param_values.append(values)
-        all_combinations = list(product(*param_values))
-        
+        return list(product(*param_values))
+
+    def grid_search(self, algo_path, days=(0, 1, 2), processes=None):
+        names = [param['name'] for param in self.parameters]
+        candidates = [dict(zip(names, combination)) for combination in self.combinations()]
+
         best_pnl = float('-inf')
         best_combination = None
 
-        
-        for combination in all_combinations:
-            total_pnl = 0
-            line = ','.join(str(v) for v in combination)
-            with open('grid_search_data/parameters.txt', 'w') as f:
-                f.write(line + '\n')
-            subprocess.run(['python3', 'main.py', "0", algo_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            # wait for it to finish
-
-            with open('grid_search_data/pnl.txt', 'r') as pnl_file:
-                pnl = float(pnl_file.readline().strip())
-                total_pnl += pnl
-            subprocess.run(['python3', 'main.py', "1", algo_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            with open('grid_search_data/pnl.txt', 'r') as pnl_file:
-                pnl = float(pnl_file.readline().strip())
-                total_pnl += pnl
-            subprocess.run(['python3', 'main.py', "2", algo_path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            with open('grid_search_data/pnl.txt', 'r') as pnl_file:
-                pnl = float(pnl_file.readline().strip())
-                total_pnl += pnl
-
-            print("Current PNL:", total_pnl, "Combination:", combination)
-            if total_pnl > best_pnl:
-                best_pnl = total_pnl
-                best_combination = combination
-                
+        with self._pool(algo_path, days, processes) as pool:
+            for result in pool.imap(candidates):
+                total_pnl = result['pnl']
+                combination = tuple(result['params'].values())
+                if result.get('failed'):
+                    print("Failed:", result['failed'], "Combination:", combination)
+                    continue
+                if result['pruned']:
+                    print("Pruned PNL:", total_pnl, "Combination:", combination)
+                    continue
+                print("Current PNL:", total_pnl, "Combination:", combination)
+                if total_pnl > best_pnl:
+                    best_pnl = total_pnl
+                    best_combination = combination
+
         print("Best PNL:", best_pnl)
         print("Best Combination:", best_combination)
+        return best_pnl, best_combination
+
+    def separable_search(self, algo_path, days=(0, 1, 2), processes=None):
+        # grid search each group of parameters on its own products only, then combine the optima
+        groups = search_strategies.product_groups(self.parameters)
+        best_params = {}
+        with self._pool(algo_path, days, processes) as pool:
+            for products, parameters in groups:
+                names = [param['name'] for param in parameters]
+                candidates = [dict(zip(names, combination)) for combination in self.combinations(parameters)]
+                print(f"Group {', '.join(products)}: {len(candidates)} combinations")
+                best = max(pool.map(candidates, products=products), key=rank_key)
+                print("  Best PNL:", best['pnl'], "Combination:", tuple(best['params'].values()))
+                best_params.update(best['params'])
+            # evaluate the combined optimum on every product
+            combined = pool.map([best_params])[0]
+
+        best_combination = tuple(best_params[param['name']] for param in self.parameters)
+        print("Best PNL:", combined['pnl'])
+        print("Best Combination:", best_combination)
+        return combined['pnl'], best_combination
+
+    def cross_validate(self, algo_path, days=(0, 1, 2), processes=None, mode="leave-one-out"):
+        # evaluate every combination on every day once, then select and score per fold
+        names = [param['name'] for param in self.parameters]
+        candidates = [dict(zip(names, combination)) for combination in self.combinations()]
+        folds = cross_validation.make_folds(days, mode)
+        # every candidate needs every day, so none may be pruned
+        with self._pool(algo_path, days, processes, prune=False) as pool:
+            results = pool.map(candidates)
+        report = cross_validation.cross_validate(results, folds)
+        cross_validation.print_report(report, mode)
+        return report
+
+    def coarse_search(self, algo_path, every=sampling.SAMPLE_EVERY, references=sampling.REFERENCES, days=(0, 1, 2),
+                      processes=None, top=sampling.TOP_CANDIDATES):
+        # scan the grid on every `every`-th tick, calibrated against full runs of a few reference candidates
+        names = [param['name'] for param in self.parameters]
+        candidates = [dict(zip(names, combination)) for combination in self.combinations()]
+        indices = sampling.reference_indices(len(candidates), references)
+        # coarse runs are compared with each other and with the references, so none may be pruned
+        with self._pool(algo_path, days, processes, prune=False, sampling=every) as pool:
+            coarse = pool.map(candidates)
+        with self._pool(algo_path, days, processes, prune=False) as pool:
+            full = dict(zip(indices, pool.map([candidates[index] for index in indices])))
+        calibration = sampling.calibrate([coarse[index] for index in indices], list(full.values()), every)
+
+        estimates = [sampling.estimate(result, calibration) for result in coarse]
+        order = sorted(range(len(candidates)), key=lambda index: (not estimates[index].get('failed'),
+                                                                  estimates[index]['estimate']), reverse=True)
+        for index in order:
+            result = estimates[index]
+            combination = tuple(result['params'].values())
+            if result.get('failed'):
+                print("Failed:", result['failed'], "Combination:", combination)
+            else:
+                print(f"Approximate PNL: {result['estimate']:.0f} (references off by up to {result['error']:.0f}) "
+                      f"Combination: {combination}")
+        sampling.print_report(calibration)
+
+        # select on full runs of the best coarse candidates, not on the estimates
+        finalists = [index for index in order if not estimates[index].get('failed')][:top]
+        missing = [index for index in finalists if index not in full]
+        with self._pool(algo_path, days, processes) as pool:
+            full.update(zip(missing, pool.map([candidates[index] for index in missing])))
+        results = sorted((full[index] for index in finalists), key=rank_key, reverse=True)
+        print(f"Full runs of the top {len(results)} coarse candidates:")
+        for result in results:
+            print("  PNL:", result['pnl'], "Combination:", tuple(result['params'].values()))
+        return self._report(results)
+
+    def _pool(self, algo_path, days, processes, prune=None, sampling=None):
+        prune = self.prune if prune is None else prune
+        if self.address:
+            return DistributedPool(algo_path, days, self.address, self.local_workers, self.cache_path, self.lockstep,
+                                   prune, self.max_drawdown, isolation=self.isolation, sampling=sampling)
+        return EvaluationPool(algo_path, days, processes, self.cache_path, self.lockstep, prune,
+                              self.max_drawdown, isolation=self.isolation, sampling=sampling)
+
+    def _report(self, results):
+        best = results[0]
+        print("Best PNL:", best['pnl'])
+        print("Best Combination:", tuple(best['params'].values()))
+        return best['pnl'], tuple(best['params'].values())
 
-        with open('grid_search_data/parameters.txt', 'w') as f:
-            f.write('')
-        with open('grid_search_data/pnl.txt', 'w') as f:
-            f.write('')
-        
-        
+    def _sample(self, sampler, n, seed):
+        if sampler == "halton":
+            return search_strategies.halton_candidates(self.parameters, n)
+        return search_strategies.random_candidates(self.parameters, n, seed)
 
-        
+    def random_search(self, algo_path, num_candidates, days=(0, 1, 2), processes=None, seed=None,
+                      sampler="random"):
+        candidates = self._sample(sampler, num_candidates, seed)
+        with self._pool(algo_path, days, processes) as pool:
+            results = []
+            for result in pool.imap(candidates):
+                if result.get('failed'):
+                    print("Failed:", result['failed'], "Combination:", tuple(result['params'].values()))
+                else:
+                    status = "Pruned PNL:" if result['pruned'] else "Current PNL:"
+                    print(status, result['pnl'], "Combination:", tuple(result['params'].values()))
+                results.append(result)
+        return self._report(sorted(results, key=rank_key, reverse=True))
 
+    def quasi_random_search(self, algo_path, num_candidates, days=(0, 1, 2), processes=None):
+        return self.random_search(algo_path, num_candidates, days, processes, sampler="halton")
 
+    def successive_halving(self, algo_path, num_candidates, days=(0, 1, 2), processes=None, eta=3,
+                           rungs=4, sampler="halton", seed=None):
+        candidates = self._sample(sampler, num_candidates, seed)
+        budgets = search_strategies.default_budgets(days, eta, rungs)
+        with self._pool(algo_path, days, processes) as pool:
+            results = search_strategies.successive_halving(pool, candidates, budgets, eta)
+        return self._report(results)
 
+    def hyperband(self, algo_path, days=(0, 1, 2), processes=None, eta=3, rungs=4, sampler="halton",
+                  seed=None):
+        budgets = search_strategies.default_budgets(days, eta, rungs)
+        with self._pool(algo_path, days, processes) as pool:
+            results = search_strategies.hyperband(pool, self.parameters, budgets, eta, sampler, seed)
+        return self._report(results)
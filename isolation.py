@@ -0,0 +1,133 @@
+# isolation.py
+
+import io
+import os
+import sys
+import signal
+import traceback
+import contextlib
+from multiprocessing import Pipe
+
+TICK_TIMEOUT = 0.9            # seconds a trader.run call may take, the official per-tick limit
+MEMORY_LIMIT = 1024 ** 3      # bytes the trader process may allocate beyond what it inherits
+
+'''
+Supervised execution of a trader, for searches over experimental algorithms. An IsolatedTrader
+stands in for the trader in a Backtest: it forks a process holding the real trader and sends it
+each tick's state, so a trader.run call that loops forever, raises or exhausts its memory cap only
+takes down that process. The Backtest then stops and marks the run as failed with the reason,
+instead of hanging or crashing the search:
+
+    from engine import run_backtest
+
+    results = run_backtest(trader_module, trading_states, isolation={"tick_timeout": 0.5})
+    if results["failed"]:
+        print("Failed at tick", results["ticks"], "because", results["failed"])
+
+Searches enable it with GridSearcher(isolation={}) (or EvaluationPool(..., isolation={})), where the
+dict holds IsolatedTrader keyword arguments. The trader is forked after it is constructed, so it
+keeps its parameters; what it prints is captured in the child and replayed in the backtest.
+Requires os.fork (Linux, macOS); the memory cap is only enforced where RLIMIT_AS is (Linux).
+'''
+
+
+class TraderFailure(Exception):
+    """Raised by an IsolatedTrader when a trader.run call failed. The message is the reason."""
+
+
+class TickTimeout(TraderFailure):
+    pass
+
+
+def _virtual_memory() -> int:
+    """Bytes of virtual memory of the current process, or 0 where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def _limit_memory(limit: int):
+    try:
+        import resource
+        total = _virtual_memory() + limit
+        resource.setrlimit(resource.RLIMIT_AS, (total, total))
+    except (ImportError, ValueError, OSError):
+        pass  # no address space limits on this platform
+
+
+def _serve(trader, conn, memory_limit):
+    """Runs in the forked process: answers each state with the trader's output and captured logs."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C is handled by the search, which kills us
+    if memory_limit:
+        _limit_memory(memory_limit)
+    while True:
+        try:
+            state = conn.recv()
+        except (EOFError, OSError):
+            return  # the backtest is done or went away
+        log = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(log):
+                output = trader.run(state)
+            conn.send(("ok", output, log.getvalue()))
+        except BaseException as e:
+            conn.send(("error", traceback.format_exception_only(e)[-1].strip(), log.getvalue()))
+
+
+class IsolatedTrader:
+    """Runs `trader` in a forked process, with a per-call timeout and a memory cap."""
+
+    def __init__(self, trader, tick_timeout: float = TICK_TIMEOUT, memory_limit: int = MEMORY_LIMIT):
+        self.tick_timeout = tick_timeout
+        self.memory_limit = memory_limit
+        self.pid = None
+        self._conn, child_conn = Pipe()
+        self.pid = os.fork()
+        if self.pid == 0:
+            self._conn.close()  # so that the child sees EOF once the parent's end is closed
+            try:
+                _serve(trader, child_conn, memory_limit)
+            finally:
+                os._exit(0)
+        child_conn.close()
+
+    def run(self, state):
+        """trader.run(state), raising TraderFailure if it timed out, raised or its process died."""
+        if self.pid is None:
+            raise TraderFailure("the trader process was stopped")
+        try:
+            self._conn.send(state)
+            if not self._conn.poll(self.tick_timeout):
+                self.close()
+                raise TickTimeout(f"tick {state.timestamp} timed out after {self.tick_timeout}s")
+            status, output, log = self._conn.recv()
+        except (EOFError, OSError):
+            exit_code = self.close()
+            raise TraderFailure(f"the trader process died at tick {state.timestamp} (exit status {exit_code})")
+        if status == "error":
+            self.close()
+            raise TraderFailure(f"trader raised {output} at tick {state.timestamp}")
+        sys.stdout.write(log)  # captured by the backtest unless it prints to the console
+        return output
+
+    def close(self):
+        """Kills the trader process. Returns its exit status, or None if it was already stopped."""
+        if self.pid is None:
+            return None
+        self._conn.close()
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        try:
+            _, status = os.waitpid(self.pid, 0)
+            status = os.waitstatus_to_exitcode(status)  # minus the signal number if it was killed
+        except ChildProcessError:
+            status = None  # already reaped, e.g. with SIGCHLD ignored
+        self.pid = None
+        return status
+
+    def __del__(self):
+        self.close()
@@ -0,0 +1,133 @@
+# lockstep.py
+
+from engine import (Backtest, make_trader, load_algorithm_with_parameters, reads_parameters_file,
+                    compute_mid_prices, copy_order_depths, copy_market_trades)
+from datamodel import TradingState
+
+'''
+Drives several traders through a single pass over the trading states, for parameter sweeps where
+N separate backtests would each rebuild the same states and mid prices:
+
+    from data_sources import load_trading_states
+    from lockstep import LockstepBacktest, make_isolated_traders
+
+    trading_states = load_trading_states("data/round-3/day-0/trading_states.json")
+    traders = make_isolated_traders("algorithms/algo.py", [{"SYNTH_WEIGHT": w} for w in (0.0, 0.1, 0.2)])
+    lockstep = LockstepBacktest(traders, trading_states)
+    lockstep.run()
+    print([result["pnl"] for result in lockstep.results()])
+
+Per tick, the mid prices, the copy of the book shown to the traders and the copy of the next
+state's market trades are built once. Each trader keeps its own position, cash and traderData, and
+matches against a copy-on-write book: only the products it sends orders for are copied (from the
+pristine dataset), so its fills never leak into another trader's book. Traders must treat the
+state they receive as read-only, as its book and market trades are shared.
+
+Results are identical to running each trader on its own with run_backtest, as long as the traders
+do not share state through their module (use make_isolated_traders for that) or random numbers.
+'''
+
+
+class _MatchState:
+    """The parts of a TradingState that the matcher reads and consumes."""
+    __slots__ = ("timestamp", "order_depths", "market_trades")
+
+    def __init__(self, timestamp, order_depths=None, market_trades=None):
+        self.timestamp = timestamp
+        self.order_depths = order_depths
+        self.market_trades = market_trades
+
+
+def make_isolated_traders(algo_path: str, candidates: list) -> list:
+    """
+    Creates one trader per parameter dict, each from a fresh copy of the algorithm module so that
+    module-level parameters and globals mutated at runtime are not shared between them.
+    """
+    # algorithms reading grid_search_data/parameters.txt got their parameters when loaded
+    legacy = reads_parameters_file(algo_path)
+    return [make_trader(load_algorithm_with_parameters(algo_path, params), None if legacy else params)
+            for params in candidates]
+
+
+class LockstepBacktest:
+    """Headless backtests of several traders over the same trading states in one pass."""
+
+    def __init__(self, traders: list, trading_states, verbose: bool = False, stop_conditions=None):
+        self.trading_states = trading_states
+        self.backtests = [
+            Backtest(trader, trading_states, verbose=verbose, record=False, stop_conditions=stop_conditions)
+            for trader in traders
+        ]
+        self.tick = 0
+        self.finished = False
+
+    def step(self) -> bool:
+        """Processes the next trading state for every trader not yet pruned. Returns False once finished."""
+        if self.finished or self.tick >= len(self.trading_states) or all(b.pruned for b in self.backtests):
+            self.finished = True
+            return False
+
+        i = self.tick
+        raw_state = self.trading_states[i]
+        raw_next_state = self.trading_states[i + 1] if i < len(self.trading_states) - 1 else None
+        timestamp = raw_state.timestamp
+
+        # Shared per-tick work, done once for all traders
+        mid_prices = compute_mid_prices(raw_state)
+        order_depths = copy_order_depths(raw_state.order_depths)
+        market_trades = None  # only needed by traders without trades carried over from the previous tick
+        next_market_trades = copy_market_trades(raw_next_state.market_trades) if raw_next_state else None
+
+        for backtest in self.backtests:
+            if backtest.pruned:
+                continue
+            if backtest.next_market_trades is None and market_trades is None:
+                market_trades = copy_market_trades(raw_state.market_trades)
+            state = TradingState(
+                traderData=backtest.trader_data,
+                timestamp=timestamp,
+                listings=raw_state.listings,
+                order_depths=order_depths,
+                own_trades=raw_state.own_trades,
+                market_trades=backtest.next_market_trades if backtest.next_market_trades is not None \
+                    else market_trades,
+                position=backtest.position,
+                observations=raw_state.observations
+            )
+            result, conversions, traderData, _ = backtest.call_trader(state)
+            backtest.trader_data = traderData
+
+            # Copy-on-write: private book and next market trades for the products this trader orders
+            products = [product for product, orders in result.items() if orders]
+            book = {}
+            overlay = next_market_trades
+            for product in products:
+                if product in raw_state.order_depths:
+                    book.update(copy_order_depths({product: raw_state.order_depths[product]}))
+                if raw_next_state is not None and product in raw_next_state.market_trades:
+                    if overlay is next_market_trades:
+                        overlay = dict(next_market_trades)
+                    overlay.update(copy_market_trades({product: raw_next_state.market_trades[product]}))
+            match_next_state = _MatchState(raw_next_state.timestamp, market_trades=overlay) \
+                if raw_next_state is not None else None
+            backtest.execute_orders(_MatchState(timestamp, order_depths=book), match_next_state, result)
+
+            backtest.mark_to_market(mid_prices, timestamp)
+            backtest.next_market_trades = overlay
+            backtest.tick += 1
+            backtest.check_stop_conditions()
+
+        self.tick += 1
+        return True
+
+    def run(self, until: int = None):
+        """Runs every trader to completion (or until tick index `until`)."""
+        while until is None or self.tick < until:
+            if not self.step():
+                break
+        for backtest in self.backtests:
+            backtest.finished = self.finished and not backtest.pruned
+
+    def results(self) -> list:
+        """Summary of each trader's backtest, in the order of the traders."""
+        return [backtest.results() for backtest in self.backtests]
@@ -1,174 +1,46 @@
-
 # main.py
 
-import io
 import os
 import sys
-import json
-import contextlib
-import pandas as pd
-import matplotlib.pyplot as plt
+import time
+import traceback
 from pathlib import Path
-from importlib import import_module
-from matcher import match_buy_order, match_sell_order
-from datamodel import TradingState, Listing, OrderDepth, Trade, Observation, ConversionObservation
+from trader_data_tracker import TraderDataTracker
+from profiler import SamplingProfiler
+from tracer import TraceRecorder
+from memory_tracker import MemoryTracker
+from cli_options import pop_flag, pop_option
+# ROUND_NUMBER selects the round to backtest; it lives with the data paths so other modules need not import main
+from data_sources import load_trading_states, trading_states_path, HISTORICAL_PATH, ROUND_NUMBER
+# The engine used to live in this module; names are re-exported for scripts that import them from here
+from engine import (Backtest, export_results, plot_pnl, parse_algorithm, load_fresh_algorithm, make_trader,
+                    run_backtest, reads_parameters_file, load_algorithm_with_parameters, restrict_trading_states,
+                    capture_module_state, restore_module_state, compute_mid_prices, copy_order_depths,
+                    copy_market_trades, print_self_trade, PRODUCTS, POSITION_LIMITS, ENGINE_VERSION,
+                    CHECKPOINT_VERSION)
 
-ROUND_NUMBER = 3
 SHOW_PLOT = True
+TRACK_TRADER_DATA = True  # track traderData size and (de)serialization time every tick
+WATCH_INTERVAL = 0.5      # seconds between two checks of the algorithm file in --watch mode
 
-PRODUCTS = ["RAINFOREST_RESIN", "KELP", "SQUID_INK", "CROISSANTS", "DJEMBES", "JAMS", "PICNIC_BASKET1", "PICNIC_BASKET2",
-            "VOLCANIC_ROCK_VOUCHER_10000", "VOLCANIC_ROCK_VOUCHER_10250", "VOLCANIC_ROCK_VOUCHER_10500",
-            "VOLCANIC_ROCK_VOUCHER_9500", "VOLCANIC_ROCK_VOUCHER_9500", "VOLCANIC_ROCK"]
-
-RESIN = "RAINFOREST_RESIN"
-KELP = "KELP"
-SQUID_INK = "SQUID_INK"
-CROISSANTS = "CROISSANTS"
-DJEMBES = "DJEMBES"
-JAMS = "JAMS"
-PCB1 = "PICNIC_BASKET1"
-PCB2 = "PICNIC_BASKET2"
-VOLCANIC_ROCK = "VOLCANIC_ROCK"
-VOLCANIC_VOUCHER_10000 = "VOLCANIC_ROCK_VOUCHER_10000"
-VOLCANIC_VOUCHER_10250 = "VOLCANIC_ROCK_VOUCHER_10250"
-VOLCANIC_VOUCHER_10500 = "VOLCANIC_ROCK_VOUCHER_10500"
-VOLCANIC_VOUCHER_9500 = "VOLCANIC_ROCK_VOUCHER_9500"
-VOLCANIC_VOUCHER_9750 = "VOLCANIC_ROCK_VOUCHER_9500"
-
-CONSOLE_PRINT = False
-POSITION_LIMITS = {
-    RESIN: 50,
-    KELP: 50,
-    SQUID_INK: 50,
-    CROISSANTS: 250,
-    JAMS: 350,
-    DJEMBES: 60,
-    PCB1: 60,
-    PCB2: 100,
-    VOLCANIC_ROCK: 400,
-    VOLCANIC_VOUCHER_9500: 200,
-    VOLCANIC_VOUCHER_9750: 200,
-    VOLCANIC_VOUCHER_10000: 200,
-    VOLCANIC_VOUCHER_10250: 200,
-    VOLCANIC_VOUCHER_10500: 200
-}
-
-def load_trading_states(log_path: str):
-    """Load trading states from a JSON log file and convert each dictionary into a TradingState object."""
-    with open(log_path, "r") as f:
-        trading_states_data = json.load(f)
-    
-    def convert_trading_state(d):
-        # Convert listings
-        listings = {}
-        for sym, data in d.get("listings", {}).items():
-            listings[sym] = Listing(
-                symbol=data["symbol"],
-                product=data["product"],
-                denomination=data["denomination"]
-            )
-        
-        # Convert order depths
-        order_depths = {}
-        for sym, data in d.get("order_depths", {}).items():
-            od = OrderDepth()
-            od.buy_orders = {int(k): int(v) for k, v in data.get("buy_orders", {}).items()}
-            od.sell_orders = {int(k): int(v) for k, v in data.get("sell_orders", {}).items()}
-            order_depths[sym] = od
-        
-        # Convert trades
-        def convert_trades(trades):
-            return [
-                Trade(
-                    symbol=t["symbol"],
-                    price=int(t["price"]),
-                    quantity=int(t["quantity"]),
-                    buyer=t.get("buyer"),
-                    seller=t.get("seller"),
-                    timestamp=int(t["timestamp"])
-                ) for t in trades
-            ]
-        market_trades = {}
-        for sym, trades in d.get("market_trades", {}).items():
-            market_trades[sym] = convert_trades(trades)
-        own_trades = {}
-        for sym, trades in d.get("own_trades", {}).items():
-            own_trades[sym] = convert_trades(trades)
-        
-        # Convert position
-        position = {prod: int(val) for prod, val in d.get("position", {}).items()}
-        
-        # Convert observations
-        obs = d.get("observations", {})
-        plain_obs = {prod: int(val) for prod, val in obs.get("plainValueObservations", {}).items()}
-        conv_obs_data = obs.get("conversionObservations", {})
-        conv_obs = {}
-        for prod, details in conv_obs_data.items():
-            conv_obs[prod] = ConversionObservation(
-                bidPrice=float(details.get("bidPrice", 0.0)),
-                askPrice=float(details.get("askPrice", 0.0)),
-                transportFees=float(details.get("transportFees", 0.0)),
-                exportTariff=float(details.get("exportTariff", 0.0)),
-                importTariff=float(details.get("importTariff", 0.0)),
-                sugarPrice=float(details.get("sugarPrice", 0.0)),
-                sunlightIndex=float(details.get("sunlightIndex", 0.0))
-            )
-        observations = Observation(
-            plainValueObservations=plain_obs,
-            conversionObservations=conv_obs
-        )
-        # Create and return the TradingState object
-        return TradingState(
-            traderData=d.get("traderData", ""),
-            timestamp=int(d.get("timestamp", 0)),
-            listings=listings,
-            order_depths=order_depths,
-            own_trades=own_trades,
-            market_trades=market_trades,
-            position=position,
-            observations=observations
-        )
-    return [convert_trading_state(d) for d in trading_states_data]
-
-
-def parse_algorithm(algo_path: str):
-    algorithm_path = Path(algo_path).expanduser().resolve()
-    if not algorithm_path.is_file():
-        raise ModuleNotFoundError(f"{algorithm_path} is not a file.")
-    
-    sys.path.append(str(algorithm_path.parent))
-    return import_module(algorithm_path.stem)
+USAGE = """Usage: python main.py [DAY] [ALGORITHM PATH] [LOG LENGTH] [VERBOSE] [flags]
 
+Positional arguments (in order):
+  DAY             day of data to backtest on, 0 to 2 (default 0)
+  ALGORITHM PATH  defaults to algorithms/algo.py
+  LOG LENGTH      number of timestamps to backtest (default all)
+  VERBOSE         true/false, 1/0, yes/no (default false)
 
-def print_self_trade(trade):
-    if trade.seller == "SUBMISSION":
-        print(f"Sold {trade.quantity} {trade.symbol} at {trade.price}.")
-    elif trade.buyer == "SUBMISSION":
-        print(f"Bought {trade.quantity} {trade.symbol} at {trade.price}.")
-
-
-def plot_pnl(per_product_pnl_over_time):
-    """
-    Plots the PnL over time for each product on the same axes.
-    """
-    if not per_product_pnl_over_time:
-        print("No PnL data available to plot.")
-        return
-
-    plt.figure(figsize=(10, 6))
-    for product, pnl_data in per_product_pnl_over_time.items():
-        if pnl_data:
-            timestamps, pnl_values = zip(*pnl_data)
-            plt.plot(timestamps, pnl_values, marker="o", markersize=2, label=product)
-    plt.xlabel("Timestamp")
-    plt.ylabel("Profit and Loss")
-    plt.title("PnL Over Time per Product")
-    plt.xticks(rotation=45)
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(f"results/round-{ROUND_NUMBER}/day-{day_number}/pnl_over_time.png")
-    if SHOW_PLOT:
-        plt.show()
+Optional flags (anywhere on the command line):
+  --profile               sample the trader and export a collapsed-stack file for flame graphs
+  --trace                 export a Chrome/Perfetto trace-event file with a span per tick, phase and strategy call
+  --memory                report the time and RSS growth of the load, simulate, export and plot stages
+  --memory-every N        also sample memory every N ticks (implies --memory)
+  --memory-allocations    also trace allocations and report top allocation sites (much slower, implies --memory)
+  --checkpoint-every N    save the full backtest state every N ticks to results/.../checkpoint.pkl
+  --resume                resume from the latest checkpoint instead of starting from the first tick
+  --watch PATH            rerun a headless backtest of the algorithm at PATH on every save and print the PnL change
+  -h, --help              show this message and exit"""
 
 
 def main(algo_path=None) -> None:
@@ -177,242 +49,134 @@ def main(algo_path=None) -> None:
         algo_path = "algorithms/algo.py"
     
     trader_module = parse_algorithm(algo_path)
+    results_dir = f"results/round-{ROUND_NUMBER}/day-{day_number}"
+    checkpoint_path = f"{results_dir}/checkpoint.pkl"
+    if not os.path.exists(results_dir):
+        os.makedirs(results_dir)
     
-    trader = trader_module.Trader()  # trader instance
-    trader.cash = {prod: 0 for prod in PRODUCTS}  # initial cash
-    trader.pnl = {prod: 0 for prod in PRODUCTS}  # initial pnl
-    trader.aggregate_cash = 0
-    trader.aggregate_pnl = 0
-    
-    # Containers for exporting CSVs and tracking PnL
-    market_conditions = []      # list of dicts for market conditions snapshot
-    trade_history_list = []     # list of dicts for each trade
-    sandbox_logs = []           # list to store sandbox logs
-    # Instead of a single list for aggregated pnl, record pnl per product.
-    per_product_pnl = {prod: [] for prod in PRODUCTS}
-    
-    # Variables to keep track of trader logs
-    position = {prod: 0 for prod in PRODUCTS}
-    traderData = ""
-
-    for i, state in enumerate(trading_states):
-        next_state = trading_states[i + 1] if i < len(trading_states) - 1 else None
-        timestamp = state.timestamp
-        traded = False
-        all_trades_executed = []
-        
-        mid_prices = {}
-        for product in state.listings:
-            if not state.order_depths[product].buy_orders.keys() or \
-                not state.order_depths[product].sell_orders.keys():
-                    mid_prices[product] = -1
-            else:
-                mid_prices[product] = (min(state.order_depths[product].sell_orders.keys()) + \
-                    max(state.order_depths[product].buy_orders.keys())) // 2
-        
-        if LOG_LENGTH and timestamp > LOG_LENGTH * 100:
-            break
-        
-        # Update the state with newest trader data
-        state.position = position
-        state.traderData = traderData # traderData from previous run
-        
-        if CONSOLE_PRINT:
-            result, conversions, traderData = trader.run(state)
-            lambda_log = ""
-        else:
-            lambda_buffer = io.StringIO()
-            with contextlib.redirect_stdout(lambda_buffer):  # redirect stdout to buffer
-                result, conversions, traderData = trader.run(state)
-            lambda_log = lambda_buffer.getvalue()
-        
-        sandbox_logs.append({
-            "sandboxLog": "",
-            "lambdaLog": lambda_log,
-            "timestamp": timestamp
-        })
-        
-        for product, orders_list in result.items():
-            current_position = position.get(product, 0)
-            total_buy = sum(order.quantity for order in orders_list if order.quantity > 0)
-            total_sell = sum(-order.quantity for order in orders_list if order.quantity < 0)
-            pos_limit = POSITION_LIMITS.get(product, 0)
-
-            if current_position + total_buy > pos_limit or current_position - total_sell < -pos_limit:
-                if VERBOSE:
-                    print(f"[{timestamp}] Position limit exceeded for {product}. Cancelling all orders.")
-                continue
-
-            # Process each order by matching against order depths
-            for order in orders_list:
-                trades_executed = []
-                if order.quantity > 0:  # buy order
-                    trades_executed = match_buy_order(state, next_state, order)
-                    total_filled = sum(trade.quantity for trade in trades_executed)
-                    position[product] = position.get(product, 0) + total_filled  # update trader position
-                    cash_change = -sum(trade.price * trade.quantity for trade in trades_executed)
-                    trader.cash[product] += cash_change  # update cash
-                    trader.aggregate_cash += cash_change  # update cash
-                elif order.quantity < 0:  # sell order
-                    trades_executed = match_sell_order(state, next_state, order)
-                    total_filled = sum(trade.quantity for trade in trades_executed)
-                    position[product] = position.get(product, 0) - total_filled  # update trader position
-                    cash_change = sum(trade.price * trade.quantity for trade in trades_executed)
-                    trader.cash[product] += cash_change
-                    trader.aggregate_cash += cash_change  # update cash
-                
-                # Record each executed trade in trade_history_list
-                for trade in trades_executed:
-                    trade_history_list.append({
-                        "timestamp": trade.timestamp,
-                        "buyer": trade.buyer,
-                        "seller": trade.seller,
-                        "symbol": trade.symbol,
-                        "currency": "SEASHELLS",
-                        "price": trade.price,
-                        "quantity": trade.quantity
-                    })
-                
-                if trades_executed:
-                    all_trades_executed.extend(trades_executed)
-                
-                if LOG_LENGTH and trades_executed and timestamp < LOG_LENGTH * 100:
-                    traded = True
-                    if VERBOSE:
-                        print(f"Executed trades for order {order}: {trades_executed}")
-        
-        trader.pnl = trader.cash.copy()
-        trader.aggregate_pnl = trader.aggregate_cash
-        
-        for product, pos in position.items():
-            trader.pnl[product] += pos * mid_prices[product]
-            trader.aggregate_pnl += pos * mid_prices[product]
-        
-        # Record pnl for each product over time
-        for product in PRODUCTS:
-            per_product_pnl[product].append((timestamp, trader.pnl.get(product, 0)))
-        
-        if traded and LOG_LENGTH and timestamp < LOG_LENGTH * 100:
-            print(f"[{timestamp}]")
-            for trade in all_trades_executed:
-                print_self_trade(trade)
-            print(f"Positions: {state.position}")
-            print(f"Cash: {trader.aggregate_cash}")
-            print(f"PNL: {trader.aggregate_pnl}\n")
-        
-        # Record market condition snapshot for each product
-        for product in PRODUCTS:
-            day = -1
-            ts = state.timestamp
-            od = state.order_depths.get(product, None)
-            if od is not None:
-                bids = sorted(od.buy_orders.items(), key=lambda x: x[0], reverse=True)  # top 3 bids
-                asks = sorted(od.sell_orders.items(), key=lambda x: x[0])  # top 3 asks
-            else:
-                bids = []
-                asks = []
-            
-            bid_price_1, bid_vol_1 = bids[0] if len(bids) > 0 else ("", "")
-            bid_price_2, bid_vol_2 = bids[1] if len(bids) > 1 else ("", "")
-            bid_price_3, bid_vol_3 = bids[2] if len(bids) > 2 else ("", "")
-
-            ask_price_1, ask_vol_1 = asks[0] if len(asks) > 0 else ("", "")
-            ask_price_2, ask_vol_2 = asks[1] if len(asks) > 1 else ("", "")
-            ask_price_3, ask_vol_3 = asks[2] if len(asks) > 2 else ("", "")
-            
-            if bids and asks:
-                mid_price = (bids[0][0] + asks[0][0]) / 2.0
-            else:
-                mid_price = ""
-            
-            market_conditions.append({
-                "day": day,
-                "timestamp": ts,
-                "product": product,
-                "bid_price_1": bid_price_1,
-                "bid_volume_1": bid_vol_1,
-                "bid_price_2": bid_price_2,
-                "bid_volume_2": bid_vol_2,
-                "bid_price_3": bid_price_3,
-                "bid_volume_3": bid_vol_3,
-                "ask_price_1": ask_price_1,
-                "ask_volume_1": ask_vol_1,
-                "ask_price_2": ask_price_2,
-                "ask_volume_2": ask_vol_2,
-                "ask_price_3": ask_price_3,
-                "ask_volume_3": ask_vol_3,
-                "mid_price": mid_price,
-                "profit_and_loss": trader.aggregate_pnl
-            })
+    if RESUME:
+        if not os.path.isfile(checkpoint_path):
+            print(f"No checkpoint found at {checkpoint_path}.")
+            sys.exit(1)
+        backtest = Backtest.load_checkpoint(checkpoint_path, trading_states)
+        print(f"Resuming from checkpoint at tick {backtest.tick}.")
+    else:
+        backtest = Backtest(trader_module.Trader(), trading_states, LOG_LENGTH, VERBOSE)
     
-    # Export market conditions and trade history to CSV files with semicolon delimiter
-    market_conditions_df = pd.DataFrame(market_conditions)
-    market_conditions_df = market_conditions_df[[
-        "day", "timestamp", "product",
-        "bid_price_1", "bid_volume_1", "bid_price_2", "bid_volume_2", "bid_price_3", "bid_volume_3",
-        "ask_price_1", "ask_volume_1", "ask_price_2", "ask_volume_2", "ask_price_3", "ask_volume_3",
-        "mid_price", "profit_and_loss"
-    ]]
-    market_conditions_df.to_csv(f"results/round-{ROUND_NUMBER}/day-{day_number}/orderbook.csv", sep=";", index=False)
+    backtest.tracker = TraderDataTracker() if TRACK_TRADER_DATA else None
+    backtest.profiler = SamplingProfiler(algo_path) if PROFILE else None
+    backtest.tracer = TraceRecorder() if TRACE else None
+    backtest.memory = memory
+    if backtest.profiler:
+        backtest.profiler.start()
+    if backtest.tracer:
+        backtest.tracer.wrap_trader(backtest.trader)
+    if memory:
+        memory.begin_stage("simulate")
+
+    backtest.run(CHECKPOINT_EVERY, checkpoint_path)
     
-    trade_history_df = pd.DataFrame(trade_history_list)
-    if not trade_history_df.empty:
-        trade_history_df = trade_history_df[["timestamp", "buyer", "seller", "symbol", "currency", "price", "quantity"]]
-    if not os.path.exists(f"results/round-{ROUND_NUMBER}/day-{day_number}"):
-        os.makedirs(f"results/round-{ROUND_NUMBER}/day-{day_number}")
-    trade_history_df.to_csv(f"results/round-{ROUND_NUMBER}/day-{day_number}/trade_history.csv", sep=";", index=False)
+    if backtest.profiler:
+        backtest.profiler.stop()
+    if memory:
+        memory.end_stage()
+        memory.begin_stage("export")
     
-    print("-----------------------------------------------------------------------------------")
-    print("TOTAL PNL:", trader.aggregate_pnl)
-    for product, pnl in trader.pnl.items():
-        print(f"  {product}: {pnl}")
-    print("Exported orderbook.csv and trade_history.csv.")
-    print("-----------------------------------------------------------------------------------")
+    export_results(backtest, results_dir)
+    if os.path.isfile(checkpoint_path):
+        os.remove(checkpoint_path)  # the run completed, so its checkpoint is no longer needed
     
-    combined_logs_path = f"results/round-{ROUND_NUMBER}/day-{day_number}/combined_results.log"
-    with open(combined_logs_path, "w") as f:
-        # Sandbox logs section
-        f.write("Sandbox logs:\n")
-        for log in sandbox_logs:
-            f.write(json.dumps(log, indent=2) + "\n")
-        f.write("\n")
-        
-        # Activities logs section
-        f.write("Activities log:\n")
-        header = ("day;timestamp;product;bid_price_1;bid_volume_1;bid_price_2;bid_volume_2;"
-                  "bid_price_3;bid_volume_3;ask_price_1;ask_volume_1;ask_price_2;ask_volume_2;"
-                  "ask_price_3;ask_volume_3;mid_price;profit_and_loss\n")
-        f.write(header)
-        for cond in market_conditions:
-            line = (f"{cond['day']};{cond['timestamp']};{cond['product']};"
-                    f"{cond['bid_price_1']};{cond['bid_volume_1']};"
-                    f"{cond['bid_price_2']};{cond['bid_volume_2']};"
-                    f"{cond['bid_price_3']};{cond['bid_volume_3']};"
-                    f"{cond['ask_price_1']};{cond['ask_volume_1']};"
-                    f"{cond['ask_price_2']};{cond['ask_volume_2']};"
-                    f"{cond['ask_price_3']};{cond['ask_volume_3']};"
-                    f"{cond['mid_price']};{cond['profit_and_loss']}\n")
-            f.write(line)
-        f.write("\n")
-        
-        # Trade history section
-        f.write("Trade History:\n")
-        f.write(json.dumps(trade_history_list, indent=2))
+    if memory:
+        memory.end_stage()
+        memory.begin_stage("plot")
     
-    pnl_file_path = f"grid_search_data/pnl.txt"
-    with open(pnl_file_path, "w") as f:
-        f.write(str(trader.aggregate_pnl))
-        
+    if backtest.tracker:
+        backtest.tracker.plot(f"{results_dir}/trader_data_size.png")
     # Call the updated plotting function with per-product pnl data.
-    plot_pnl(per_product_pnl)
+    plot_pnl(backtest.per_product_pnl, results_dir, SHOW_PLOT)
+    
+    if memory:
+        memory.end_stage()
+        memory.print_report()
+        memory.export(f"{results_dir}/memory.json")
+
+
+def run_watched(algo_path: str, trading_states, previous: dict = None) -> dict:
+    """
+    Runs a headless backtest of the current version of the algorithm and prints its pnl, with the
+    change since the `previous` results. Returns the results, or `previous` if the run failed.
+    """
+    print(f"[{time.strftime('%H:%M:%S')}] Running {algo_path}...")
+    start = time.perf_counter()
+    try:
+        results = run_backtest(load_fresh_algorithm(algo_path), trading_states)
+    except Exception:
+        traceback.print_exc()
+        print("The run failed, waiting for the next save.\n")
+        return previous
+
+    def delta(pnl, previous_pnl):
+        return f" ({pnl - previous_pnl:+})" if previous_pnl is not None else ""
+
+    print(f"TOTAL PNL: {results['pnl']}{delta(results['pnl'], previous and previous['pnl'])} "
+          f"in {time.perf_counter() - start:.1f}s")
+    for product, pnl in results["per_product_pnl"].items():
+        print(f"  {product}: {pnl}{delta(pnl, previous and previous['per_product_pnl'].get(product))}")
+    print()
+    return results
+
+
+def watch(algo_path: str, trading_states):
+    """Reruns the backtest on the loaded trading states every time the algorithm file is saved, until Ctrl-C."""
+    print(f"Watching {algo_path} for changes (Ctrl-C to stop).")
+    previous = None
+    last_modified = None
+    try:
+        while True:
+            try:
+                modified = os.stat(algo_path).st_mtime_ns
+            except FileNotFoundError:
+                modified = None  # briefly missing while an editor replaces it
+            if modified is not None and modified != last_modified:
+                last_modified = modified
+                previous = run_watched(algo_path, trading_states, previous)
+            time.sleep(WATCH_INTERVAL)
+    except KeyboardInterrupt:
+        pass
 
 
 if __name__ == "__main__":
-    # Expected optional arguments (in order):
-    #   1. Round number (int between 0 and 5, defaults to 0)
-    #   2. Algorithm path (defaults to "algorithms/algo.py")
-    #   3. Log length (int, number of timestamps to backtest, defaults to all)
-    #   4. Verbose (true/false, 1/0, yes/no; defaults to false)
+    if pop_flag(sys.argv, "--help") or pop_flag(sys.argv, "-h"):
+        print(USAGE)
+        sys.exit(0)
+
+    PROFILE = pop_flag(sys.argv, "--profile")
+    TRACE = pop_flag(sys.argv, "--trace")
+    MEMORY = pop_flag(sys.argv, "--memory")
+    MEMORY_ALLOCATIONS = pop_flag(sys.argv, "--memory-allocations")
+    memory_every = pop_option(sys.argv, "--memory-every")
+    try:
+        memory_every = int(memory_every) if memory_every is not None else None
+        if memory_every is not None and memory_every <= 0:
+            raise ValueError("Memory sampling interval must be a positive integer.")
+    except ValueError as e:
+        print(f"Invalid memory sampling interval provided: {memory_every}. {e}")
+        sys.exit(1)
+    memory = MemoryTracker(every=memory_every, allocations=MEMORY_ALLOCATIONS) \
+        if MEMORY or MEMORY_ALLOCATIONS or memory_every else None
+    RESUME = pop_flag(sys.argv, "--resume")
+    WATCH = pop_option(sys.argv, "--watch")
+    if WATCH and not Path(WATCH).expanduser().is_file():
+        print(f"Algorithm file not found: {WATCH}")
+        sys.exit(1)
+    CHECKPOINT_EVERY = pop_option(sys.argv, "--checkpoint-every")
+    try:
+        CHECKPOINT_EVERY = int(CHECKPOINT_EVERY) if CHECKPOINT_EVERY is not None else None
+        if CHECKPOINT_EVERY is not None and CHECKPOINT_EVERY <= 0:
+            raise ValueError("Checkpoint interval must be a positive integer.")
+    except ValueError as e:
+        print(f"Invalid checkpoint interval provided: {CHECKPOINT_EVERY}. {e}")
+        sys.exit(1)
 
     # Validate round number
     if len(sys.argv) > 1:
@@ -465,11 +229,18 @@ if __name__ == "__main__":
         VERBOSE = False
 
     # Check that the trading states file exists
-    trading_states_file = f"data/round-{ROUND_NUMBER}/day-{day_number}/trading_states.json"
+    trading_states_file = trading_states_path(day_number)
     if not Path(trading_states_file).expanduser().resolve().is_file():
         print(f"Trading states file not found: {trading_states_file}")
         sys.exit(1)
 
+    if memory:
+        memory.begin_stage("load")
     trading_states = load_trading_states(trading_states_file)
+    if memory:
+        memory.end_stage()
 
-    main(algo_path)
+    if WATCH:
+        watch(WATCH, trading_states)
+    else:
+        main(algo_path)
@@ -0,0 +1,135 @@
+# memory_tracker.py
+
+import sys
+import json
+import time
+import contextlib
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+TOP_ALLOCATORS = 10  # number of allocation sites reported per stage
+
+
+def current_rss() -> int:
+    """Current resident set size in bytes, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, AttributeError):
+        return None
+
+
+def peak_rss() -> int:
+    """Peak resident set size of the process since it started in bytes, or None if unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # macOS reports bytes, Linux kilobytes
+
+
+def format_bytes(n) -> str:
+    if n is None:
+        return "n/a"
+    for unit in ["B", "KB", "MB"]:
+        if abs(n) < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+class MemoryTracker:
+    """
+    Reports the time and RSS growth of each pipeline stage (load, simulate, export, plot) and
+    optionally samples memory every `every` ticks.
+
+    With `allocations`, it also traces Python allocations with tracemalloc and reports each stage's
+    traced peak and top allocation sites. Tracing slows the backtest down by an order of magnitude,
+    so it is off by default.
+    """
+
+    def __init__(self, every: int = None, top: int = TOP_ALLOCATORS, allocations: bool = False):
+        self.every = every
+        self.top = top
+        self.allocations = allocations
+        self.stages = []    # list of dicts, one per completed stage
+        self.timeline = []  # list of (timestamp, traced bytes or None, rss bytes)
+        self._current = None
+        if allocations:
+            tracemalloc.start()
+
+    def begin_stage(self, name: str):
+        self._current = {
+            "name": name,
+            "start_time": time.perf_counter(),
+            "start_rss": current_rss()
+        }
+        if self.allocations:
+            tracemalloc.reset_peak()
+            self._current["start_traced"] = tracemalloc.get_traced_memory()[0]
+            self._current["start_snapshot"] = tracemalloc.take_snapshot()
+
+    def end_stage(self):
+        stage = self._current
+        rss = current_rss()
+        result = {
+            "name": stage["name"],
+            "seconds": time.perf_counter() - stage["start_time"],
+            "rss": rss,
+            # RSS growth over the stage; what it allocated and freed again only shows in traced_peak
+            "rss_delta": rss - stage["start_rss"] if rss is not None and stage["start_rss"] is not None else None,
+            # ru_maxrss is cumulative: the process peak up to the end of this stage, not the stage's own
+            "process_peak_rss": peak_rss()
+        }
+        if self.allocations:
+            traced, traced_peak = tracemalloc.get_traced_memory()
+            diff = tracemalloc.take_snapshot().compare_to(stage["start_snapshot"], "lineno")
+            result.update({
+                "traced_delta": traced - stage["start_traced"],
+                "traced_peak": traced_peak,
+                "top_allocators": [
+                    {"site": str(stat.traceback), "size_diff": stat.size_diff, "count_diff": stat.count_diff}
+                    for stat in sorted(diff, key=lambda s: s.size_diff, reverse=True)[:self.top]
+                ]
+            })
+        self.stages.append(result)
+        self._current = None
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        self.begin_stage(name)
+        try:
+            yield
+        finally:
+            self.end_stage()
+
+    def sample(self, tick: int, timestamp: int):
+        """Records a timeline point if `tick` falls on the sampling interval."""
+        if self.every and tick % self.every == 0:
+            traced = tracemalloc.get_traced_memory()[0] if self.allocations else None
+            self.timeline.append((timestamp, traced, current_rss()))
+
+    def print_report(self):
+        print("MEMORY:")
+        for stage in self.stages:
+            sign = "+" if stage["rss_delta"] is not None and stage["rss_delta"] >= 0 else ""
+            line = f"  [{stage['name']}] {stage['seconds']:.2f}s, " \
+                   f"RSS {sign}{format_bytes(stage['rss_delta'])} to {format_bytes(stage['rss'])}"
+            if self.allocations:
+                line += f", traced peak {format_bytes(stage['traced_peak'])}, " \
+                        f"retained {format_bytes(stage['traced_delta'])}"
+            print(f"{line}, process peak RSS so far {format_bytes(stage['process_peak_rss'])}")
+            for alloc in stage.get("top_allocators", [])[:3]:
+                print(f"      {format_bytes(alloc['size_diff']):>10}  {alloc['site']}")
+
+    def export(self, path: str):
+        with open(path, "w") as f:
+            json.dump({
+                "stages": self.stages,
+                "timeline": [
+                    {"timestamp": ts, "traced": traced, "rss": rss} for ts, traced, rss in self.timeline
+                ]
+            }, f, indent=2)
@@ -1,159 +1,20 @@
 # post-tester.py
 
-import io
 import sys
-import json
-import contextlib
-import pandas as pd
-import matplotlib.pyplot as plt
 from pathlib import Path
-from importlib import import_module
-from matcher import match_buy_order, match_sell_order
-from datamodel import TradingState, Listing, OrderDepth, Trade, Observation, ConversionObservation
+from data_sources import JsonSource, POST_DATA_PATH
+from engine import Backtest, export_results, plot_pnl, parse_algorithm
 
 ROUND_NUMBER = 2
 SHOW_PLOT = True
-
-PRODUCTS = ["RAINFOREST_RESIN", "KELP", "SQUID_INK", "CROISSANTS", "DJEMBES", "JAMS", "PICNIC_BASKET1", "PICNIC_BASKET2"]
-
-RESIN = "RAINFOREST_RESIN"
-KELP = "KELP"
-SQUID_INK = "SQUID_INK"
-CROISSANTS = "CROISSANTS"
-DJEMBES = "DJEMBES"
-JAMS = "JAMS"
-PCB1 = "PICNIC_BASKET1"
-PCB2 = "PICNIC_BASKET2"
-
 CONSOLE_PRINT = True
-POSITION_LIMITS = {
-    "RAINFOREST_RESIN": 50,
-    "KELP": 50,
-    "SQUID_INK": 50,
-    "CROISSANTS": 250,
-    "JAM": 350,
-    "DJEMBE": 60,
-    "PICNIC_BASKET1": 60,
-    "PICNIC_BASKET2": 100
-}
-
-
-def load_trading_states(log_path: str):
-    """Load trading states from a JSON log file and convert each dictionary into a TradingState object."""
-    with open(log_path, "r") as f:
-        trading_states_data = json.load(f)
-    
-    def convert_trading_state(d):
-        # Convert listings
-        listings = {}
-        for sym, data in d.get("listings", {}).items():
-            listings[sym] = Listing(
-                symbol=data["symbol"],
-                product=data["product"],
-                denomination=data["denomination"]
-            )
-        
-        # Convert order depths
-        order_depths = {}
-        for sym, data in d.get("order_depths", {}).items():
-            od = OrderDepth()
-            od.buy_orders = {int(k): int(v) for k, v in data.get("buy_orders", {}).items()}
-            od.sell_orders = {int(k): int(v) for k, v in data.get("sell_orders", {}).items()}
-            order_depths[sym] = od
-        
-        # Convert trades
-        def convert_trades(trades):
-            return [
-                Trade(
-                    symbol=t["symbol"],
-                    price=int(t["price"]),
-                    quantity=int(t["quantity"]),
-                    buyer=t.get("buyer"),
-                    seller=t.get("seller"),
-                    timestamp=int(t["timestamp"])
-                ) for t in trades
-            ]
-        market_trades = {}
-        for sym, trades in d.get("market_trades", {}).items():
-            market_trades[sym] = convert_trades(trades)
-        own_trades = {}
-        for sym, trades in d.get("own_trades", {}).items():
-            own_trades[sym] = convert_trades(trades)
-        
-        # Convert position
-        position = {prod: int(val) for prod, val in d.get("position", {}).items()}
-        
-        # Convert observations
-        obs = d.get("observations", {})
-        plain_obs = {prod: int(val) for prod, val in obs.get("plainValueObservations", {}).items()}
-        conv_obs_data = obs.get("conversionObservations", {})
-        conv_obs = {}
-        for prod, details in conv_obs_data.items():
-            conv_obs[prod] = ConversionObservation(
-                bidPrice=float(details.get("bidPrice", 0.0)),
-                askPrice=float(details.get("askPrice", 0.0)),
-                transportFees=float(details.get("transportFees", 0.0)),
-                exportTariff=float(details.get("exportTariff", 0.0)),
-                importTariff=float(details.get("importTariff", 0.0)),
-                sugarPrice=float(details.get("sugarPrice", 0.0)),
-                sunlightIndex=float(details.get("sunlightIndex", 0.0))
-            )
-        observations = Observation(
-            plainValueObservations=plain_obs,
-            conversionObservations=conv_obs
-        )
-        # Create and return the TradingState object
-        return TradingState(
-            traderData=d.get("traderData", ""),
-            timestamp=int(d.get("timestamp", 0)),
-            listings=listings,
-            order_depths=order_depths,
-            own_trades=own_trades,
-            market_trades=market_trades,
-            position=position,
-            observations=observations
-        )
-    return [convert_trading_state(d) for d in trading_states_data]
-
 
-def parse_algorithm(algo_path: str):
-    algorithm_path = Path(algo_path).expanduser().resolve()
-    if not algorithm_path.is_file():
-        raise ModuleNotFoundError(f"{algorithm_path} is not a file.")
-    
-    sys.path.append(str(algorithm_path.parent))
-    return import_module(algorithm_path.stem)
-
-
-def print_self_trade(trade):
-    if trade.seller == "SUBMISSION":
-        print(f"Sold {trade.quantity} {trade.symbol} at {trade.price}.")
-    elif trade.buyer == "SUBMISSION":
-        print(f"Bought {trade.quantity} {trade.symbol} at {trade.price}.")
-
-
-def plot_pnl(per_product_pnl_over_time):
-    """
-    Plots the PnL over time for each product on the same axes.
-    """
-    if not per_product_pnl_over_time:
-        print("No PnL data available to plot.")
-        return
+PRODUCTS = ["RAINFOREST_RESIN", "KELP", "SQUID_INK", "CROISSANTS", "DJEMBES", "JAMS", "PICNIC_BASKET1", "PICNIC_BASKET2"]
 
-    plt.figure(figsize=(10, 6))
-    for product, pnl_over_time in per_product_pnl_over_time.items():
-        if pnl_over_time:
-            timestamps, pnl_values = zip(*pnl_over_time)
-            plt.plot(timestamps, pnl_values, marker="o", markersize=2, label=product)
-    plt.xlabel("Timestamp")
-    plt.ylabel("Profit and Loss")
-    plt.title("PnL Over Time per Product")
-    plt.xticks(rotation=45)
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(f"post-results/round-{ROUND_NUMBER}/pnl_over_time.png")
-    if SHOW_PLOT:
-        plt.show()
+'''
+Runs an algorithm on post-round simulation data (post-data/round-N/trading_states.json) with the
+same engine as main.py, writing its results to post-results/round-N.
+'''
 
 
 def main(algo_path=None) -> None:
@@ -162,228 +23,14 @@ def main(algo_path=None) -> None:
         algo_path = "algorithms/algo.py"
     
     trader_module = parse_algorithm(algo_path)
+    results_dir = f"post-results/round-{ROUND_NUMBER}"
     
-    trader = trader_module.Trader()  # trader instance
-    trader.cash = {prod: 0 for prod in PRODUCTS}  # initial cash
-    trader.pnl = {prod: 0 for prod in PRODUCTS}  # initial pnl
-    trader.aggregate_cash = 0
-    trader.aggregate_pnl = 0
-    
-    # Containers for exporting CSVs and tracking PnL
-    market_conditions = []  # list of dicts for market conditions snapshot
-    trade_history_list = []  # list of dicts for each trade
-    sandbox_logs = []        # list to store sandbox logs
-
-    # Instead of a single pnl_over_time series, record pnl for each product.
-    per_product_pnl = {prod: [] for prod in PRODUCTS}
-    
-    # Variables to keep track of trader logs
-    position = {prod: 0 for prod in PRODUCTS}
-    traderData = ""
-
-    for i, state in enumerate(trading_states):
-        next_state = trading_states[i + 1] if i < len(trading_states) - 1 else None
-        timestamp = state.timestamp
-        traded = False
-        all_trades_executed = []
-        mid_prices = {}
-        for product in state.listings:
-            mid_prices[product] = (min(state.order_depths[product].sell_orders.keys()) +
-                                   max(state.order_depths[product].buy_orders.keys())) // 2
-        
-        if LOG_LENGTH and timestamp > LOG_LENGTH * 100:
-            break
-
-        # Update the state with newest trader data
-        state.position = position
-        state.traderData = traderData  # traderData from previous run
-        
-        if CONSOLE_PRINT:
-            result, conversions, traderData = trader.run(state)
-            lambda_log = ""
-        else:
-            lambda_buffer = io.StringIO()
-            with contextlib.redirect_stdout(lambda_buffer):  # redirect stdout to buffer
-                result, conversions, traderData = trader.run(state)
-            lambda_log = lambda_buffer.getvalue()
-        
-        sandbox_logs.append({
-            "sandboxLog": "",
-            "lambdaLog": lambda_log,
-            "timestamp": timestamp
-        })
-        
-        for product, orders_list in result.items():
-            current_position = position.get(product, 0)
-            total_buy = sum(order.quantity for order in orders_list if order.quantity > 0)
-            total_sell = sum(-order.quantity for order in orders_list if order.quantity < 0)
-            pos_limit = POSITION_LIMITS.get(product, 0)
-
-            if current_position + total_buy > pos_limit or current_position - total_sell < -pos_limit:
-                if VERBOSE:
-                    print(f"[{timestamp}] Position limit exceeded for {product}. Cancelling all orders.")
-                continue
-
-            # Process each order by matching against order depths
-            for order in orders_list:
-                trades_executed = []
-                if order.quantity > 0:  # buy order
-                    trades_executed = match_buy_order(state, next_state, order)
-                    total_filled = sum(trade.quantity for trade in trades_executed)
-                    position[product] = position.get(product, 0) + total_filled  # update trader position
-                    cash_change = -sum(trade.price * trade.quantity for trade in trades_executed)
-                    trader.cash[product] += cash_change  # update cash
-                    trader.aggregate_cash += cash_change  # update cash
-                elif order.quantity < 0:  # sell order
-                    trades_executed = match_sell_order(state, next_state, order)
-                    total_filled = sum(trade.quantity for trade in trades_executed)
-                    position[product] = position.get(product, 0) - total_filled  # update trader position
-                    cash_change = sum(trade.price * trade.quantity for trade in trades_executed)
-                    trader.cash[product] += cash_change
-                    trader.aggregate_cash += cash_change  # update cash
-                
-                # Record each executed trade in trade_history_list
-                for trade in trades_executed:
-                    trade_history_list.append({
-                        "timestamp": trade.timestamp,
-                        "buyer": trade.buyer,
-                        "seller": trade.seller,
-                        "symbol": trade.symbol,
-                        "currency": "SEASHELLS",
-                        "price": trade.price,
-                        "quantity": trade.quantity
-                    })
-                
-                if trades_executed:
-                    all_trades_executed.extend(trades_executed)
-                
-                if LOG_LENGTH and trades_executed and timestamp < LOG_LENGTH * 100:
-                    traded = True
-                    if VERBOSE:
-                        print(f"Executed trades for order {order}: {trades_executed}")
-        
-        # Re-calculate pnl per product and aggregate pnl
-        trader.pnl = trader.cash.copy()
-        trader.aggregate_pnl = trader.aggregate_cash
-        
-        for product, pos in position.items():
-            trader.pnl[product] += pos * mid_prices[product]
-            trader.aggregate_pnl += pos * mid_prices[product]
-        
-        # Record pnl for each product
-        for product in PRODUCTS:
-            per_product_pnl[product].append((timestamp, trader.pnl.get(product, 0)))
-        
-        if traded and LOG_LENGTH and timestamp < LOG_LENGTH * 100:
-            print(f"[{timestamp}]")
-            for trade in all_trades_executed:
-                print_self_trade(trade)
-            print(f"Positions: {state.position}")
-            print(f"Cash: {trader.aggregate_cash}")
-            print(f"PNL: {trader.aggregate_pnl}\n")
-        
-        # Record market condition snapshot for each product
-        for product in PRODUCTS:
-            day = -1
-            ts = state.timestamp
-            od = state.order_depths.get(product, None)
-            if od is not None:
-                bids = sorted(od.buy_orders.items(), key=lambda x: x[0], reverse=True)  # top 3 bids
-                asks = sorted(od.sell_orders.items(), key=lambda x: x[0])  # top 3 asks
-            else:
-                bids = []
-                asks = []
-            
-            bid_price_1, bid_vol_1 = bids[0] if len(bids) > 0 else ("", "")
-            bid_price_2, bid_vol_2 = bids[1] if len(bids) > 1 else ("", "")
-            bid_price_3, bid_vol_3 = bids[2] if len(bids) > 2 else ("", "")
-
-            ask_price_1, ask_vol_1 = asks[0] if len(asks) > 0 else ("", "")
-            ask_price_2, ask_vol_2 = asks[1] if len(asks) > 1 else ("", "")
-            ask_price_3, ask_vol_3 = asks[2] if len(asks) > 2 else ("", "")
-            
-            if bids and asks:
-                mid_price = (bids[0][0] + asks[0][0]) / 2.0
-            else:
-                mid_price = ""
-            
-            market_conditions.append({
-                "day": day,
-                "timestamp": ts,
-                "product": product,
-                "bid_price_1": bid_price_1,
-                "bid_volume_1": bid_vol_1,
-                "bid_price_2": bid_price_2,
-                "bid_volume_2": bid_vol_2,
-                "bid_price_3": bid_price_3,
-                "bid_volume_3": bid_vol_3,
-                "ask_price_1": ask_price_1,
-                "ask_volume_1": ask_vol_1,
-                "ask_price_2": ask_price_2,
-                "ask_volume_2": ask_vol_2,
-                "ask_price_3": ask_price_3,
-                "ask_volume_3": ask_vol_3,
-                "mid_price": mid_price,
-                "profit_and_loss": trader.aggregate_pnl
-            })
-    
-    # Export market conditions and trade history to CSV files with semicolon delimiter
-    market_conditions_df = pd.DataFrame(market_conditions)
-    market_conditions_df = market_conditions_df[[
-        "day", "timestamp", "product",
-        "bid_price_1", "bid_volume_1", "bid_price_2", "bid_volume_2", "bid_price_3", "bid_volume_3",
-        "ask_price_1", "ask_volume_1", "ask_price_2", "ask_volume_2", "ask_price_3", "ask_volume_3",
-        "mid_price", "profit_and_loss"
-    ]]
-    market_conditions_df.to_csv(f"post-results/round-{ROUND_NUMBER}/orderbook.csv", sep=";", index=False)
-    
-    
-    trade_history_df = pd.DataFrame(trade_history_list)
-
-    if not trade_history_df.empty:
-        trade_history_df = trade_history_df[["timestamp", "buyer", "seller", "symbol", "currency", "price", "quantity"]]
-
-    trade_history_df.to_csv(f"post-results/round-{ROUND_NUMBER}/trade_history.csv", sep=";", index=False)
-    
-    print("-----------------------------------------------------------------------------------")
-    print("TOTAL PNL:", trader.aggregate_pnl)
-    for product, pnl in trader.pnl.items():
-        print(f"  {product}: {pnl}")
-    print("Exported orderbook.csv and trade_history.csv.")
-    print("-----------------------------------------------------------------------------------")
-    
-    combined_logs_path = f"post-results/round-{ROUND_NUMBER}/combined_results.log"
-    with open(combined_logs_path, "w") as f:
-        # Sandbox logs section
-        f.write("Sandbox logs:\n")
-        for log in sandbox_logs:
-            f.write(json.dumps(log, indent=2) + "\n")
-        f.write("\n")
-        
-        # Activities logs section
-        f.write("Activities log:\n")
-        header = ("day;timestamp;product;bid_price_1;bid_volume_1;bid_price_2;bid_volume_2;"
-                  "bid_price_3;bid_volume_3;ask_price_1;ask_volume_1;ask_price_2;ask_volume_2;"
-                  "ask_price_3;ask_volume_3;mid_price;profit_and_loss\n")
-        f.write(header)
-        for cond in market_conditions:
-            line = (f"{cond['day']};{cond['timestamp']};{cond['product']};"
-                    f"{cond['bid_price_1']};{cond['bid_volume_1']};"
-                    f"{cond['bid_price_2']};{cond['bid_volume_2']};"
-                    f"{cond['bid_price_3']};{cond['bid_volume_3']};"
-                    f"{cond['ask_price_1']};{cond['ask_volume_1']};"
-                    f"{cond['ask_price_2']};{cond['ask_volume_2']};"
-                    f"{cond['ask_price_3']};{cond['ask_volume_3']};"
-                    f"{cond['mid_price']};{cond['profit_and_loss']}\n")
-            f.write(line)
-        f.write("\n")
-        
-        # Trade history section
-        f.write("Trade History:\n")
-        f.write(json.dumps(trade_history_list, indent=2))
+    backtest = Backtest(trader_module.Trader(), trading_states, LOG_LENGTH, VERBOSE, products=PRODUCTS,
+                        console_print=CONSOLE_PRINT)
+    backtest.run()
     
-    # Call the updated plotting function with per-product pnl data.
-    plot_pnl(per_product_pnl)
+    export_results(backtest, results_dir)
+    plot_pnl(backtest.per_product_pnl, results_dir, SHOW_PLOT)
 
 
 if __name__ == "__main__":
@@ -444,11 +91,11 @@ if __name__ == "__main__":
         VERBOSE = False
 
     # Check that the trading states file exists
-    trading_states_file = f"post-data/round-{ROUND_NUMBER}/trading_states.json"
+    trading_states_file = POST_DATA_PATH.format(round=ROUND_NUMBER)
     if not Path(trading_states_file).expanduser().resolve().is_file():
         print(f"Trading states file not found: {trading_states_file}")
         sys.exit(1)
 
-    trading_states = load_trading_states(trading_states_file)
+    trading_states = JsonSource(trading_states_file).load()
 
     main(algo_path)
@@ -0,0 +1,113 @@
+# profiler.py
+
+import sys
+import time
+import signal
+import contextlib
+import threading
+from pathlib import Path
+from collections import Counter
+
+SAMPLE_INTERVAL = 0.0005  # seconds between samples
+
+
+class SamplingProfiler:
+    """
+    Low-overhead sampling profiler for the trader. A SIGPROF interval timer interrupts the process
+    every `interval` seconds of CPU time and the handler captures the current stack while the
+    backtester is inside `trader.run` (see `active`), keeping only frames from the algorithm file.
+    On platforms without interval timers (Windows) a background thread samples the stack instead,
+    which is biased towards code that releases the GIL (e.g. some NumPy calls).
+
+    Results are aggregated by method (inclusive time, e.g. `Trader.kelp_strategy` or
+    `BlackScholesGreeks.call_price`) and can be exported as a collapsed-stack file for flame graph
+    tools (flamegraph.pl, speedscope, inferno).
+    """
+
+    def __init__(self, algo_path: str, interval: float = SAMPLE_INTERVAL):
+        self.algo_file = str(Path(algo_path).expanduser().resolve())
+        self.interval = interval
+        self.stacks = Counter()  # collapsed stack -> number of samples
+        self.samples = 0
+        self.run_time = 0.0      # wall time spent inside trader.run
+        self._inside_run = False
+        self._use_signal = hasattr(signal, "setitimer")
+        self._previous_handler = None
+        self._thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+
+    def start(self):
+        if self._use_signal:
+            self._previous_handler = signal.signal(signal.SIGPROF, self._handle_signal)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        else:
+            self._thread_id = threading.get_ident()
+            self._sampler.start()
+
+    def stop(self):
+        if self._use_signal:
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+        else:
+            self._stopped.set()
+            self._sampler.join()
+
+    @contextlib.contextmanager
+    def active(self):
+        """Context manager to wrap around each `trader.run` call."""
+        start = time.perf_counter()
+        self._inside_run = True
+        try:
+            yield
+        finally:
+            self._inside_run = False
+            self.run_time += time.perf_counter() - start
+
+    def _handle_signal(self, signum, frame):
+        if self._inside_run:
+            self._record(frame)
+
+    def _sample_loop(self):
+        while not self._stopped.wait(self.interval):
+            if self._inside_run:
+                self._record(sys._current_frames().get(self._thread_id))
+
+    def _record(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename == self.algo_file:
+                stack.append(code.co_qualname)
+            frame = frame.f_back
+        if stack:
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def method_times(self) -> dict:
+        """Inclusive sample counts per method, plus a `Class.*` rollup for every class."""
+        totals = Counter()
+        for stack, count in self.stacks.items():
+            frames = set(stack.split(";"))
+            classes = {f.split(".")[0] + ".*" for f in frames if "." in f}
+            for name in frames | classes:
+                totals[name] += count
+        return dict(totals)
+
+    def print_summary(self, top: int = 25):
+        if not self.samples:
+            print("PROFILE: no samples collected.")
+            return
+        print(f"PROFILE: {self.samples} samples, {self.run_time:.2f}s inside trader.run")
+        print(f"  {'method':<50}{'samples':>10}{'share':>10}{'est. time':>12}")
+        ranked = sorted(self.method_times().items(), key=lambda x: x[1], reverse=True)
+        for name, count in ranked[:top]:
+            share = count / self.samples
+            print(f"  {name:<50}{count:>10}{share:>10.1%}{share * self.run_time:>11.3f}s")
+
+    def export_collapsed(self, path: str):
+        """Writes the samples in collapsed-stack format: `frame;frame;frame count`."""
+        with open(path, "w") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
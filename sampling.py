@@ -0,0 +1,85 @@
+# sampling.py
+
+import statistics
+
+SAMPLE_EVERY = 10   # coarse runs feed the trader every 10th tick
+REFERENCES = 5      # reference candidates run both ways to calibrate coarse runs (at least 3)
+TOP_CANDIDATES = 3  # best coarse candidates re-run in full before one is selected
+
+'''
+Coarse-resolution scans. A coarse run only feeds the trader every k-th tick of each day (see
+engine.sample_trading_states), with the market trades of the skipped ticks aggregated into the
+next sampled state, so it is about k times faster but only approximates the pnl: the trader sees
+fewer quotes, fills and trades on a coarser clock.
+
+How far off it is depends on the algorithm and tends to grow with the pnl itself, so it is
+calibrated on reference candidates spread over the grid (its ends and interior points) that are
+also backtested in full. The full pnl is fitted as a linear function of the coarse pnl over the
+references, and each coarse pnl is mapped through it. The reported error is the largest
+leave-one-out error of that fit on the references: a worst case seen on a few points, not a
+confidence interval. Because the top of a coarse ranking is where its errors matter most, the best
+few coarse candidates are re-run in full and the selection is made on those. See
+GridSearcher.coarse_search for usage.
+'''
+
+
+def reference_indices(num_candidates: int, n: int = REFERENCES) -> list:
+    """Indices of n candidates spread evenly over the list, from its first to its last."""
+    if n < 3:
+        raise ValueError("Calibrating coarse runs takes at least 3 reference candidates.")
+    if n >= num_candidates:
+        return list(range(num_candidates))
+    return [round(k * (num_candidates - 1) / (n - 1)) for k in range(n)]
+
+
+def _fit(pairs: list) -> tuple:
+    """(intercept, slope) of the least-squares line of full pnl against coarse pnl."""
+    coarse = [c["pnl"] for c, _ in pairs]
+    full = [f["pnl"] for _, f in pairs]
+    if len(set(coarse)) < 2:
+        # no spread to fit a slope on: only correct the bias
+        return statistics.mean(full) - statistics.mean(coarse), 1.0
+    slope, intercept = statistics.linear_regression(coarse, full)
+    return intercept, slope
+
+
+def calibrate(coarse: list, full: list, every: int) -> dict:
+    """Fit of the full pnl on the coarse pnl of the same candidates (in the same order), with its error."""
+    pairs = [(c, f) for c, f in zip(coarse, full) if not c.get("failed") and not f.get("failed")]
+    if len(pairs) < 3:
+        raise ValueError(f"Only {len(pairs)} reference candidate(s) completed both runs, at least 3 are needed.")
+    intercept, slope = _fit(pairs)
+    # each reference predicted by the fit on the others
+    held_out = []
+    for k, (c, f) in enumerate(pairs):
+        others_intercept, others_slope = _fit(pairs[:k] + pairs[k + 1:])
+        held_out.append(f["pnl"] - (others_intercept + others_slope * c["pnl"]))
+    return {
+        "every": every,
+        "references": [
+            {"params": f["params"], "coarse_pnl": c["pnl"], "full_pnl": f["pnl"],
+             "residual": f["pnl"] - (intercept + slope * c["pnl"]), "held_out_error": error}
+            for (c, f), error in zip(pairs, held_out)
+        ],
+        "intercept": intercept,
+        "slope": slope,
+        "error": max(abs(error) for error in held_out),
+        "relative_error": statistics.mean(abs(error) / max(abs(f["pnl"]), 1) for (_, f), error in zip(pairs, held_out))
+    }
+
+
+def estimate(result: dict, calibration: dict) -> dict:
+    """A coarse result with its calibrated pnl estimate and the largest error seen on the references."""
+    return {**result, "estimate": calibration["intercept"] + calibration["slope"] * result["pnl"],
+            "error": calibration["error"]}
+
+
+def print_report(calibration: dict):
+    print(f"COARSE RUNS (every {calibration['every']} ticks), calibrated on "
+          f"{len(calibration['references'])} references:")
+    for reference in calibration["references"]:
+        print(f"  {reference['params']}: coarse PNL {reference['coarse_pnl']}, full PNL {reference['full_pnl']} "
+              f"(left out of the fit: error {reference['held_out_error']:+.1f})")
+    print(f"  Full PNL ~ {calibration['intercept']:+.1f} + {calibration['slope']:.3f} x coarse PNL, "
+          f"largest leave-one-out error {calibration['error']:.1f} "
+          f"(mean relative {calibration['relative_error']:.1%})")
@@ -0,0 +1,208 @@
+# scenarios.py
+
+import os
+import sys
+import csv
+import math
+import time
+import random
+import statistics
+import multiprocessing
+from datamodel import TradingState, OrderDepth, Trade, Observation
+from engine import parse_algorithm, run_backtest, capture_module_state, restore_module_state
+from data_sources import load_trading_states, trading_states_path, ROUND_NUMBER
+
+NUM_SCENARIOS = 200  # synthetic days per run
+BLOCK_SIZE = 500     # consecutive ticks per bootstrap block
+CONFIDENCE = 0.9     # coverage of the reported intervals
+
+'''
+Monte Carlo scenarios from block-bootstrapped days. The round only has a few historical days, so
+the pnl on them says little about the spread of outcomes. Here each synthetic day is made of blocks
+of BLOCK_SIZE consecutive ticks drawn at random from the historical days: books, market trades and
+observations of a block stay as they were, so the microstructure within a block is real.
+
+To keep the days consistent across block joins, every product's prices in a block (book levels,
+market trades and its plain observation) are shifted so that its first valid mid price (both sides
+of the book quoted) continues from the last valid one before the join, and timestamps are
+renumbered. Each product is shifted on its own, so cross-product relations (basket vs constituents,
+vouchers vs the rock) only hold within blocks; use large blocks for strategies that trade them.
+
+The days are loaded once and shared with forked worker processes, which generate the scenarios from
+their seeds and run them in parallel. The report gives the distribution of total and per-product
+pnl: mean, standard deviation, the central CONFIDENCE interval of the scenario pnl and a confidence
+interval of the mean. From the repo root:
+
+    python scenarios.py [algorithm path] [--scenarios N] [--block TICKS] [--days 0,1,2] [--processes N] [--seed S]
+
+which also writes every scenario's pnl to results/round-N/scenarios.csv. From Python:
+
+    report = run_scenarios("algorithms/algo.py", days=[0, 1, 2], num_scenarios=500)
+'''
+
+# Per-worker state, set by _init_worker
+_algo_module = None
+_module_state = None
+_datasets = []
+_parameters = None
+
+
+def _shift_depth(depth, delta: int):
+    shifted = OrderDepth()
+    shifted.buy_orders = {price + delta: volume for price, volume in depth.buy_orders.items()}
+    shifted.sell_orders = {price + delta: volume for price, volume in depth.sell_orders.items()}
+    return shifted
+
+
+def _shift_trades(trades, delta: int, timestamp: int) -> list:
+    return [Trade(trade.symbol, trade.price + delta, trade.quantity, trade.buyer, trade.seller, timestamp)
+            for trade in trades]
+
+
+def _first_mid(states, product: str):
+    """Mid price of the product in the first of `states` with both sides of its book quoted, or None."""
+    for state in states:
+        depth = state.order_depths.get(product)
+        if depth is not None and depth.buy_orders and depth.sell_orders:
+            return (min(depth.sell_orders) + max(depth.buy_orders)) // 2
+    return None
+
+
+def bootstrap_day(datasets: list, length: int, block_size: int = BLOCK_SIZE, rng=random) -> list:
+    """A synthetic day of `length` ticks made of random blocks of the given days (see the module docstring)."""
+    states = []
+    last_mid = {}  # product -> last valid mid price of the synthetic day so far
+    while len(states) < length:
+        source = rng.choice(datasets)
+        size = min(block_size, length - len(states), len(source))
+        start = rng.randrange(len(source) - size + 1)
+        block = source[start:start + size]
+        shift = {}  # product -> price shift of this block
+        for product in block[0].listings:
+            first = _first_mid(block, product)
+            if product in last_mid and first is not None:
+                shift[product] = int(last_mid[product] - first)
+        for product in block[0].listings:
+            last = _first_mid(reversed(block), product)
+            if last is not None:
+                last_mid[product] = last + shift.get(product, 0)
+        for state in block:
+            timestamp = len(states) * 100
+            plain = state.observations.plainValueObservations
+            states.append(TradingState(
+                traderData="",
+                timestamp=timestamp,
+                listings=state.listings,
+                order_depths={product: _shift_depth(depth, shift.get(product, 0))
+                              for product, depth in state.order_depths.items()},
+                own_trades={},
+                market_trades={product: _shift_trades(trades, shift.get(product, 0), timestamp - 100)
+                               for product, trades in state.market_trades.items()},
+                position={},
+                observations=Observation(
+                    plainValueObservations={product: value + shift.get(product, 0) for product, value in plain.items()},
+                    conversionObservations=state.observations.conversionObservations
+                )
+            ))
+    return states
+
+
+def _init_worker(algo_path, datasets, parameters=None):
+    global _algo_module, _module_state, _datasets, _parameters
+    _algo_module = parse_algorithm(algo_path)
+    _module_state = capture_module_state(_algo_module)
+    _datasets = datasets
+    _parameters = parameters
+
+
+def run_scenario(task) -> dict:
+    """Generates the scenario of a seed and backtests the algorithm on it (headless)."""
+    seed, length, block_size = task
+    trading_states = bootstrap_day(_datasets, length, block_size, random.Random(seed))
+    restore_module_state(_algo_module, _module_state)
+    # the trader's own randomness is seeded too, so a scenario's pnl is reproducible
+    random.seed(seed)
+    results = run_backtest(_algo_module, trading_states, _parameters)
+    return {"seed": seed, "pnl": results["pnl"], "per_product_pnl": results["per_product_pnl"]}
+
+
+def summarize(values: list, confidence: float = CONFIDENCE) -> dict:
+    """Mean, standard deviation, central `confidence` interval and confidence interval of the mean."""
+    values = sorted(values)
+    mean = statistics.mean(values)
+    std = statistics.stdev(values) if len(values) > 1 else 0.0
+    tail = (1 - confidence) / 2
+    z = statistics.NormalDist().inv_cdf(1 - tail)
+    return {
+        "mean": mean,
+        "std": std,
+        "interval": (values[int(tail * (len(values) - 1))], values[math.ceil((1 - tail) * (len(values) - 1))]),
+        "mean_interval": (mean - z * std / math.sqrt(len(values)), mean + z * std / math.sqrt(len(values))),
+        "probability_of_loss": sum(value < 0 for value in values) / len(values)
+    }
+
+
+def run_scenarios(algo_path: str, days=(0, 1, 2), num_scenarios: int = NUM_SCENARIOS, block_size: int = BLOCK_SIZE,
+                  processes: int = None, seed: int = 0, parameters: dict = None, length: int = None) -> dict:
+    """
+    Backtests the algorithm on `num_scenarios` bootstrapped days (as long as the shortest of the
+    given days, unless `length`) and returns the pnl of each with their summaries.
+    """
+    processes = processes or os.cpu_count() or 1
+    datasets = [load_trading_states(trading_states_path(day)) for day in days]
+    if length is None:
+        length = min(len(dataset) for dataset in datasets)
+    tasks = [(seed + k, length, block_size) for k in range(num_scenarios)]
+    start = time.perf_counter()
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+    with context.Pool(processes, _init_worker, (algo_path, datasets, parameters)) as pool:
+        scenarios = pool.map(run_scenario, tasks)
+    products = sorted({product for scenario in scenarios for product, pnl in scenario["per_product_pnl"].items()
+                       if pnl})
+    return {
+        "scenarios": scenarios,
+        "seconds": time.perf_counter() - start,
+        "total": summarize([scenario["pnl"] for scenario in scenarios]),
+        "per_product": {product: summarize([scenario["per_product_pnl"].get(product, 0) for scenario in scenarios])
+                        for product in products}
+    }
+
+
+def print_report(report: dict, confidence: float = CONFIDENCE):
+    print(f"{len(report['scenarios'])} SCENARIOS in {report['seconds']:.1f}s "
+          f"({confidence:.0%} intervals of the scenario pnl, and of its mean):")
+    rows = [("TOTAL", report["total"])] + list(report["per_product"].items())
+    for name, summary in rows:
+        low, high = summary["interval"]
+        mean_low, mean_high = summary["mean_interval"]
+        print(f"  {name:<28} mean {summary['mean']:>10.0f}  std {summary['std']:>9.0f}  "
+              f"[{low:.0f}, {high:.0f}]  mean in [{mean_low:.0f}, {mean_high:.0f}]  "
+              f"P(loss) {summary['probability_of_loss']:.0%}")
+
+
+def export_scenarios(report: dict, path: str):
+    products = list(report["per_product"])
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(["seed", "pnl"] + products)
+        for scenario in report["scenarios"]:
+            writer.writerow([scenario["seed"], scenario["pnl"]] +
+                            [scenario["per_product_pnl"].get(product, 0) for product in products])
+
+
+if __name__ == "__main__":
+    # Usage: python scenarios.py [algorithm path] [--scenarios N] [--block TICKS] [--days 0,1,2] [--processes N] [--seed S]
+    from cli_options import pop_option
+    num_scenarios = int(pop_option(sys.argv, "--scenarios", NUM_SCENARIOS))
+    block_size = int(pop_option(sys.argv, "--block", BLOCK_SIZE))
+    days = [int(day) for day in pop_option(sys.argv, "--days", "0,1,2").split(",")]
+    processes = pop_option(sys.argv, "--processes")
+    seed = int(pop_option(sys.argv, "--seed", 0))
+    algo_path = sys.argv[1] if len(sys.argv) > 1 else "algorithms/algo.py"
+    report = run_scenarios(algo_path, days, num_scenarios, block_size, int(processes) if processes else None, seed)
+    print_report(report)
+    results_dir = f"results/round-{ROUND_NUMBER}"
+    os.makedirs(results_dir, exist_ok=True)
+    export_scenarios(report, f"{results_dir}/scenarios.csv")
+    print(f"Wrote {results_dir}/scenarios.csv")
@@ -0,0 +1,156 @@
+# search_progress.py
+
+import os
+import sys
+import json
+import time
+import threading
+
+STATUS_PATH = "grid_search_data/status.json"
+STATUS_INTERVAL = 2.0  # seconds between two refreshes of the status file
+
+'''
+Live progress of a parameter search, written by the EvaluationPool to a JSON status file every few
+seconds: evaluations per second, ETA, best result so far and, per worker, evaluations, ticks per
+second and utilization (share of the wall time spent evaluating). To follow a running search:
+
+    python search_progress.py [grid_search_data/status.json]
+'''
+
+
+class SearchProgress:
+
+    def __init__(self, path: str = STATUS_PATH, workers: int = 1, interval: float = STATUS_INTERVAL):
+        self.path = path
+        self.workers = workers
+        self.interval = interval
+        self.start = time.time()
+        self.total = 0        # candidates submitted so far
+        self.completed = 0
+        self.cached = 0       # completed from the evaluation cache
+        self.pruned = 0
+        self.failed = 0       # isolated traders that timed out, raised or ran out of memory
+        self.best = None
+        self.per_worker = {}  # worker -> {"evaluations", "ticks", "busy_seconds"}
+        self.state = "running"
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def begin(self):
+        """Starts refreshing the status file in the background."""
+        self._thread = threading.Thread(target=self._refresh, daemon=True)
+        self._thread.start()
+
+    def _refresh(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def submit(self, n: int):
+        with self._lock:
+            self.total += n
+
+    def record(self, result: dict, evaluated: dict = None):
+        """Records a candidate's result; `evaluated` is the part a worker computed (None if all cached)."""
+        with self._lock:
+            self.completed += 1
+            if evaluated is None:
+                self.cached += 1
+            if result.get("failed"):
+                self.failed += 1
+            elif result.get("pruned"):
+                self.pruned += 1
+            elif self.best is None or result["pnl"] > self.best["pnl"]:
+                self.best = {"pnl": result["pnl"], "params": result["params"]}
+            if evaluated is not None:
+                worker = self.per_worker.setdefault(str(evaluated["worker"]),
+                                                    {"evaluations": 0, "ticks": 0, "busy_seconds": 0.0})
+                worker["evaluations"] += 1
+                worker["ticks"] += evaluated["ticks"]
+                worker["busy_seconds"] += evaluated["seconds"]
+
+    def status(self) -> dict:
+        with self._lock:
+            elapsed = time.time() - self.start
+            evaluated = self.completed - self.cached
+            rate = evaluated / elapsed if elapsed > 0 else 0.0
+            remaining = self.total - self.completed
+            busy = sum(worker["busy_seconds"] for worker in self.per_worker.values())
+            return {
+                "state": self.state,
+                "updated": time.time(),
+                "elapsed_seconds": elapsed,
+                "total": self.total,
+                "completed": self.completed,
+                "cached": self.cached,
+                "pruned": self.pruned,
+                "failed": self.failed,
+                "evaluations_per_second": rate,
+                "eta_seconds": remaining / rate if rate > 0 else None,
+                "best": self.best,
+                "utilization": min(1.0, busy / (elapsed * max(self.workers, len(self.per_worker), 1)))
+                if elapsed > 0 else 0.0,
+                "workers": {
+                    name: {
+                        "evaluations": worker["evaluations"],
+                        "ticks_per_second": worker["ticks"] / worker["busy_seconds"] if worker["busy_seconds"] else 0.0,
+                        "utilization": min(1.0, worker["busy_seconds"] / elapsed) if elapsed > 0 else 0.0
+                    }
+                    for name, worker in self.per_worker.items()
+                }
+            }
+
+    def write(self):
+        status = self.status()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(status, f, indent=2)
+        os.replace(tmp_path, self.path)  # readers never see a partial file
+
+    def close(self, state: str = "finished"):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.state = state
+        self.write()
+
+
+def format_seconds(seconds) -> str:
+    if seconds is None:
+        return "n/a"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def render(status: dict) -> str:
+    lines = [
+        f"[{status['state']}] {status['completed']}/{status['total']} evaluations "
+        f"({status['cached']} cached, {status['pruned']} pruned, {status.get('failed', 0)} failed) in {format_seconds(status['elapsed_seconds'])}",
+        f"  {status['evaluations_per_second']:.2f} evals/s, ETA {format_seconds(status['eta_seconds'])}, "
+        f"utilization {status['utilization']:.0%}",
+    ]
+    if status["best"]:
+        lines.append(f"  Best PNL: {status['best']['pnl']} Combination: {status['best']['params']}")
+    for name, worker in sorted(status["workers"].items()):
+        lines.append(f"    worker {name}: {worker['evaluations']} evaluations, "
+                     f"{worker['ticks_per_second']:.0f} ticks/s, utilization {worker['utilization']:.0%}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else STATUS_PATH
+    try:
+        while True:
+            try:
+                with open(path, "r") as f:
+                    status = json.load(f)
+                print(render(status) + "\n")
+                if status["state"] != "running":
+                    break
+            except (OSError, ValueError):
+                print(f"Waiting for {path}...")
+            time.sleep(STATUS_INTERVAL)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,141 @@
+# search_strategies.py
+
+import math
+import random
+from evaluation_pool import rank_key
+
+'''
+Search strategies beyond the exhaustive grid, run on an EvaluationPool. Parameters use the
+GridSearcher format ({"name", "begin", "end", "increment"}) and sampled values are snapped to the
+increment grid, so they stay comparable with (and cacheable like) grid points.
+
+Successive halving evaluates many candidates on a small budget (a prefix of one day) and promotes
+only the top 1/eta to the next, larger budget, up to all days. Hyperband runs several successive
+halving brackets that trade off the number of candidates against the starting budget.
+'''
+
+PRIMES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59, 61, 67, 71]
+
+
+def snap(param: dict, u: float):
+    """Maps u in [0, 1) to a value on the parameter's begin/end/increment grid."""
+    steps = int(round((param["end"] - param["begin"]) / param["increment"]))
+    k = min(int(u * (steps + 1)), steps)
+    value = param["begin"] + k * param["increment"]
+    return round(value, 10) if isinstance(value, float) else value
+
+
+def unique(candidates: list) -> list:
+    seen = set()
+    result = []
+    for candidate in candidates:
+        key = tuple(candidate.items())
+        if key not in seen:
+            seen.add(key)
+            result.append(candidate)
+    return result
+
+
+def random_candidates(parameters: list, n: int, seed: int = None) -> list:
+    rng = random.Random(seed)
+    return unique([{p["name"]: snap(p, rng.random()) for p in parameters} for _ in range(n)])
+
+
+def halton(index: int, base: int) -> float:
+    result, f = 0.0, 1.0
+    while index > 0:
+        f /= base
+        result += f * (index % base)
+        index //= base
+    return result
+
+
+def halton_candidates(parameters: list, n: int, skip: int = 0) -> list:
+    """Quasi-random candidates from the Halton sequence, which covers the space more evenly than random."""
+    if len(parameters) > len(PRIMES):
+        raise ValueError(f"Halton sampling supports at most {len(PRIMES)} parameters.")
+    return unique([
+        {p["name"]: snap(p, halton(i + 1 + skip, PRIMES[d])) for d, p in enumerate(parameters)}
+        for i in range(n)
+    ])
+
+
+def product_groups(parameters: list) -> list:
+    """
+    Groups parameters by the products they are declared to affect, as (products, parameters)
+    pairs. Raises ValueError if a parameter declares no products or if two groups share a product,
+    since the groups could then not be optimized independently.
+    """
+    groups = {}
+    for param in parameters:
+        if not param.get("products"):
+            raise ValueError(f"Parameter {param['name']} does not declare the products it affects.")
+        groups.setdefault(tuple(sorted(param["products"])), []).append(param)
+    owner = {}
+    for products in groups:
+        for product in products:
+            if product in owner:
+                raise ValueError(f"{product} is affected by parameter groups {owner[product]} and {products}; "
+                                 "declare their parameters with the same products.")
+            owner[product] = products
+    return list(groups.items())
+
+
+def default_budgets(days: list, eta: int = 3, rungs: int = 4) -> list:
+    """
+    Budget ladder for successive halving: growing prefixes of the first day, then the full first
+    day, then all days. With eta=3 and 4 rungs: 1/9 of day 0, 1/3 of day 0, day 0, all days.
+    """
+    days = list(days)
+    prefix_rungs = rungs - (2 if len(days) > 1 else 1)
+    budgets = [{"days": days[:1], "fraction": eta ** -k} for k in range(prefix_rungs, 0, -1)]
+    budgets.append({"days": days[:1], "fraction": None})
+    if len(days) > 1:
+        budgets.append({"days": days, "fraction": None})
+    return budgets
+
+
+def describe_budget(budget: dict) -> str:
+    days = ", ".join(str(day) for day in budget["days"])
+    if budget["fraction"]:
+        return f"first {budget['fraction']:.1%} of day {days}"
+    return f"day(s) {days}"
+
+
+def successive_halving(pool, candidates: list, budgets: list, eta: int = 3, verbose: bool = True) -> list:
+    """Returns the results of the candidates that reached the last budget, best first."""
+    survivors = candidates
+    ranked = []
+    for rung, budget in enumerate(budgets):
+        if verbose:
+            print(f"Rung {rung + 1}/{len(budgets)}: {len(survivors)} candidates on {describe_budget(budget)}")
+        results = pool.map(survivors, days=budget["days"], fraction=budget["fraction"])
+        ranked = sorted(results, key=rank_key, reverse=True)
+        if verbose:
+            print(f"  Best PNL: {ranked[0]['pnl']} Combination: {ranked[0]['params']}")
+        if rung < len(budgets) - 1:
+            survivors = [r["params"] for r in ranked[:max(1, len(ranked) // eta)]]
+    return ranked
+
+
+def hyperband(pool, parameters: list, budgets: list, eta: int = 3, sampler: str = "halton",
+              seed: int = None, verbose: bool = True) -> list:
+    """
+    Runs one successive halving bracket per starting budget. Bracket s samples
+    ceil((s_max + 1) / (s + 1) * eta^s) candidates and starts at budget s_max - s.
+    Returns the results that reached the last budget across all brackets, best first.
+    """
+    s_max = len(budgets) - 1
+    final = []
+    skip = 0
+    for s in range(s_max, -1, -1):
+        n = math.ceil((s_max + 1) / (s + 1) * eta ** s)
+        if sampler == "halton":
+            candidates = halton_candidates(parameters, n, skip)
+            skip += n  # continue the sequence so brackets explore different points
+        else:
+            candidates = random_candidates(parameters, n, None if seed is None else seed + s)
+        if verbose:
+            print(f"Bracket {s_max - s + 1}/{s_max + 1}: {len(candidates)} candidates")
+        final.extend(successive_halving(pool, candidates, budgets[s_max - s:], eta, verbose))
+    return sorted(final, key=rank_key, reverse=True)
@@ -0,0 +1,64 @@
+# stop_conditions.py
+
+STOP_CHECK_EVERY = 1000  # ticks between two checks of a backtest's stop conditions
+PRUNE_AFTER = 2000       # ticks a backtest always runs before it can be stopped
+TRAILING_MARGIN = 2000   # minimum pnl gap to the best run before a run is stopped
+TRAILING_FRACTION = 0.5  # ... or this fraction of the best run's pnl at that point, if larger
+
+'''
+Stop conditions end a headless backtest early once it is clearly not worth finishing, e.g. during
+parameter searches. A stop condition is any callable `condition(backtest)` returning a reason
+(string) to stop, or None. The Backtest calls its conditions every `check_every` ticks, after
+appending its current pnl to `backtest.pnl_path`, and marks the run as pruned with the reason:
+
+    from stop_conditions import MaxDrawdown
+
+    results = run_backtest(trader_module, trading_states, stop_conditions=[MaxDrawdown(5000)])
+    if results["pruned"]:
+        print("Stopped at tick", results["ticks"], "because", results["pruned"])
+'''
+
+
+class MaxDrawdown:
+    """Stops a run whose pnl fell more than `limit` below its running peak."""
+
+    def __init__(self, limit: float, after: int = PRUNE_AFTER):
+        self.limit = limit
+        self.after = after
+
+    def __call__(self, backtest):
+        if backtest.tick < self.after:
+            return None
+        drawdown = max(backtest.pnl_path) - backtest.pnl_path[-1]
+        if drawdown > self.limit:
+            return f"drawdown of {drawdown} exceeds {self.limit}"
+        return None
+
+
+class TrailingBest:
+    """
+    Stops a run whose pnl trails the best run's pnl at the same check by more than the margin.
+    `reference` is the best run's pnl path (one value per check), or a callable returning it, or None
+    while there is no best run yet.
+    """
+
+    def __init__(self, reference, margin: float = TRAILING_MARGIN, fraction: float = TRAILING_FRACTION,
+                 after: int = PRUNE_AFTER):
+        self.reference = reference
+        self.margin = margin
+        self.fraction = fraction
+        self.after = after
+
+    def __call__(self, backtest):
+        if backtest.tick < self.after:
+            return None
+        reference = self.reference() if callable(self.reference) else self.reference
+        check = len(backtest.pnl_path) - 1
+        if not reference or check >= len(reference):
+            return None
+        best = reference[check]
+        pnl = backtest.pnl_path[-1]
+        allowed = max(self.margin, self.fraction * abs(best))
+        if pnl < best - allowed:
+            return f"pnl {pnl} trails the best run's {best} by more than {allowed}"
+        return None
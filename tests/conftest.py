@@ -0,0 +1,47 @@
+# tests/conftest.py
+
+import os
+import sys
+import json
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ALGORITHM = '''
+from datamodel import Order
+
+THRESHOLD = 1
+
+
+class Trader:
+    def run(self, state):
+        if THRESHOLD == 3:
+            raise ValueError("bad threshold")
+        depth = state.order_depths["KELP"]
+        orders = [Order("KELP", min(depth.sell_orders), THRESHOLD)] if state.timestamp == 0 else []
+        return {"KELP": orders}, 0, ""
+'''
+
+
+def _state(timestamp: int, mid: int) -> dict:
+    return {
+        "listings": {"KELP": {"symbol": "KELP", "product": "KELP", "denomination": 1}},
+        "market_trades": {},
+        "observations": {"conversionObservations": {}, "plainValueObservations": {}},
+        "order_depths": {"KELP": {"buy_orders": {str(mid - 1): 20}, "sell_orders": {str(mid + 1): -20}}},
+        "own_trades": {},
+        "position": {},
+        "timestamp": timestamp,
+        "traderData": ""
+    }
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    """A working directory with a short day of data and a trader that raises for THRESHOLD 3."""
+    os.makedirs(tmp_path / "data" / "round-3" / "day-0")
+    with open(tmp_path / "data" / "round-3" / "day-0" / "trading_states.json", "w") as f:
+        json.dump([_state(100 * k, 2000 + k) for k in range(50)], f)
+    (tmp_path / "algo.py").write_text(ALGORITHM)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
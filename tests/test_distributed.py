@@ -0,0 +1,46 @@
+# tests/test_distributed.py
+
+import socket
+import threading
+import pytest
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+from distributed import DistributedPool, run_worker
+
+
+def test_raising_candidate_fails_and_search_completes(repo):
+    candidates = [{"THRESHOLD": threshold} for threshold in range(1, 6)]
+    with DistributedPool("algo.py", days=(0,), address=("127.0.0.1", 0), local_workers=2, cache_path=None,
+                         prune=False, status_path=None, job_timeout=30) as pool:
+        results = pool.map(candidates)
+    assert [result["params"] for result in results] == candidates
+    failed = [result for result in results if result["failed"]]
+    assert [result["params"] for result in failed] == [{"THRESHOLD": 3}]
+    assert "bad threshold" in failed[0]["failed"]
+    for result in results:
+        if not result["failed"]:
+            assert result["ticks"] == 50
+            assert result["pnl"] == 48 * result["params"]["THRESHOLD"]
+
+
+def test_bad_clients_do_not_stop_the_search(repo):
+    candidates = [{"THRESHOLD": threshold} for threshold in (1, 2)]
+    with DistributedPool("algo.py", days=(0,), address=("127.0.0.1", 0), cache_path=None, prune=False,
+                         status_path=None, job_timeout=30) as pool:
+        address = pool._listener.address
+        silent = socket.create_connection(address)  # connects and never answers the challenge
+        with pytest.raises(AuthenticationError):
+            Client(address, authkey=b"wrong")
+        # a worker in this process, started after the bad clients
+        threading.Thread(target=run_worker, args=(address, False, pool._authkey), daemon=True).start()
+        results = pool.map(candidates)
+        silent.close()
+    assert [result["pnl"] for result in results] == [48, 96]
+
+
+def test_refuses_public_address_without_authkey(repo, monkeypatch):
+    monkeypatch.setattr("distributed.AUTHKEY", None)
+    with pytest.raises(ValueError):
+        with DistributedPool("algo.py", days=(0,), address=("0.0.0.0", 0), cache_path=None, status_path=None):
+            pass
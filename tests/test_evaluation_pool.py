@@ -0,0 +1,36 @@
+# tests/test_evaluation_pool.py
+
+import pytest
+
+from evaluation_pool import EvaluationPool, rank_key
+from evaluation_cache import EvaluationCache, file_hash
+from data_sources import ROUND_NUMBER
+from engine import ENGINE_VERSION
+
+
+@pytest.mark.parametrize("lockstep", [None, 5])
+def test_raising_candidate_fails_and_search_completes(repo, lockstep):
+    candidates = [{"THRESHOLD": threshold} for threshold in range(1, 6)]
+    cache_path = str(repo / "evaluations.sqlite")
+    with EvaluationPool("algo.py", days=(0,), processes=2, cache_path=cache_path, lockstep=lockstep, prune=False,
+                        status_path=None) as pool:
+        results = pool.map(candidates)
+    assert [result["params"] for result in results] == candidates
+    failed = [result for result in results if result["failed"]]
+    assert [result["params"] for result in failed] == [{"THRESHOLD": 3}]
+    assert "bad threshold" in failed[0]["failed"]
+    assert sorted(results, key=rank_key)[0]["params"] == {"THRESHOLD": 3}
+    for result in results:
+        if not result["failed"]:
+            assert result["pnl"] == 48 * result["params"]["THRESHOLD"]
+    cache = EvaluationCache(cache_path)
+    cached = [cache.get(file_hash("algo.py"), candidate, ROUND_NUMBER, 0, None, None, ENGINE_VERSION)
+              for candidate in candidates]
+    cache.close()
+    assert [result is not None for result in cached] == [True, True, False, True, True]
+
+
+def test_unknown_parameter_name_fails_every_candidate(repo):
+    with EvaluationPool("algo.py", days=(0,), processes=1, cache_path=None, prune=False, status_path=None) as pool:
+        results = pool.map([{"THRESHLOD": threshold} for threshold in (1, 2)])
+    assert all("THRESHLOD" in result["failed"] for result in results)
@@ -0,0 +1,19 @@
+# tests/test_vectorized.py
+
+import numpy as np
+
+from vectorized import rolling_mean, rolling_std, moving_average_crossover
+
+
+def test_rolling_statistics_skip_a_leading_nan():
+    values = np.array([np.nan, 10.0, 12.0, 14.0, 16.0, 18.0])
+    np.testing.assert_allclose(rolling_mean(values, 3), [np.nan, np.nan, 11.0, 12.0, 14.0, 16.0])
+    np.testing.assert_allclose(rolling_std(values, 3), [np.nan, np.nan, 1.0, np.sqrt(8 / 3), np.sqrt(8 / 3),
+                                                        np.sqrt(8 / 3)])
+    assert np.isnan(rolling_mean(np.full(4, np.nan), 2)).all()
+
+
+def test_crossover_trades_after_a_one_sided_first_tick():
+    mid = np.concatenate([[np.nan], np.arange(100.0, 120.0), np.arange(120.0, 100.0, -1)])
+    targets = moving_average_crossover("KELP", 2, 4, size=10)({"KELP": {"mid_price": mid}})["KELP"]
+    assert (targets == 10).any() and (targets == -10).any()
@@ -0,0 +1,185 @@
+# time_slicing.py
+
+import os
+import sys
+import time
+import pickle
+import multiprocessing
+from engine import (Backtest, parse_algorithm, make_trader, compute_mid_prices, run_backtest, capture_module_state,
+                    restore_module_state)
+from data_sources import load_trading_states
+
+WARMUP = 1000  # ticks each segment replays before its start, to rebuild the trader's lookback state
+
+'''
+Time-sliced parallel execution of a single day. The day is split into one segment per process.
+Each segment starts a fresh trader WARMUP ticks before its first tick and replays those ticks with
+orders matched as usual, so the trader rebuilds its lookback state (moving averages, price
+windows) and its inventory. It then runs its own ticks. Segments run in parallel and are stitched
+together in order:
+
+- A segment is accepted if the position it speculatively reached at its first tick equals the
+  true position at the end of the previous segment (and, with `strict=True`, its traderData
+  too). Its change in cash is then added to the running total.
+- Otherwise the segment is re-run from a snapshot of the previous segment's end state (the
+  Backtest is pickled as for checkpoints), which is exact, and stitching continues from there.
+
+The stitched result equals the sequential run for strategies whose decisions only depend on a
+lookback shorter than WARMUP ticks, their position and traderData. That covers most of our market
+makers. Anything else (e.g. an EMA started at the first tick of the day) drifts slightly, so pass
+`verify=True` to also run the day sequentially and report the difference:
+
+    from time_slicing import run_sliced
+
+    results = run_sliced("algorithms/algo.py", trading_states, processes=8, verify=True)
+    print(results["pnl"], results["reruns"], results["divergence"])
+
+or from the repo root:
+
+    python time_slicing.py ROUND DAY [algorithm path] [processes] [--verify] [--strict]
+'''
+
+# Per-worker state, inherited from the parent through fork
+_algo_module = None
+_module_state = None
+_trading_states = None
+_parameters = None
+
+
+def _init_worker(algo_path, trading_states, parameters):
+    global _algo_module, _module_state, _trading_states, _parameters
+    _algo_module = parse_algorithm(algo_path)
+    _module_state = capture_module_state(_algo_module)
+    _trading_states = trading_states
+    _parameters = parameters
+
+
+def _snapshot(backtest) -> dict:
+    return {
+        "tick": backtest.tick,
+        "position": {product: pos for product, pos in backtest.position.items() if pos},
+        "cash": dict(backtest.trader.cash),
+        "trader_data": backtest.trader_data
+    }
+
+
+def _finish_segment(backtest, end: int) -> dict:
+    """Runs a backtest positioned at a segment's first tick to its end, with start and end snapshots."""
+    start = _snapshot(backtest)
+    backtest.run(until=end)
+    return {"start": start, "end": _snapshot(backtest), "checkpoint": pickle.dumps(backtest)}
+
+
+def _run_segment(bounds) -> dict:
+    start, end, warmup = bounds
+    # a worker may run several segments: each starts from the module's pristine globals
+    restore_module_state(_algo_module, _module_state)
+    backtest = Backtest(make_trader(_algo_module, _parameters), _trading_states, record=False)
+    backtest.tick = max(0, start - warmup)
+    backtest.run(until=start)  # warm-up, building the trader's state and inventory
+    return _finish_segment(backtest, end)
+
+
+def _rerun_segment(checkpoint: bytes, trading_states, end: int) -> dict:
+    backtest = pickle.loads(checkpoint)
+    backtest.trading_states = trading_states
+    return _finish_segment(backtest, end)
+
+
+def _matches(start: dict, true_end: dict, strict: bool) -> bool:
+    return start["position"] == true_end["position"] and \
+        (not strict or start["trader_data"] == true_end["trader_data"])
+
+
+def segment_bounds(num_ticks: int, segments: int) -> list:
+    size = -(-num_ticks // segments)
+    return [(start, min(start + size, num_ticks)) for start in range(0, num_ticks, size)]
+
+
+def run_sliced(algo_path: str, trading_states, parameters: dict = None, processes: int = None,
+               warmup: int = WARMUP, strict: bool = False, verify: bool = False) -> dict:
+    """
+    Backtests a day in parallel segments and stitches them together (see the module docstring).
+    Returns run_backtest-style results, plus the segments, the number of re-run segments and, with
+    `verify`, the difference to a sequential run.
+    """
+    processes = processes or os.cpu_count() or 1
+    bounds = segment_bounds(len(trading_states), processes)
+    parse_algorithm(algo_path)  # so that segment snapshots can be unpickled here
+    start_time = time.perf_counter()
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+    with context.Pool(len(bounds), _init_worker, (algo_path, trading_states, parameters)) as pool:
+        segments = pool.map(_run_segment, [(start, end, warmup) for start, end in bounds])
+
+    cash = {}
+    reruns = 0
+    true_end = None
+    for k, (_, end) in enumerate(bounds):
+        segment = segments[k]
+        if k > 0 and not _matches(segment["start"], true_end, strict):
+            # the speculation failed: continue exactly from where the previous segment really ended
+            segment = segments[k] = _rerun_segment(segments[k - 1]["checkpoint"], trading_states, end)
+            segment["rerun"] = True
+            reruns += 1
+        for product, value in segment["end"]["cash"].items():
+            cash[product] = cash.get(product, 0) + value - segment["start"]["cash"].get(product, 0)
+        true_end = segment["end"]
+    seconds = time.perf_counter() - start_time
+
+    mid_prices = compute_mid_prices(trading_states[-1])
+    per_product_pnl = dict(cash)
+    for product, pos in true_end["position"].items():
+        # a product missing from the last state is marked at -1, as compute_mid_prices marks a one-sided book
+        per_product_pnl[product] = per_product_pnl.get(product, 0) + pos * mid_prices.get(product, -1)
+    results = {
+        "pnl": sum(per_product_pnl.values()),
+        "per_product_pnl": per_product_pnl,
+        "position": true_end["position"],
+        "ticks": len(trading_states),
+        "finished": True,
+        "pruned": None,
+        "failed": None,
+        "pnl_path": [],
+        "seconds": seconds,
+        "segments": [{"start": start, "end": end, "rerun": segment.get("rerun", False)}
+                     for (start, end), segment in zip(bounds, segments)],
+        "reruns": reruns
+    }
+    if verify:
+        start_time = time.perf_counter()
+        sequential = run_backtest(parse_algorithm(algo_path), trading_states, parameters)
+        results["sequential_seconds"] = time.perf_counter() - start_time
+        results["divergence"] = {
+            product: per_product_pnl.get(product, 0) - pnl
+            for product, pnl in sequential["per_product_pnl"].items()
+            if per_product_pnl.get(product, 0) != pnl
+        }
+    return results
+
+
+if __name__ == "__main__":
+    # Usage: python time_slicing.py ROUND DAY [algorithm path] [processes] [--verify] [--strict]
+    from data_sources import HISTORICAL_PATH
+    args = sys.argv[1:]
+    verify = "--verify" in args
+    strict = "--strict" in args
+    args = [arg for arg in args if arg not in ("--verify", "--strict")]
+    if len(args) < 2:
+        print("Usage: python time_slicing.py ROUND DAY [algorithm path] [processes] [--verify] [--strict]")
+        sys.exit(1)
+    trading_states = load_trading_states(HISTORICAL_PATH.format(round=args[0], day=args[1]))
+    algo_path = args[2] if len(args) > 2 else "algorithms/algo.py"
+    processes = int(args[3]) if len(args) > 3 else None
+    results = run_sliced(algo_path, trading_states, processes=processes, strict=strict, verify=verify)
+    print("TOTAL PNL:", results["pnl"])
+    for product, pnl in results["per_product_pnl"].items():
+        print(f"  {product}: {pnl}")
+    print(f"{len(results['segments'])} segments ({results['reruns']} re-run) in {results['seconds']:.2f}s")
+    if verify:
+        print(f"Sequential run: {results['sequential_seconds']:.2f}s, "
+              f"speedup {results['sequential_seconds'] / results['seconds']:.1f}x")
+        if results["divergence"]:
+            print("Diverged from the sequential run:", results["divergence"])
+        else:
+            print("Identical to the sequential run.")
@@ -0,0 +1,80 @@
+# tracer.py
+
+import os
+import json
+import time
+import inspect
+import functools
+import contextlib
+import threading
+
+
+class TraceRecorder:
+    """
+    Records spans in the Chrome trace-event format. The exported JSON file can be opened in
+    chrome://tracing or https://ui.perfetto.dev to inspect individual ticks, the phases of the
+    backtest loop (run, match, account, snapshot) and every method call made by the trader.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+        self._open = []  # stack of spans that have begun but not ended
+        self._origin = time.perf_counter()
+
+    def _now(self) -> float:
+        return (time.perf_counter() - self._origin) * 1e6  # microseconds
+
+    def begin(self, name: str, category: str = "engine", **args):
+        self._open.append((name, category, args, self._now()))
+
+    def end(self):
+        """Closes the most recently opened span and records it as a complete ("X") event."""
+        name, category, args, start = self._open.pop()
+        event = {"name": name, "cat": category, "ph": "X", "ts": round(start, 3),
+                 "dur": round(self._now() - start, 3), "pid": self.pid, "tid": self.tid}
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str = "engine", **args):
+        self.begin(name, category, **args)
+        try:
+            yield
+        finally:
+            self.end()
+
+    def wrap_trader(self, trader):
+        """Wraps every method defined on the trader's class (except `run`) in a `strategy` span."""
+        for name, func in inspect.getmembers(type(trader), inspect.isfunction):
+            if name == "run" or name.startswith("__"):
+                continue
+            setattr(trader, name, self._wrap(func.__qualname__, getattr(trader, name)))
+
+    def unwrap_trader(self, trader):
+        """Removes the wrappers added by `wrap_trader`, e.g. before pickling the trader."""
+        for name, func in inspect.getmembers(type(trader), inspect.isfunction):
+            if name in trader.__dict__ and getattr(trader.__dict__[name], "__wrapped__", None) is not None:
+                del trader.__dict__[name]
+
+    def _wrap(self, name, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            with self.span(name, "strategy"):
+                return method(*args, **kwargs)
+        return wrapper
+
+    def export(self, path: str):
+        metadata = [
+            {"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": "backtest"}},
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": self.tid, "args": {"name": "main loop"}}
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}, f)
+
+
+def null_span(name: str, category: str = "engine", **args):
+    """Stand-in for `TraceRecorder.span` when tracing is disabled."""
+    return contextlib.nullcontext()
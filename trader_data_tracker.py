@@ -0,0 +1,147 @@
+# trader_data_tracker.py
+
+import json
+import time
+import contextlib
+import jsonpickle
+
+TRADER_DATA_LIMIT = 50000  # official traderData length limit (characters)
+WARNING_RATIO = 0.8        # flag ticks whose traderData exceeds this fraction of the limit
+
+
+class TraderDataTracker:
+    """
+    Tracks the size of the traderData string returned by the trader every tick, as well as the
+    time the trader spends serializing (encode/dumps) and deserializing (decode/loads) it.
+
+    Only the traderData round-trip is timed: decode calls on the incoming state.traderData and the
+    encode call whose output is the returned traderData. A trader that post-processes the encoded
+    string (e.g. compresses it) or reads traderData through another library is not timed.
+    """
+
+    def __init__(self, limit: int = TRADER_DATA_LIMIT, warning_ratio: float = WARNING_RATIO):
+        self.limit = limit
+        self.warning_ratio = warning_ratio
+        self.records = []  # list of dicts, one per tick
+        self._encode_time = 0.0
+        self._decode_time = 0.0
+        self._depth = 0  # nesting depth, so that jsonpickle's internal json calls are not counted twice
+        self._trader_data_in = None
+        self._encodes = []  # (output, seconds) of the top-level encode calls of the current tick
+
+    def _timed(self, func, kind):
+        def wrapper(*args, **kwargs):
+            if self._depth > 0:
+                return func(*args, **kwargs)
+            self._depth += 1
+            start = time.perf_counter()
+            output = None
+            try:
+                output = func(*args, **kwargs)
+                return output
+            finally:
+                elapsed = time.perf_counter() - start
+                self._depth -= 1
+                if kind == "encode":
+                    self._encodes.append((output, elapsed))
+                elif args and self._trader_data_in and args[0] == self._trader_data_in:
+                    self._decode_time += elapsed
+        return wrapper
+
+    @contextlib.contextmanager
+    def measure(self, trader_data_in: str = None):
+        """
+        Times the jsonpickle/json (de)serialization of traderData made while the context is active,
+        given the traderData of the state passed to the trader.
+        """
+        self._trader_data_in = trader_data_in
+        self._encodes = []
+        originals = (jsonpickle.encode, jsonpickle.decode, json.dumps, json.loads)
+        jsonpickle.encode = self._timed(originals[0], "encode")
+        jsonpickle.decode = self._timed(originals[1], "decode")
+        json.dumps = self._timed(originals[2], "encode")
+        json.loads = self._timed(originals[3], "decode")
+        try:
+            yield
+        finally:
+            jsonpickle.encode, jsonpickle.decode, json.dumps, json.loads = originals
+
+    def record(self, timestamp: int, trader_data: str) -> bool:
+        """Records the traderData returned at a timestamp. Returns True if the tick is flagged."""
+        if trader_data:
+            self._encode_time += sum(elapsed for output, elapsed in self._encodes if output == trader_data)
+        self._encodes = []
+        size = len(trader_data) if trader_data else 0
+        flagged = size >= self.limit * self.warning_ratio
+        self.records.append({
+            "timestamp": timestamp,
+            "size": size,
+            "encode_ms": self._encode_time * 1000,
+            "decode_ms": self._decode_time * 1000,
+            "flagged": flagged
+        })
+        self._encode_time = 0.0
+        self._decode_time = 0.0
+        return flagged
+
+    def flagged_ticks(self):
+        return [r for r in self.records if r["flagged"]]
+
+    def summary(self) -> dict:
+        if not self.records:
+            return {}
+        sizes = [r["size"] for r in self.records]
+        return {
+            "ticks": len(self.records),
+            "max_size": max(sizes),
+            "final_size": sizes[-1],
+            "mean_size": sum(sizes) / len(sizes),
+            "limit": self.limit,
+            "total_encode_ms": sum(r["encode_ms"] for r in self.records),
+            "total_decode_ms": sum(r["decode_ms"] for r in self.records),
+            "flagged_ticks": len(self.flagged_ticks())
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        if not summary:
+            return
+        print("TRADER DATA:")
+        print(f"  Max size: {summary['max_size']} chars ({summary['max_size'] / self.limit:.1%} of limit)")
+        print(f"  Final size: {summary['final_size']} chars, mean size: {summary['mean_size']:.0f} chars")
+        print(f"  Encode time: {summary['total_encode_ms']:.1f} ms total, "
+              f"{summary['total_encode_ms'] / summary['ticks']:.3f} ms/tick")
+        print(f"  Decode time: {summary['total_decode_ms']:.1f} ms total, "
+              f"{summary['total_decode_ms'] / summary['ticks']:.3f} ms/tick")
+        if summary["flagged_ticks"]:
+            first = self.flagged_ticks()[0]["timestamp"]
+            print(f"  WARNING: {summary['flagged_ticks']} ticks above {self.warning_ratio:.0%} of the "
+                  f"{self.limit} char limit (first at timestamp {first})")
+
+    def export_csv(self, path: str):
+        with open(path, "w") as f:
+            f.write("timestamp;size;encode_ms;decode_ms;flagged\n")
+            for r in self.records:
+                f.write(f"{r['timestamp']};{r['size']};{r['encode_ms']:.4f};{r['decode_ms']:.4f};{int(r['flagged'])}\n")
+
+    def plot(self, path: str, show: bool = False):
+        """Plots traderData size over time against the official limit."""
+        if not self.records:
+            return
+        import matplotlib.pyplot as plt
+        timestamps = [r["timestamp"] for r in self.records]
+        sizes = [r["size"] for r in self.records]
+        plt.figure(figsize=(10, 6))
+        plt.plot(timestamps, sizes, label="traderData size")
+        plt.axhline(self.limit, color="red", linestyle="--", label=f"Limit ({self.limit})")
+        plt.axhline(self.limit * self.warning_ratio, color="orange", linestyle=":",
+                    label=f"Warning ({self.warning_ratio:.0%})")
+        plt.xlabel("Timestamp")
+        plt.ylabel("Characters")
+        plt.title("traderData Size Over Time")
+        plt.legend()
+        plt.tight_layout()
+        plt.savefig(path)
+        if show:
+            plt.show()
+        plt.close()
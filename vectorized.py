@@ -0,0 +1,246 @@
+# vectorized.py
+
+import sys
+import time
+import numpy as np
+from datamodel import Order
+from engine import POSITION_LIMITS, run_backtest
+
+'''
+Vectorized backtests of signal functions, for screening research ideas before writing a full
+Trader. The day's top of book is turned into NumPy columns once. A signal function then maps them
+to target positions for every tick at once, and fills and pnl are simulated with array operations,
+without a per-tick Python loop:
+
+    from vectorized import load_books, run_vectorized, moving_average_crossover
+
+    books = load_books(trading_states)
+    results = run_vectorized(moving_average_crossover("KELP", 3, 7, size=50), books)
+    print(results["pnl"], results["per_product_pnl"])
+
+A signal function takes the books ({product: {column: array}}, see load_books) and returns
+{product: array of target positions}. NaN targets hold the previous target, and targets are
+clipped to the position limits.
+
+The fill model is deliberately simple. At each tick the position moves towards its target by
+crossing the spread: buys fill at the best ask and sells at the best bid, up to the volume quoted
+there, and the rest is tried again on the following ticks. Positions are marked to the same mid
+price as in the engine. This is a screen, not a replica of the engine, which also fills against
+the market trades of the next tick: the results report how many ticks a trade was capped by the
+touch volume, and the more there are, the further apart the two will be.
+
+To see how a signal holds up in the full engine, SignalTrader replays its targets as orders:
+
+    python vectorized.py ROUND DAY [--check]
+'''
+
+
+def load_books(trading_states, products=None) -> dict:
+    """
+    Top-of-book columns of each product: timestamp, bid_price, bid_volume, ask_price, ask_volume
+    and mid_price (as marked by the engine). Prices are NaN where a side of the book is empty, and
+    so is the mid price.
+    """
+    products = products or sorted({product for state in trading_states for product in state.listings})
+    n = len(trading_states)
+    timestamps = np.array([state.timestamp for state in trading_states], dtype=np.int64)
+    books = {}
+    for product in products:
+        columns = {name: np.full(n, np.nan) for name in ["bid_price", "bid_volume", "ask_price", "ask_volume"]}
+        for i, state in enumerate(trading_states):
+            depth = state.order_depths.get(product)
+            if depth is None:
+                continue
+            if depth.buy_orders:
+                price = max(depth.buy_orders)
+                columns["bid_price"][i] = price
+                columns["bid_volume"][i] = depth.buy_orders[price]
+            if depth.sell_orders:
+                price = min(depth.sell_orders)
+                columns["ask_price"][i] = price
+                columns["ask_volume"][i] = -depth.sell_orders[price]
+        columns["mid_price"] = np.floor((columns["bid_price"] + columns["ask_price"]) / 2)
+        columns["timestamp"] = timestamps
+        books[product] = columns
+    return books
+
+
+def _forward_fill(values: np.ndarray, initial: float = 0.0) -> np.ndarray:
+    """Replaces each NaN with the last value before it (or `initial` if there is none)."""
+    values = np.concatenate([[initial], values])
+    valid = np.where(np.isnan(values), 0, np.arange(len(values)))
+    return values[np.maximum.accumulate(valid)][1:]
+
+
+def _track(targets: np.ndarray, ask_volume: np.ndarray, bid_volume: np.ndarray) -> np.ndarray:
+    """
+    Position at each tick when moving towards the targets with fills capped at the touch volume.
+    Within a run of equal targets, the position moves by the cumulative touch volume of the side
+    being crossed, up to the gap. A run starts where the previous one ended, so the starts are
+    found by fixed-point iteration over all runs at once: first assuming every run reaches its
+    target, then correcting the runs after those that did not. Each pass fixes at least one more
+    run, and in practice a couple of passes suffice.
+    """
+    if not len(targets):
+        return np.zeros(0)
+    changes = np.diff(targets, prepend=np.nan) != 0
+    starts = np.flatnonzero(changes)
+    ends = np.append(starts[1:], len(targets)) - 1
+    run = np.cumsum(changes) - 1  # run of each tick
+    # touch volume of each side from the start of the tick's run up to the tick (none without a quote)
+    ask_volume, bid_volume = np.nan_to_num(ask_volume), np.nan_to_num(bid_volume)
+    ask_total, bid_total = np.cumsum(ask_volume), np.cumsum(bid_volume)
+    ask_run = ask_total - (ask_total - ask_volume)[starts][run]
+    bid_run = bid_total - (bid_total - bid_volume)[starts][run]
+    target = targets[starts]
+    begin = np.concatenate([[0.0], target[:-1]])
+    for _ in range(len(starts)):
+        gap = target - begin
+        end = begin + np.sign(gap) * np.minimum(np.where(gap > 0, ask_run[ends], bid_run[ends]), np.abs(gap))
+        corrected = np.concatenate([[0.0], end[:-1]])
+        if np.array_equal(corrected, begin):
+            break
+        begin = corrected
+    gap = (target - begin)[run]
+    return begin[run] + np.sign(gap) * np.minimum(np.where(gap > 0, ask_run, bid_run), np.abs(gap))
+
+
+def simulate(targets: np.ndarray, book: dict, limit: int) -> dict:
+    """Fills, cash and pnl of one product moved towards `targets` by crossing the spread, up to the touch volume."""
+    targets = np.clip(_forward_fill(np.asarray(targets, dtype=float)), -limit, limit)
+    ask, bid = book["ask_price"], book["bid_price"]
+    position = _track(targets, book["ask_volume"], book["bid_volume"])
+    trades = np.diff(position, prepend=0.0)
+    prices = np.where(trades > 0, ask, bid)
+    cash = -np.cumsum(np.where(trades != 0, trades * prices, 0.0))
+    # the engine marks flat products at nothing and marks with -1 when a side is empty
+    mid = np.where(np.isnan(book["mid_price"]), -1.0, book["mid_price"])
+    pnl = cash + np.where(position != 0, position * mid, 0.0)
+    wanted = targets - np.concatenate([[0.0], position[:-1]])
+    return {
+        "position": position,
+        "pnl": pnl,
+        "trades": int(np.count_nonzero(trades)),
+        "volume": float(np.abs(trades).sum()),
+        "capped": int(np.count_nonzero(np.abs(trades) < np.abs(wanted)))
+    }
+
+
+def run_vectorized(signal, books: dict, position_limits: dict = POSITION_LIMITS) -> dict:
+    """Runs a signal function on the books. Returns run_backtest-style totals and per-product paths."""
+    start = time.perf_counter()
+    targets = signal(books)
+    per_product = {product: simulate(product_targets, books[product], position_limits.get(product, 0))
+                   for product, product_targets in targets.items()}
+    seconds = time.perf_counter() - start
+    ticks = len(next(iter(books.values()))["timestamp"]) if books else 0
+    return {
+        "pnl": float(sum(result["pnl"][-1] for result in per_product.values())),
+        "per_product_pnl": {product: float(result["pnl"][-1]) for product, result in per_product.items()},
+        "position": {product: int(result["position"][-1]) for product, result in per_product.items()},
+        "ticks": ticks,
+        "seconds": seconds,
+        "ticks_per_second": ticks * len(per_product) / seconds if seconds > 0 else float("inf"),
+        "per_product": per_product
+    }
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Mean of the valid values among the last `window` at each index (NaN until there are `window`
+    values, or if none of them is valid). Gaps are filled with the last value before them.
+    """
+    values = _forward_fill(np.asarray(values, dtype=float), np.nan)
+    valid = ~np.isnan(values)
+    # leading NaNs stay out of the sums instead of spreading through the cumulative sum
+    sums = np.cumsum(np.concatenate([[0.0], np.where(valid, values, 0.0)]))
+    counts = np.cumsum(np.concatenate([[0], valid]))
+    means = np.full(len(values), np.nan)
+    window_sums, window_counts = sums[window:] - sums[:-window], counts[window:] - counts[:-window]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means[window - 1:] = np.where(window_counts > 0, window_sums / window_counts, np.nan)
+    return means
+
+
+def rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    values = _forward_fill(values, np.nan)
+    means = rolling_mean(values, window)
+    squares = rolling_mean(values ** 2, window)
+    return np.sqrt(np.maximum(squares - means ** 2, 0.0))
+
+
+def moving_average_crossover(product: str, short_window: int, long_window: int, size: int):
+    """Long `size` while the short moving average of the mid price is above the long one, short below."""
+    def signal(books):
+        mid = books[product]["mid_price"]
+        short, long = rolling_mean(mid, short_window), rolling_mean(mid, long_window)
+        targets = np.where(short > long, size, np.where(short < long, -size, np.nan))
+        return {product: np.where(np.isnan(long), 0, targets)}
+    return signal
+
+
+def zscore_threshold(product: str, window: int, low: float, high: float, size: int):
+    """Long `size` when the mid price's z-score drops below `low`, short above `high`, flat near 0."""
+    def signal(books):
+        mid = books[product]["mid_price"]
+        with np.errstate(divide="ignore", invalid="ignore"):  # flat windows have no z-score
+            zscore = (mid - rolling_mean(mid, window)) / rolling_std(mid, window)
+        targets = np.where(zscore < low, size, np.where(zscore > high, -size, np.nan))
+        targets[np.abs(zscore) < 0.5 * min(abs(low), abs(high))] = 0
+        targets[:window] = 0
+        return {product: targets}
+    return signal
+
+
+class SignalTrader:
+    """A Trader that replays vectorized target positions in the full engine, crossing the spread."""
+
+    def __init__(self, targets: dict, timestamps: np.ndarray, position_limits: dict = POSITION_LIMITS):
+        self.position_limits = position_limits
+        self.targets = {product: np.clip(_forward_fill(np.asarray(values, dtype=float)),
+                                         -position_limits.get(product, 0), position_limits.get(product, 0))
+                        for product, values in targets.items()}
+        self.index = {int(timestamp): i for i, timestamp in enumerate(timestamps)}
+
+    def run(self, state):
+        i = self.index[state.timestamp]
+        result = {}
+        for product, targets in self.targets.items():
+            depth = state.order_depths.get(product)
+            quantity = int(targets[i]) - state.position.get(product, 0)
+            if depth is None or not quantity:
+                continue
+            if quantity > 0 and depth.sell_orders:
+                result[product] = [Order(product, min(depth.sell_orders), quantity)]
+            elif quantity < 0 and depth.buy_orders:
+                result[product] = [Order(product, max(depth.buy_orders), quantity)]
+        return result, 0, ""
+
+
+if __name__ == "__main__":
+    # Usage: python vectorized.py ROUND DAY [--check]
+    from types import SimpleNamespace
+    from data_sources import open_source
+    check = "--check" in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != "--check"]
+    if len(args) < 2:
+        print("Usage: python vectorized.py ROUND DAY [--check]")
+        sys.exit(1)
+    trading_states = open_source("historical", int(args[0]), int(args[1])).load()
+    books = load_books(trading_states)
+    product = "KELP" if "KELP" in books else next(iter(books))
+    signals = {
+        f"{product} 3/7 moving average crossover": moving_average_crossover(product, 3, 7, 20),
+        f"{product} z-score -2/2 over 50 ticks": zscore_threshold(product, 50, -2.0, 2.0, 20)
+    }
+    for name, signal in signals.items():
+        results = run_vectorized(signal, books)
+        capped = sum(result["capped"] for result in results["per_product"].values())
+        trades = sum(result["trades"] for result in results["per_product"].values())
+        print(f"{name}: PNL {results['pnl']:.0f}, {trades} trades ({capped} ticks capped by the touch volume), "
+              f"{results['ticks_per_second']:,.0f} ticks/s")
+        if check:
+            trader_module = SimpleNamespace(Trader=lambda: SignalTrader(signal(books), books[product]["timestamp"]))
+            start = time.perf_counter()
+            full = run_backtest(trader_module, trading_states)
+            print(f"  full engine: PNL {full['pnl']:.0f} in {time.perf_counter() - start:.2f}s")